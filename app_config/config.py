@@ -24,4 +24,127 @@ def get_tlds_from_config():
         return []
 
     tlds = config.get("tlds", [])
-    return tlds
\ No newline at end of file
+    return tlds
+
+
+def get_working_directory_from_config():
+    """读取 working.directory（do_download 在其中保存 zone 文件和下载清单），未配置时为当前目录"""
+    try:
+        config = load_config()
+    except RuntimeError as exc:
+        print(f"配置加载失败: {exc}")
+        return "."
+
+    return config.get("working.directory", ".")
+
+
+def get_stream_options_from_config():
+    """
+    读取流式下载配置
+
+    Returns:
+        tuple: (是否启用流式下载, 是否保留压缩的 zone 文件)
+    """
+    try:
+        config = load_config()
+    except RuntimeError as exc:
+        print(f"配置加载失败: {exc}")
+        return False, True
+
+    return bool(config.get("download.streaming", False)), bool(config.get("download.keep_compressed", False))
+
+
+def get_extract_options_from_config():
+    """
+    读取域名抽取配置
+
+    Returns:
+        tuple: (是否按 zone 记录识别 owner, 是否只保留带 NS 记录的 owner, 是否写出每个 zone 的域名文件)
+    """
+    try:
+        config = load_config()
+    except RuntimeError as exc:
+        print(f"配置加载失败: {exc}")
+        return False, False, True
+
+    return (
+        bool(config.get("extract.zone_aware", False)),
+        bool(config.get("extract.ns_only", False)),
+        bool(config.get("extract.keep_domain_files", True)),
+    )
+
+def get_filter_rules_from_config():
+    """
+    读取域名过滤规则（filter.rules），未配置的规则使用 scripts.filter.DEFAULT_FILTER_RULES
+
+    Returns:
+        dict: 配置中覆盖的规则
+    """
+    try:
+        config = load_config()
+    except RuntimeError as exc:
+        print(f"配置加载失败: {exc}")
+        return {}
+
+    return config.get("filter.rules") or {}
+
+def get_chunk_hash_from_config():
+    """
+    读取哈希块使用的哈希函数（chunk.hash），未配置时返回 None
+    """
+    try:
+        config = load_config()
+    except RuntimeError as exc:
+        print(f"配置加载失败: {exc}")
+        return None
+
+    return config.get("chunk.hash") or None
+
+def get_diff_options_from_config():
+    """
+    读取块比较配置（diff.engine、diff.sort_memory_mb）
+
+    Returns:
+        tuple: (比较引擎 set 或 sortmerge, 排序一个块文件的内存上限（字节）)
+    """
+    from scripts.sorted_chunks import DEFAULT_SORT_MEMORY_BYTES
+
+    try:
+        config = load_config()
+    except RuntimeError as exc:
+        print(f"配置加载失败: {exc}")
+        return "set", DEFAULT_SORT_MEMORY_BYTES
+
+    memory_mb = config.get("diff.sort_memory_mb")
+    return (
+        config.get("diff.engine") or "set",
+        int(memory_mb) * 1024 * 1024 if memory_mb else DEFAULT_SORT_MEMORY_BYTES,
+    )
+
+def get_snapshot_enabled_from_config():
+    """
+    读取是否在比较后生成当天的域名快照（snapshot.enabled），默认不生成
+    """
+    try:
+        config = load_config()
+    except RuntimeError as exc:
+        print(f"配置加载失败: {exc}")
+        return False
+
+    return bool(config.get("snapshot.enabled", False))
+
+def get_workers_from_config(key):
+    """
+    读取某个处理阶段的并行进程数（如 unzip.workers、extract.workers）
+
+    Returns:
+        int: 进程数，未配置时返回 None（使用 CPU 核数）
+    """
+    try:
+        config = load_config()
+    except RuntimeError as exc:
+        print(f"配置加载失败: {exc}")
+        return None
+
+    workers = config.get(key)
+    return int(workers) if workers else None
@@ -12,6 +12,11 @@ DIR_OUTPUT_DOMAINS_RESULTS = os.path.join('output', 'results')
 DIR_OUTPUT_DOMAIN_CHUNKS = os.path.join('output', 'domain-chunks')
 DIR_OUTPUT_DOMAIN_CHUNKS_NEW = os.path.join(DIR_OUTPUT_DOMAIN_CHUNKS, 'new')
 DIR_OUTPUT_DOMAIN_CHUNKS_OLD = os.path.join(DIR_OUTPUT_DOMAIN_CHUNKS, 'old')
+# 块目录中记录分区方式（哈希函数和块数）的文件
+CHUNK_LAYOUT_FILE_NAME = 'layout.json'
+# 一天全部域名的二进制快照（见 scripts.domain_snapshot）
+FILE_DOMAIN_SNAPSHOT_NEW = os.path.join(DIR_OUTPUT_DOMAIN_CHUNKS, 'new.snap')
+FILE_DOMAIN_SNAPSHOT_OLD = os.path.join(DIR_OUTPUT_DOMAIN_CHUNKS, 'old.snap')
 
 DIR_PUBLIC = os.path.join('public')
 DUPLICATE_MIN_COUNT = 3
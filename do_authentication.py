@@ -3,7 +3,9 @@ import requests
 import sys
 import datetime
 
-def authenticate(username, password, authen_base_url):
+import token_cache
+
+def authenticate(username, password, authen_base_url, client=None):
     authen_headers = {'Content-Type': 'application/json',
                       'Accept': 'application/json'}
 
@@ -12,15 +14,35 @@ def authenticate(username, password, authen_base_url):
 
     authen_url = authen_base_url + '/api/authenticate'
 
-    response = requests.post(authen_url, data=json.dumps(credential), headers=authen_headers)
+    retry_policy = client.retry_policy if client is not None else None
+    attempt = 0
+
+    while True:
+        if client is not None:
+            response = client.post(authen_url, data=json.dumps(credential), headers=authen_headers)
+        else:
+            response = requests.post(authen_url, data=json.dumps(credential), headers=authen_headers)
+
+        status_code = response.status_code
 
-    status_code = response.status_code
+        # 限流或服务端临时错误时按重试策略退避后重试
+        if retry_policy is not None and retry_policy.is_retryable(status_code) and attempt < retry_policy.max_retries:
+            attempt += 1
+            print("{0}: Authentication returned {1}, retry {2}/{3}".format(
+                datetime.datetime.now(), status_code, attempt, retry_policy.max_retries))
+            retry_policy.backoff(attempt, response)
+            continue
+        break
 
     # Return the access_token on status code 200. Otherwise, terminate the program.
     if status_code == 200:
         access_token = response.json()['accessToken']
-        print('{0}: Received access_token:'.format(datetime.datetime.now()))
-        print(access_token)
+        if client is not None:
+            client.set_access_token(access_token)
+        # 不打印 token 本身（它已缓存在仅当前用户可读的文件中），只打印过期时间
+        expires_at = token_cache.decode_token_expiry(access_token)
+        expiry = datetime.datetime.fromtimestamp(expires_at) if expires_at else "unknown"
+        print('{0}: Received access_token (expires at {1})'.format(datetime.datetime.now(), expiry))
         return access_token
     elif status_code == 404:
         sys.stderr.write("Invalid url " + authen_url)
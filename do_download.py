@@ -1,17 +1,46 @@
+import contextlib
+import hashlib
 import json
 import sys
 import os
 import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.message import Message
 
+import requests
+import urllib3
+
+import download_manifest
+import download_metrics
+import download_resume
+import token_cache
 from app_config.config import load_config
 from do_authentication import authenticate
-from do_http_get import do_get
+from do_http_get import CzdsHttpClient, do_get, do_head
+from retry_policy import DEFAULT_MAX_RETRIES, RateLimiter, RetryPolicy
 
 
 DEFAULT_AUTH = None
 DEFAULT_TLDS = []
+DEFAULT_CONCURRENCY = 1
+
+# 读取响应体时使用的缓冲区大小
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# 写入 zone 文件后是否将其从页缓存中移除
+DROP_PAGE_CACHE = True
+
+# 连接中断后最多续传的次数
+DOWNLOAD_RESUME_ATTEMPTS = 5
+# 每写入这么多字节更新一次 .part.json 中的进度
+PART_STATE_SAVE_INTERVAL = 16 * 1024 * 1024
+PART_HASH_BLOCK_SIZE = 1024 * 1024
+
+_DEFAULT_RETRY_POLICY = RetryPolicy()
 
+# 并发下载时多个 worker 可能同时收到 401，只允许其中一个去重新认证
+_TOKEN_REFRESH_LOCK = threading.Lock()
 
 
 
@@ -28,15 +57,83 @@ def _parse_header(header):
     return m
 
 
+def _discard_response(response):
+    """读取并丢弃错误响应的内容，使连接可以回到连接池中复用"""
+    try:
+        response.content
+    except Exception:
+        response.close()
+
+
+def _set_access_token(auth, access_token):
+    auth["access_token"] = access_token
+    auth["token_expires_at"] = token_cache.decode_token_expiry(access_token)
+    if auth.get("token_cache_path"):
+        try:
+            token_cache.save_cached_token(auth["token_cache_path"], auth["username"], access_token)
+        except OSError as exc:
+            print("Failed to save access_token cache: {0}".format(exc))
+
+
+def _refresh_access_token(auth, stale_token, expired=True):
+    """
+    刷新 access_token。并发下载时通过锁串行化，
+    如果其他 worker 已经刷新过（token 已变化），直接复用新的 token。
+    """
+    with _TOKEN_REFRESH_LOCK:
+        if auth["access_token"] == stale_token:
+            if expired:
+                message = "The access_token has been expired. Re-authenticate user {0}"
+            else:
+                message = "The access_token is about to expire. Re-authenticate user {0}"
+            print(message.format(auth["username"]))
+            _set_access_token(
+                auth,
+                authenticate(
+                    auth["username"],
+                    auth["password"],
+                    auth["authen_base_url"],
+                    client=auth.get("client"),
+                ),
+            )
+        return auth["access_token"]
+
+
+def _get_retry_policy(auth):
+    client = auth.get("client")
+    if client is not None and client.retry_policy is not None:
+        return client.retry_policy
+    return _DEFAULT_RETRY_POLICY
+
+
+def _stream_slot(auth):
+    """限制同时下载的响应体数量；没有配置限流器时不做限制"""
+    client = auth.get("client")
+    if client is not None and client.rate_limiter is not None:
+        return client.rate_limiter.stream()
+    return contextlib.nullcontext()
+
+
+def _get_access_token(auth):
+    """返回当前 token，临近过期时先主动刷新，避免请求发出后才收到 401"""
+    access_token = auth["access_token"]
+    if not token_cache.is_token_fresh(auth.get("token_expires_at")):
+        access_token = _refresh_access_token(auth, access_token, expired=False)
+    return access_token
+
+
 def get_zone_links(czds_base_url, auth=None, tlds=None):
     auth = auth if auth is not None else DEFAULT_AUTH
     if auth is None:
         raise ValueError("Authentication context is required to get zone links")
 
     links_url = czds_base_url + "/czds/downloads/links"
+    retry_policy = _get_retry_policy(auth)
+    attempt = 0
 
     while True:
-        links_response = do_get(links_url, auth["access_token"])
+        access_token = _get_access_token(auth)
+        links_response = do_get(links_url, access_token, client=auth.get("client"))
         status_code = links_response.status_code
 
         if status_code == 200:
@@ -51,14 +148,19 @@ def get_zone_links(czds_base_url, auth=None, tlds=None):
             return zone_links
 
         if status_code == 401:
+            _discard_response(links_response)
+            _refresh_access_token(auth, access_token)
+            continue
+
+        if retry_policy.is_retryable(status_code) and attempt < retry_policy.max_retries:
+            _discard_response(links_response)
+            attempt += 1
             print(
-                "The access_token has been expired. Re-authenticate user {0}".format(
-                    auth["username"]
+                "{0}: Getting zone links returned {1}, retry {2}/{3}".format(
+                    datetime.datetime.now(), status_code, attempt, retry_policy.max_retries
                 )
             )
-            auth["access_token"] = authenticate(
-                auth["username"], auth["password"], auth["authen_base_url"]
-            )
+            retry_policy.backoff(attempt, links_response)
             continue
 
         sys.stderr.write(
@@ -69,57 +171,347 @@ def get_zone_links(czds_base_url, auth=None, tlds=None):
         return None
 
 
-def download_one_zone(url, output_directory, auth=None):
+def _default_zone_filename(url):
+    return url.rsplit("/", 1)[-1].rsplit(".")[-2] + ".txt.gz"
+
+
+def _zone_filename(url, response_headers):
+    header = response_headers.get("content-disposition", "")
+    option = _parse_header(header)
+    filename = option.get_param("filename")
+
+    if not filename:
+        filename = _default_zone_filename(url)
+    return filename
+
+
+class _IncompleteDownload(Exception):
+    """下载的字节数与服务器声明的长度不一致，保留 .part 文件等待续传"""
+
+
+def _write_zone_response(
+    response, url, output_directory, part_path, part_state, manifest, stream=None, metrics=None
+):
+    """
+    将响应内容写入 .part 文件，长度校验通过后重命名为最终文件
+
+    206 响应从 part_state 记录的位置继续写入，200 响应从头写入。
+    传入 stream 时，压缩数据同时送入 stream.open_zone() 返回的数据流，
+    stream.keep_compressed 为 False 时不在磁盘上保留 zone 文件
+    """
+    filename = _zone_filename(url, response.headers)
+    path = os.path.join(output_directory, filename)
+    digest = hashlib.sha256()
+    keep_file = stream is None or stream.keep_compressed
+
+    start = 0
+    total = None
+    if response.status_code == 206 and part_state:
+        start, total = download_resume.parse_content_range(response.headers.get("content-range"))
+        if start != part_state["bytes"]:
+            download_resume.discard_part(part_path)
+            raise _IncompleteDownload(
+                "unexpected Content-Range {0}".format(response.headers.get("content-range"))
+            )
+        print(
+            "{0}: Resuming {1} from byte {2}".format(datetime.datetime.now(), url, start)
+        )
+    else:
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit():
+            total = int(content_length)
+
+    sink = stream.open_zone(filename) if stream is not None else None
+    completed = False
+    try:
+        if keep_file:
+            received = _write_part_file(
+                response, url, part_path, part_state, start, total, digest, sink, metrics
+            )
+        else:
+            received = 0
+            for chunk in _iter_response_body(response):
+                digest.update(chunk)
+                sink.write(chunk)
+                received += len(chunk)
+                if metrics is not None:
+                    metrics.add_bytes(len(chunk))
+
+        if total is not None and received != total:
+            raise _IncompleteDownload(
+                "received {0} of {1} bytes".format(received, total)
+            )
+        completed = True
+    finally:
+        if sink is not None:
+            if completed:
+                sink.close()
+            else:
+                sink.abort()
+
+    if keep_file:
+        download_resume.finish_part(part_path, path)
+
+    if manifest is not None:
+        download_manifest.record_download(
+            manifest, url, filename, response.headers, received, digest.hexdigest()
+        )
+    return path
+
+
+def _write_part_file(response, url, part_path, part_state, start, total, digest, sink=None, metrics=None):
+    """把响应写入 .part 文件并定期保存续传状态，返回 .part 文件的总字节数"""
+    state = {
+        "url": url,
+        "bytes": start,
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+        "content_length": total,
+    }
+    if part_state:
+        # 206 响应可能不带校验头，沿用第一次下载时记录的值
+        state["etag"] = state["etag"] or part_state.get("etag")
+        state["last_modified"] = state["last_modified"] or part_state.get("last_modified")
+
+    received = start
+    with open(part_path, "r+b" if start else "wb") as zone_file:
+        if start:
+            # 续传前先对已有内容计算摘要，保证清单中的 SHA-256 覆盖完整文件
+            while zone_file.tell() < start:
+                block = zone_file.read(min(PART_HASH_BLOCK_SIZE, start - zone_file.tell()))
+                if not block:
+                    break
+                digest.update(block)
+                if sink is not None:
+                    sink.write(block)
+            zone_file.seek(start)
+            zone_file.truncate()
+        if total is not None:
+            _preallocate(zone_file.fileno(), start, total - start)
+        download_resume.save_part_state(part_path, state)
+
+        saved_at = received
+        try:
+            for chunk in _iter_response_body(response):
+                zone_file.write(chunk)
+                digest.update(chunk)
+                if sink is not None:
+                    sink.write(chunk)
+                if metrics is not None:
+                    metrics.add_bytes(len(chunk))
+                received += len(chunk)
+                if received - saved_at >= PART_STATE_SAVE_INTERVAL:
+                    zone_file.flush()
+                    # 进程中断时已写入的数据仍在页缓存中，续传从这里开始；只有写完整个文件时才同步落盘
+                    _drop_page_cache(zone_file.fileno(), received)
+                    state["bytes"] = saved_at = received
+                    download_resume.save_part_state(part_path, state)
+        finally:
+            zone_file.flush()
+            _drop_page_cache(zone_file.fileno(), received, sync=True)
+            state["bytes"] = received
+            download_resume.save_part_state(part_path, state)
+
+    return received
+
+
+def _iter_response_body(response):
+    """
+    按 DOWNLOAD_CHUNK_SIZE 大小的块读取响应体
+
+    urllib3 的 readinto 内部仍是先 read 出 bytes 再复制到缓冲区，
+    复用缓冲区并不能省掉每块的分配，反而多一次复制，因此直接使用 iter_content；
+    读取速度的提升来自更大的块。服务器使用 Content-Encoding 时 iter_content 同样负责解码
+    """
+    return response.iter_content(DOWNLOAD_CHUNK_SIZE)
+
+
+def _preallocate(fd, offset, length):
+    """已知文件长度时预先分配磁盘空间，减少大文件的碎片"""
+    if length <= 0 or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(fd, offset, length)
+    except OSError:
+        # 部分文件系统不支持 fallocate，忽略即可
+        pass
+
+
+def _drop_page_cache(fd, length, sync=False):
+    """
+    将 [0, length) 从页缓存中移除，避免下载数 GB 的 zone 文件挤占后续处理阶段需要的内存
+
+    DONTNEED 对脏页只发起异步回写，并丢弃已经回写完成的页，不会阻塞写入循环；
+    下载过程中每次调用时，上一次发起回写的区间通常已经完成，可以被移除。
+    sync 为 True 时先 fdatasync 同步落盘，只在文件写完时调用一次
+    """
+    if sync:
+        try:
+            os.fdatasync(fd)
+        except OSError:
+            pass
+    if not DROP_PAGE_CACHE or not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(fd, 0, length, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
+
+
+def _feed_local_file(stream, path):
+    """zone 未变化时，把本地保留的文件送入数据流，代替重新下载"""
+    compressed = path.endswith(".gz")
+    sink = stream.open_zone(os.path.basename(path), compressed=compressed)
+    completed = False
+    try:
+        with open(path, "rb") as local_file:
+            while True:
+                block = local_file.read(PART_HASH_BLOCK_SIZE)
+                if not block:
+                    break
+                sink.write(block)
+        completed = True
+    finally:
+        if completed:
+            sink.close()
+        else:
+            sink.abort()
+
+
+def download_one_zone(url, output_directory, auth=None, manifest=None, stream=None, recorder=None):
     auth = auth if auth is not None else DEFAULT_AUTH
     if auth is None:
         raise ValueError("Authentication context is required to download a zone file")
 
-    print("{0}: Downloading zone file from {1}".format(datetime.datetime.now(), url))
-
-    while True:
-        download_zone_response = do_get(url, auth["access_token"])
-        status_code = download_zone_response.status_code
+    metrics = download_metrics.ZoneDownloadMetrics(url)
+    try:
+        with _stream_slot(auth):
+            return _download_one_zone(url, output_directory, auth, manifest, stream, metrics)
+    finally:
+        if metrics.outcome is None:
+            metrics.outcome = "error"
+        if recorder is not None:
+            recorder.record(metrics)
 
-        if status_code == 200:
-            header = download_zone_response.headers.get("content-disposition", "")
-            option = _parse_header(header)
-            filename = option.get_param("filename")
 
-            if not filename:
-                filename = url.rsplit("/", 1)[-1].rsplit(".")[-2] + ".txt.gz"
+def _download_one_zone(url, output_directory, auth, manifest, stream, metrics):
+    print("{0}: Downloading zone file from {1}".format(datetime.datetime.now(), url))
 
-            path = os.path.join(output_directory, filename)
+    entry = download_manifest.get_entry(manifest, url) if manifest is not None else None
+    local_path = download_manifest.find_local_file(output_directory, entry)
+    if stream is not None and local_path and not download_manifest.file_matches_entry(local_path, entry):
+        # 流式模式下 zone 未变化时会把本地文件送入数据流，只能使用与清单一致的压缩文件，
+        # 以前非流式运行留下的 .txt 或内容不一致的文件可能已经过期，重新下载
+        print("{0}: Local file {1} does not match the download manifest, downloading again".format(
+            datetime.datetime.now(), local_path))
+        local_path = None
+    # 流式模式下不保留压缩文件时没有 .part 文件可以续传，中断后从头重新读取
+    resumable = stream is None or stream.keep_compressed
+    part_filename = entry["filename"] if entry else _default_zone_filename(url)
+    part_path = download_resume.get_part_path(os.path.join(output_directory, part_filename))
+    retry_policy = _get_retry_policy(auth)
+    failures = 0
+    status_retries = 0
 
-            with open(path, "wb") as zone_file:
-                for chunk in download_zone_response.iter_content(1024):
-                    zone_file.write(chunk)
+    while True:
+        part_state = download_resume.load_part_state(part_path, url) if resumable else None
+        if part_state:
+            request_headers = download_resume.range_headers(part_state)
+        elif local_path:
+            request_headers = download_manifest.conditional_headers(entry)
+        else:
+            request_headers = None
+
+        access_token = _get_access_token(auth)
+        try:
+            metrics.request_sent()
+            download_zone_response = do_get(
+                url, access_token, client=auth.get("client"), headers=request_headers
+            )
+            status_code = download_zone_response.status_code
+            metrics.response_received(status_code)
+
+            if not part_state and local_path and (
+                status_code == 304
+                or (status_code == 200 and download_manifest.matches_entry(entry, download_zone_response.headers))
+            ):
+                download_zone_response.close()
+                download_manifest.record_unchanged(manifest, url)
+                if stream is not None:
+                    _feed_local_file(stream, local_path)
+                print(
+                    "{0}: Zone unchanged since last download, reuse {1}".format(
+                        datetime.datetime.now(),
+                        local_path,
+                    )
+                )
+                metrics.outcome = "unchanged"
+                return local_path
 
+            if status_code in (200, 206):
+                path = _write_zone_response(
+                    download_zone_response, url, output_directory, part_path, part_state, manifest, stream,
+                    metrics,
+                )
+                print(
+                    "{0}: Completed downloading zone to file {1}".format(
+                        datetime.datetime.now(),
+                        path,
+                    )
+                )
+                metrics.outcome = "downloaded"
+                return path
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, _IncompleteDownload) as exc:
+            failures += 1
+            if failures > DOWNLOAD_RESUME_ATTEMPTS:
+                sys.stderr.write(
+                    "Failed to download zone from {0}: {1}\n".format(url, exc)
+                )
+                metrics.outcome = "failed"
+                return None
+            metrics.retries += 1
             print(
-                "{0}: Completed downloading zone to file {1}".format(
-                    datetime.datetime.now(),
-                    path,
+                "{0}: Download of {1} interrupted ({2}), resuming (attempt {3}/{4})".format(
+                    datetime.datetime.now(), url, exc, failures, DOWNLOAD_RESUME_ATTEMPTS
                 )
             )
-            return path
+            metrics.backoff_seconds += retry_policy.backoff(failures)
+            continue
+
+        if status_code == 416 and part_state:
+            # 已有的 .part 文件与服务器上的文件不一致，从头下载
+            _discard_response(download_zone_response)
+            download_resume.discard_part(part_path)
+            continue
 
         if status_code == 401:
+            _discard_response(download_zone_response)
+            metrics.reauths += 1
+            _refresh_access_token(auth, access_token)
+            continue
+
+        _discard_response(download_zone_response)
+
+        if retry_policy.is_retryable(status_code) and status_retries < retry_policy.max_retries:
+            status_retries += 1
+            metrics.retries += 1
             print(
-                "The access_token has been expired. Re-authenticate user {0}".format(
-                    auth["username"]
+                "{0}: Download of {1} returned {2}, retry {3}/{4}".format(
+                    datetime.datetime.now(), url, status_code, status_retries, retry_policy.max_retries
                 )
             )
-            auth["access_token"] = authenticate(
-                auth["username"], auth["password"], auth["authen_base_url"]
-            )
+            metrics.backoff_seconds += retry_policy.backoff(status_retries, download_zone_response)
             continue
 
         if status_code == 404:
             print("No zone file found for {0}".format(url))
+            metrics.outcome = "not_found"
             return None
 
         sys.stderr.write(
             "Failed to download zone from {0} with code {1}\n".format(url, status_code)
         )
+        metrics.outcome = "failed"
         return None
 
 
@@ -132,28 +524,206 @@ def _link_matches_tlds(link, tlds):
     return False
 
 
-def download_zone_files(urls, working_directory, auth=None, tlds=None):
+def _probe_zone_size(url, auth):
+    """
+    通过 HEAD 请求获取 zone 文件大小，未知时返回 None
+    token 过期（401）时与下载时一样重新认证后再请求
+    """
+    reauthenticated = False
+    while True:
+        access_token = _get_access_token(auth)
+        try:
+            response = do_head(url, access_token, client=auth.get("client"))
+        except Exception as exc:
+            print("Failed to probe zone size for {0}: {1}".format(url, exc))
+            return None
+
+        if response.status_code == 401 and not reauthenticated:
+            _discard_response(response)
+            reauthenticated = True
+            try:
+                _refresh_access_token(auth, access_token)
+            except Exception as exc:
+                print("Failed to probe zone size for {0}: {1}".format(url, exc))
+                return None
+            continue
+        break
+
+    if response.status_code != 200:
+        return None
+    content_length = response.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        return int(content_length)
+    return None
+
+
+def _get_zone_sizes(links, manifest, auth, executor):
+    """
+    获取各 zone 的大小：优先使用清单中上次记录的 content_length，
+    只对清单中没有记录的 zone 发送 HEAD 请求
+    """
+    sizes = {}
+    if manifest is not None:
+        for link in links:
+            entry = download_manifest.get_entry(manifest, link)
+            if entry and entry.get("content_length"):
+                sizes[link] = entry["content_length"]
+    unknown = [link for link in links if link not in sizes]
+    if unknown:
+        print(
+            "{0}: Probing the size of {1} zone files not in the download manifest".format(
+                datetime.datetime.now(), len(unknown)
+            )
+        )
+        sizes.update(zip(unknown, executor.map(lambda link: _probe_zone_size(link, auth), unknown)))
+    return sizes
+
+
+def _order_largest_first(links, sizes):
+    """按 Content-Length 从大到小排序，大小未知的链接保持原顺序排在最后"""
+    known = [link for link in links if sizes.get(link) is not None]
+    unknown = [link for link in links if sizes.get(link) is None]
+    known.sort(key=lambda link: sizes[link], reverse=True)
+    return known + unknown
+
+
+def download_zone_files(urls, working_directory, auth=None, tlds=None, concurrency=None, stream=None):
     auth = auth if auth is not None else DEFAULT_AUTH
     tlds = tlds if tlds is not None else DEFAULT_TLDS
+    concurrency = concurrency if concurrency is not None else DEFAULT_CONCURRENCY
     if auth is None:
         raise ValueError("Authentication context is required to download zone files")
 
     output_directory = os.path.join(working_directory, "zonefiles")
     os.makedirs(output_directory, exist_ok=True)
 
-    downloaded_files = []
+    links = [link for link in urls if _link_matches_tlds(link, tlds)]
+    manifest_path = download_manifest.get_manifest_path(working_directory)
+    manifest = download_manifest.load_manifest(manifest_path)
+    download_manifest.start_run(manifest)
+    recorder = download_metrics.DownloadMetricsRecorder(
+        download_metrics.get_metrics_path(working_directory)
+    )
+    start = time.monotonic()
 
-    for link in urls:
-        if not _link_matches_tlds(link, tlds):
-            continue
-        path = download_one_zone(link, output_directory, auth=auth)
-        if path:
-            downloaded_files.append(path)
+    try:
+        if concurrency <= 1:
+            downloaded_files = []
+            for link in links:
+                path = download_one_zone(
+                    link, output_directory, auth=auth, manifest=manifest, stream=stream, recorder=recorder
+                )
+                if path:
+                    downloaded_files.append(path)
+        else:
+            downloaded_files = _download_zone_files_concurrently(
+                links, output_directory, auth, concurrency, manifest, stream, recorder
+            )
+        _print_run_summary(manifest, links, downloaded_files, time.monotonic() - start)
+        recorder.print_slowest()
+    finally:
+        download_manifest.save_manifest(manifest_path, manifest)
 
     return downloaded_files
 
 
-def download():
+def _download_zone_files_concurrently(
+    links, output_directory, auth, concurrency, manifest=None, stream=None, recorder=None
+):
+    """使用有界线程池并发下载，最大的 zone 最先开始，避免 .com 成为最后的长尾"""
+    print(
+        "{0}: Downloading {1} zone files with {2} workers".format(
+            datetime.datetime.now(), len(links), concurrency
+        )
+    )
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        sizes = _get_zone_sizes(links, manifest, auth, executor)
+        ordered_links = _order_largest_first(links, sizes)
+
+        futures = {
+            link: executor.submit(
+                download_one_zone, link, output_directory, auth, manifest, stream, recorder
+            )
+            for link in ordered_links
+        }
+
+        downloaded_files = []
+        for link in links:
+            try:
+                path = futures[link].result()
+            except Exception as exc:
+                sys.stderr.write(
+                    "Failed to download zone from {0}: {1}\n".format(link, exc)
+                )
+                continue
+            if path:
+                downloaded_files.append(path)
+
+    return downloaded_files
+
+
+def _print_run_summary(manifest, links, downloaded_files, elapsed_seconds):
+    transferred_bytes, skipped_bytes, skipped_count = download_manifest.summarize_run(manifest, links)
+    if transferred_bytes and elapsed_seconds > 0:
+        manifest["bytes_per_second"] = transferred_bytes / elapsed_seconds
+    mb_per_second = transferred_bytes / (1024 * 1024) / elapsed_seconds if elapsed_seconds > 0 else 0.0
+    print(
+        "{0}: Downloaded {1} zone files, {2:.1f} MB in {3:.1f}s ({4:.2f} MB/s)".format(
+            datetime.datetime.now(),
+            len(downloaded_files) - skipped_count,
+            transferred_bytes / (1024 * 1024),
+            elapsed_seconds,
+            mb_per_second,
+        )
+    )
+    if skipped_count:
+        # 按本轮的平均吞吐量估算跳过未变化 zone 节省的时间
+        bytes_per_second = manifest.get("bytes_per_second") or 0
+        seconds_saved = skipped_bytes / bytes_per_second if bytes_per_second else 0.0
+        print(
+            "{0}: Skipped {1} unchanged zone files, saved {2:.1f} MB and about {3:.1f}s".format(
+                datetime.datetime.now(),
+                skipped_count,
+                skipped_bytes / (1024 * 1024),
+                seconds_saved,
+            )
+        )
+
+
+def _print_connection_stats(client):
+    stats = client.connection_stats()
+    print(
+        "{0}: HTTP requests: {1}, new connections: {2}, reused connections: {3}".format(
+            datetime.datetime.now(),
+            stats["requests"],
+            stats["new"],
+            stats["reused"],
+        )
+    )
+
+
+def _print_backoff_stats(client):
+    print(
+        "{0}: Retries: {1}, time spent backing off: {2:.1f}s, time spent waiting for rate limit: {3:.1f}s".format(
+            datetime.datetime.now(),
+            client.retry_policy.retries,
+            client.retry_policy.backoff_seconds,
+            client.rate_limiter.wait_seconds,
+        )
+    )
+
+
+def download(stream=None):
+    """
+    下载所有 zone 文件
+
+    Args:
+        stream: 可选的流式处理对象（见 scripts.stream_zone_domains），
+                下载的数据边下载边解压并抽取域名
+    """
+    global DEFAULT_AUTH, DEFAULT_TLDS, DEFAULT_CONCURRENCY, DOWNLOAD_CHUNK_SIZE
+
     try:
         config = load_config()
     except RuntimeError as exc:
@@ -187,26 +757,57 @@ def download():
 
     tlds = config.get("tlds", [])
     working_directory = config.get("working.directory", ".")
+    concurrency = int(config.get("download.concurrency", 1))
+    requests_per_second = config.get("download.requests_per_second")
+    max_streams = config.get("download.max_streams")
+    max_retries = int(config.get("download.max_retries", DEFAULT_MAX_RETRIES))
+    chunk_size = int(config.get("download.chunk_size", DOWNLOAD_CHUNK_SIZE))
 
     print("Authenticate user {0}".format(username))
 
+    client = CzdsHttpClient(
+        pool_size=concurrency,
+        rate_limiter=RateLimiter(
+            requests_per_second=float(requests_per_second) if requests_per_second else None,
+            max_streams=int(max_streams) if max_streams else None,
+        ),
+        retry_policy=RetryPolicy(max_retries=max_retries),
+    )
     auth = {
         "username": username,
         "password": password,
         "authen_base_url": authen_base_url,
-        "access_token": authenticate(username, password, authen_base_url),
+        "client": client,
+        "token_cache_path": token_cache.get_token_cache_path(working_directory),
     }
 
-    global DEFAULT_AUTH, DEFAULT_TLDS
+    access_token = token_cache.load_cached_token(auth["token_cache_path"], username)
+    if access_token:
+        print("{0}: Reuse cached access_token".format(datetime.datetime.now()))
+        auth["access_token"] = access_token
+        auth["token_expires_at"] = token_cache.decode_token_expiry(access_token)
+        client.set_access_token(access_token)
+    else:
+        _set_access_token(auth, authenticate(username, password, authen_base_url, client=client))
+
     DEFAULT_AUTH = auth
     DEFAULT_TLDS = tlds
+    DEFAULT_CONCURRENCY = concurrency
+    DOWNLOAD_CHUNK_SIZE = chunk_size
 
     zone_links = get_zone_links(czds_base_url, auth=auth, tlds=tlds)
     if not zone_links:
         sys.exit(1)
 
     start_time = datetime.datetime.now()
-    download_zone_files(zone_links, working_directory, auth=auth, tlds=tlds)
+    download_zone_files(
+        zone_links,
+        working_directory,
+        auth=auth,
+        tlds=tlds,
+        concurrency=concurrency,
+        stream=stream,
+    )
     end_time = datetime.datetime.now()
 
     print(
@@ -215,6 +816,9 @@ def download():
             (end_time - start_time),
         )
     )
+    _print_connection_stats(client)
+    _print_backoff_stats(client)
+    client.close()
 
 
 if __name__ == "__main__":
@@ -1,11 +1,115 @@
 import requests
+from requests.adapters import HTTPAdapter
 
-def do_get(url, access_token):
+DEFAULT_POOL_SIZE = 10
 
-    bearer_headers = {'Content-Type': 'application/json',
-                      'Accept': 'application/json',
-                      'Authorization': 'Bearer {0}'.format(access_token)}
+
+def _bearer_headers(access_token):
+    return {'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'Authorization': 'Bearer {0}'.format(access_token)}
+
+
+class CzdsHttpClient:
+    """
+    持有一个连接池化的 requests.Session，认证与下载请求共用 keep-alive 连接，
+    避免每个 zone 文件、每次重新认证都重新进行 TCP+TLS 握手
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, access_token=None, rate_limiter=None, retry_policy=None):
+        """
+        Args:
+            pool_size (int): 每个主机的最大连接数，应与下载并发数一致
+            access_token (str): 默认附带在请求头中的 bearer token
+            rate_limiter (RateLimiter): 所有请求共享的限流器
+            retry_policy (RetryPolicy): 429/5xx 响应的重试策略
+        """
+        self.pool_size = max(1, pool_size)
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+        self.session.headers.update({'Content-Type': 'application/json',
+                                     'Accept': 'application/json'})
+        if access_token:
+            self.set_access_token(access_token)
+
+    def set_access_token(self, access_token):
+        self.session.headers['Authorization'] = 'Bearer {0}'.format(access_token)
+
+    def _headers(self, access_token):
+        if access_token is None:
+            return None
+        return {'Authorization': 'Bearer {0}'.format(access_token)}
+
+    def _throttle(self):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+    def get(self, url, access_token=None, headers=None, stream=True):
+        self._throttle()
+        request_headers = self._headers(access_token) or {}
+        if headers:
+            request_headers.update(headers)
+        return self.session.get(url, headers=request_headers, stream=stream)
+
+    def head(self, url, access_token=None):
+        self._throttle()
+        return self.session.head(url, headers=self._headers(access_token), allow_redirects=True)
+
+    def post(self, url, data=None, headers=None):
+        self._throttle()
+        return self.session.post(url, data=data, headers=headers)
+
+    def connection_stats(self):
+        """
+        统计连接池中新建与复用的连接数
+
+        Returns:
+            dict: {'requests': 请求总数, 'new': 新建连接数, 'reused': 复用连接的请求数}
+        """
+        pools = self._adapter.poolmanager.pools
+        total_requests = 0
+        new_connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            total_requests += pool.num_requests
+            new_connections += pool.num_connections
+        return {
+            'requests': total_requests,
+            'new': new_connections,
+            'reused': max(0, total_requests - new_connections),
+        }
+
+    def close(self):
+        self.session.close()
+
+
+def do_get(url, access_token, client=None, headers=None):
+
+    if client is not None:
+        return client.get(url, access_token, headers=headers)
+
+    bearer_headers = _bearer_headers(access_token)
+    if headers:
+        bearer_headers.update(headers)
 
     response = requests.get(url, params=None, headers=bearer_headers, stream=True)
 
     return response
+
+
+def do_head(url, access_token, client=None):
+
+    if client is not None:
+        return client.head(url, access_token)
+
+    bearer_headers = _bearer_headers(access_token)
+
+    response = requests.head(url, headers=bearer_headers, allow_redirects=True)
+
+    return response
@@ -1,13 +1,32 @@
+from app_config.config import get_diff_options_from_config, get_extract_options_from_config, get_workers_from_config
 from do_download import download
 from scripts.unzip_zone_files import unzip_zone_files
 
 
-def download_new_zone_files():
+def download_new_zone_files(streaming=False, keep_compressed=False):
+    """
+    下载 zone 文件
+
+    Args:
+        streaming (bool): 是否边下载边解压并直接生成新的域名块（跳过解压和抽取阶段）
+        keep_compressed (bool): 流式模式下是否保留压缩的 zone 文件
+    """
+    if streaming:
+        print("【1-2】 ******* stream_zone_files_to_chunks() ********")
+        from scripts.stream_zone_domains import stream_zone_files_to_chunks
+        diff_engine, _ = get_diff_options_from_config()
+        zone_aware, ns_only, _ = get_extract_options_from_config()
+        return stream_zone_files_to_chunks(
+            keep_compressed=keep_compressed, sort_chunks=diff_engine == "sortmerge",
+            zone_aware=zone_aware, ns_only=ns_only, workers=get_workers_from_config("extract.workers"),
+        )
+
     print("【1】 ******* download() ********")
     download()
 
     print("【2】 ******* unzip_zone_files() ********")
-    unzip_zone_files("download")
+    unzip_zone_files("download", workers=get_workers_from_config("unzip.workers"))
+    return True
 
 if __name__ == "__main__":
     download_new_zone_files()
\ No newline at end of file
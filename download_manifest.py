@@ -0,0 +1,198 @@
+"""
+下载清单：记录每个 zone 的 URL、ETag/Last-Modified、Content-Length 和 SHA-256，
+用于发起条件请求，跳过与上次相同的 zone 文件，并让后续阶段复用昨天的输出
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+
+MANIFEST_FILENAME = "download_manifest.json"
+
+STATUS_DOWNLOADED = "downloaded"
+STATUS_UNCHANGED = "unchanged"
+
+_MANIFEST_LOCK = threading.Lock()
+
+
+def get_manifest_path(working_directory):
+    return os.path.join(working_directory, MANIFEST_FILENAME)
+
+
+def load_manifest(path):
+    """读取清单文件，不存在或损坏时返回空清单"""
+    if not os.path.exists(path):
+        return {"zones": {}, "unchanged": []}
+    try:
+        with open(path, "r", encoding="utf-8") as fp:
+            manifest = json.load(fp)
+    except (OSError, ValueError) as exc:
+        print("Failed to load download manifest {0}: {1}".format(path, exc))
+        return {"zones": {}, "unchanged": []}
+    manifest.setdefault("zones", {})
+    manifest.setdefault("unchanged", [])
+    return manifest
+
+
+def save_manifest(path, manifest):
+    """先写临时文件再替换，避免中断时留下半个清单"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    with _MANIFEST_LOCK:
+        with open(temp_path, "w", encoding="utf-8") as fp:
+            json.dump(manifest, fp, indent=2, sort_keys=True)
+        os.replace(temp_path, path)
+
+
+def start_run(manifest):
+    """开始新一轮下载，清空上一轮的 unchanged 列表"""
+    manifest["unchanged"] = []
+    manifest["run_id"] = datetime.datetime.now().isoformat()
+
+
+def get_entry(manifest, url):
+    return manifest["zones"].get(url)
+
+
+def find_local_file(output_directory, entry):
+    """
+    查找上次下载留下的本地文件：压缩文件或已解压的 .txt 文件
+
+    Returns:
+        str: 本地文件路径，找不到时返回 None
+    """
+    if not entry or not entry.get("filename"):
+        return None
+    path = os.path.join(output_directory, entry["filename"])
+    if os.path.exists(path):
+        return path
+    if path.endswith(".gz") and os.path.exists(path[:-3]):
+        return path[:-3]
+    return None
+
+
+def file_matches_entry(path, entry, block_size=1024 * 1024):
+    """
+    本地文件是否就是清单记录的那次下载：大小与 content_length 相同且 SHA-256 一致
+    （清单记录的是压缩文件的摘要，解压后的 .txt 无法校验，返回 False）
+    """
+    if not entry or not entry.get("sha256") or not path.endswith(".gz"):
+        return False
+    if entry.get("content_length") is not None and os.path.getsize(path) != entry["content_length"]:
+        return False
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest() == entry["sha256"]
+
+
+def conditional_headers(entry):
+    """根据清单条目生成 If-None-Match / If-Modified-Since 请求头"""
+    headers = {}
+    if not entry:
+        return headers
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def matches_entry(entry, response_headers):
+    """
+    服务器忽略条件请求时，用响应头判断内容是否与清单一致
+
+    ETag 相同即视为未变化；没有 ETag 时要求 Last-Modified 和 Content-Length 都相同
+    """
+    if not entry:
+        return False
+    etag = response_headers.get("etag")
+    if etag and entry.get("etag"):
+        return etag == entry["etag"]
+    last_modified = response_headers.get("last-modified")
+    content_length = response_headers.get("content-length")
+    if not last_modified or not content_length or not content_length.isdigit():
+        return False
+    return (
+        last_modified == entry.get("last_modified")
+        and int(content_length) == entry.get("content_length")
+    )
+
+
+def record_download(manifest, url, filename, response_headers, size, sha256):
+    """
+    记录一次完整下载。内容的 SHA-256 与上次相同时同样标记为 unchanged
+
+    Returns:
+        str: STATUS_DOWNLOADED 或 STATUS_UNCHANGED
+    """
+    with _MANIFEST_LOCK:
+        previous = manifest["zones"].get(url)
+        status = STATUS_DOWNLOADED
+        if previous and previous.get("sha256") == sha256:
+            status = STATUS_UNCHANGED
+            manifest["unchanged"].append(filename)
+        manifest["zones"][url] = {
+            "url": url,
+            "filename": filename,
+            "etag": response_headers.get("etag"),
+            "last_modified": response_headers.get("last-modified"),
+            "content_length": size,
+            "sha256": sha256,
+            "status": status,
+            "transferred": True,
+            "run_id": manifest.get("run_id"),
+            "checked_at": datetime.datetime.now().isoformat(),
+        }
+    return status
+
+
+def record_unchanged(manifest, url):
+    """记录一次未重新下载的 zone（304 或响应头与清单一致）"""
+    with _MANIFEST_LOCK:
+        entry = manifest["zones"][url]
+        entry["status"] = STATUS_UNCHANGED
+        entry["transferred"] = False
+        entry["run_id"] = manifest.get("run_id")
+        entry["checked_at"] = datetime.datetime.now().isoformat()
+        manifest["unchanged"].append(entry["filename"])
+    return entry
+
+
+def summarize_run(manifest, urls):
+    """
+    统计本轮下载实际传输的字节数，以及因未变化而跳过的字节数
+
+    Returns:
+        tuple: (transferred_bytes, skipped_bytes, skipped_count)
+    """
+    transferred = 0
+    skipped = 0
+    skipped_count = 0
+    for url in urls:
+        entry = manifest["zones"].get(url)
+        if not entry or entry.get("run_id") != manifest.get("run_id"):
+            continue
+        size = entry.get("content_length") or 0
+        if entry.get("transferred"):
+            transferred += size
+        else:
+            skipped += size
+            skipped_count += 1
+    return transferred, skipped, skipped_count
+
+
+def get_unchanged_files(path):
+    """
+    返回上一轮下载中未变化的 zone 对应的解压后文件名，例如 {'org.txt'}
+    """
+    manifest = load_manifest(path)
+    names = set()
+    for filename in manifest["unchanged"]:
+        names.add(filename[:-3] if filename.endswith(".gz") else filename)
+    return names
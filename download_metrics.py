@@ -0,0 +1,124 @@
+"""
+单个 zone 下载的性能指标：首字节时间、总耗时、字节数、平均/峰值 MB/s、HTTP 状态、
+重试与重新认证次数，以 JSON Lines 格式追加写入 download_metrics.jsonl
+"""
+
+import datetime
+import json
+import os
+import threading
+import time
+
+METRICS_FILENAME = "download_metrics.jsonl"
+# 计算峰值速度时使用的时间窗口（秒）
+PEAK_WINDOW_SECONDS = 1.0
+
+_MB = 1024 * 1024
+
+
+def get_metrics_path(working_directory):
+    return os.path.join(working_directory, METRICS_FILENAME)
+
+
+class ZoneDownloadMetrics:
+    """记录一个 zone 的下载过程"""
+
+    def __init__(self, url):
+        self.url = url
+        self.zone = url.rsplit("/", 1)[-1]
+        self.started_at = datetime.datetime.now()
+        self._start = time.monotonic()
+        self._request_start = self._start
+        self.ttfb_seconds = None
+        self.status_code = None
+        self.outcome = None
+        self.bytes = 0
+        self.retries = 0
+        self.reauths = 0
+        self.backoff_seconds = 0.0
+        self.peak_bytes_per_second = 0.0
+        self._window_start = None
+        self._window_bytes = 0
+
+    def request_sent(self):
+        self._request_start = time.monotonic()
+
+    def response_received(self, status_code):
+        self.status_code = status_code
+        self.ttfb_seconds = time.monotonic() - self._request_start
+
+    def add_bytes(self, size):
+        now = time.monotonic()
+        if self._window_start is None:
+            self._window_start = now
+        self.bytes += size
+        self._window_bytes += size
+        elapsed = now - self._window_start
+        if elapsed >= PEAK_WINDOW_SECONDS:
+            self.peak_bytes_per_second = max(self.peak_bytes_per_second, self._window_bytes / elapsed)
+            self._window_start = now
+            self._window_bytes = 0
+
+    def to_record(self):
+        total_seconds = time.monotonic() - self._start
+        average = self.bytes / total_seconds if total_seconds > 0 else 0.0
+        # 下载时间不足一个窗口时，峰值速度取平均速度
+        peak = max(self.peak_bytes_per_second, average)
+        return {
+            "zone": self.zone,
+            "url": self.url,
+            "started_at": self.started_at.isoformat(),
+            "outcome": self.outcome,
+            "http_status": self.status_code,
+            "ttfb_seconds": round(self.ttfb_seconds, 4) if self.ttfb_seconds is not None else None,
+            "total_seconds": round(total_seconds, 4),
+            "bytes": self.bytes,
+            "avg_mb_per_second": round(average / _MB, 3),
+            "peak_mb_per_second": round(peak / _MB, 3),
+            "retries": self.retries,
+            "reauths": self.reauths,
+            "backoff_seconds": round(self.backoff_seconds, 3),
+        }
+
+
+class DownloadMetricsRecorder:
+    """多个下载线程共享，每完成一个 zone 追加一行记录"""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(self, metrics):
+        record = metrics.to_record()
+        with self._lock:
+            self.records.append(record)
+            with open(self.path, "a", encoding="utf-8") as fp:
+                fp.write(json.dumps(record) + "\n")
+        return record
+
+    def print_slowest(self, limit=10):
+        """打印耗时最长的 zone"""
+        records = sorted(self.records, key=lambda record: record["total_seconds"], reverse=True)
+        if not records:
+            return
+        print("Slowest zones (metrics in {0}):".format(self.path))
+        for record in records[:limit]:
+            ttfb = record["ttfb_seconds"]
+            print(
+                "  {0:<24} {1:>9.1f}s {2:>10.1f} MB  avg {3:>7.2f} MB/s  peak {4:>7.2f} MB/s  "
+                "ttfb {5}  status {6}  retries {7}  reauths {8}".format(
+                    record["zone"],
+                    record["total_seconds"],
+                    record["bytes"] / _MB,
+                    record["avg_mb_per_second"],
+                    record["peak_mb_per_second"],
+                    "{0:.3f}s".format(ttfb) if ttfb is not None else "-",
+                    record["http_status"],
+                    record["retries"],
+                    record["reauths"],
+                )
+            )
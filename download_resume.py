@@ -0,0 +1,100 @@
+"""
+断点续传：zone 文件先写入 <file>.part，并在 <file>.part.json 中记录已接收的字节数
+和校验头（ETag/Last-Modified），连接中断或进程重启后通过 Range 请求继续下载
+"""
+
+import json
+import os
+import re
+
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".part.json"
+
+_CONTENT_RANGE_PATTERN = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+
+def get_part_path(path):
+    return path + PART_SUFFIX
+
+
+def _get_state_path(part_path):
+    return part_path[: -len(PART_SUFFIX)] + STATE_SUFFIX
+
+
+def load_part_state(part_path, url):
+    """
+    读取 .part 文件的续传状态
+
+    Returns:
+        dict: 续传状态；没有可续传的 .part 文件或状态与 URL 不匹配时返回 None
+    """
+    state_path = _get_state_path(part_path)
+    if not os.path.exists(part_path) or not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, "r", encoding="utf-8") as fp:
+            state = json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+    if state.get("url") != url:
+        return None
+
+    # 状态文件只会落后于 .part 文件，以两者中较小的值为准
+    received = min(state.get("bytes", 0), os.path.getsize(part_path))
+    if received <= 0:
+        return None
+    if not state.get("etag") and not state.get("last_modified"):
+        # 没有校验头无法确认服务器上的文件没有变化，只能重新下载
+        return None
+    state["bytes"] = received
+    return state
+
+
+def save_part_state(part_path, state):
+    state_path = _get_state_path(part_path)
+    temp_path = state_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as fp:
+        json.dump(state, fp)
+    os.replace(temp_path, state_path)
+
+
+def discard_part(part_path):
+    """删除 .part 文件及其状态文件"""
+    for path in (part_path, _get_state_path(part_path)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def finish_part(part_path, path):
+    """长度校验通过后，把 .part 文件重命名为最终文件名并删除状态文件"""
+    os.replace(part_path, path)
+    try:
+        os.remove(_get_state_path(part_path))
+    except FileNotFoundError:
+        pass
+
+
+def range_headers(state):
+    """生成续传请求头，If-Range 保证服务器文件变化时返回完整内容"""
+    headers = {"Range": "bytes={0}-".format(state["bytes"])}
+    validator = state.get("etag") or state.get("last_modified")
+    if validator:
+        headers["If-Range"] = validator
+    return headers
+
+
+def parse_content_range(header):
+    """
+    解析 Content-Range 响应头
+
+    Returns:
+        tuple: (start, total)，total 未知时为 None；无法解析时返回 (None, None)
+    """
+    match = _CONTENT_RANGE_PATTERN.match(header or "")
+    if not match:
+        return None, None
+    total = match.group(3)
+    return int(match.group(1)), (int(total) if total != "*" else None)
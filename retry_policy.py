@@ -0,0 +1,137 @@
+"""
+请求重试与限流：指数退避 + 抖动（遵循 Retry-After），以及按每秒请求数和并发下载流数量
+限制对 CZDS 的访问，在不触发服务端限流的前提下尽量保持吞吐量
+"""
+
+import contextlib
+import email.utils
+import random
+import threading
+import time
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY_SECONDS = 1.0
+DEFAULT_MAX_DELAY_SECONDS = 60.0
+
+
+def parse_retry_after(value):
+    """
+    解析 Retry-After 响应头，支持秒数和 HTTP 日期两种格式
+
+    Returns:
+        float: 需要等待的秒数，无法解析时返回 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """指数退避重试策略，多个线程共享并汇总退避统计"""
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY_SECONDS,
+                 max_delay=DEFAULT_MAX_DELAY_SECONDS):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def is_retryable(self, status_code):
+        return status_code in RETRYABLE_STATUS_CODES
+
+    def compute_delay(self, attempt, retry_after=None):
+        """
+        第 attempt 次重试（从 1 开始）前的等待时间：
+        full jitter 指数退避；服务器给出 Retry-After 时至少等待该时间
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def backoff(self, attempt, response=None):
+        """
+        等待后再重试
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        retry_after = None
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+        delay = self.compute_delay(attempt, retry_after)
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+        time.sleep(delay)
+        return delay
+
+
+class RateLimiter:
+    """
+    令牌桶限流：限制每秒请求数，并用信号量限制同时进行的下载流数量
+    """
+
+    def __init__(self, requests_per_second=None, burst=None, max_streams=None):
+        """
+        Args:
+            requests_per_second (float): 每秒最多发起的请求数，None 表示不限制
+            burst (int): 令牌桶容量，默认与每秒请求数相同
+            max_streams (int): 同时下载的响应体数量上限，None 表示不限制
+        """
+        self.requests_per_second = requests_per_second
+        self.capacity = burst or max(1.0, requests_per_second or 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._streams = threading.BoundedSemaphore(max_streams) if max_streams else None
+        self.wait_seconds = 0.0
+
+    def acquire(self):
+        """取得一个请求令牌，令牌不足时阻塞等待"""
+        if not self.requests_per_second:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated_at) * self.requests_per_second
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.wait_seconds += waited
+                    return waited
+                delay = (1 - self._tokens) / self.requests_per_second
+            time.sleep(delay)
+            waited += delay
+
+    @contextlib.contextmanager
+    def stream(self):
+        """占用一个下载流名额"""
+        if self._streams is None:
+            yield
+            return
+        started = time.monotonic()
+        self._streams.acquire()
+        with self._lock:
+            self.wait_seconds += time.monotonic() - started
+        try:
+            yield
+        finally:
+            self._streams.release()
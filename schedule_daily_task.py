@@ -25,10 +25,16 @@ import logging
 from datetime import datetime, timedelta
 import threading
 
-from app_config.constant import DIR_OUTPUT_DOMAIN_CHUNKS_NEW, DIR_OUTPUT_DOMAIN_CHUNKS_OLD
+from app_config.config import get_stream_options_from_config
+from app_config.constant import (
+    DIR_OUTPUT_DOMAIN_CHUNKS_NEW,
+    DIR_OUTPUT_DOMAIN_CHUNKS_OLD,
+    FILE_DOMAIN_SNAPSHOT_NEW,
+    FILE_DOMAIN_SNAPSHOT_OLD,
+)
 from download import download_new_zone_files
 from scripts.run import run_task, run_task_low_memory
-from util.util import mv_domain_chunks_new2old
+from util.util import mv_domain_chunks_new2old, mv_domain_snapshot_new2old
 
 # 配置日志
 logging.basicConfig(
@@ -45,8 +51,12 @@ logger = logging.getLogger(__name__)
 def process_task():
     # 移动前一天的 domain chunks new作为 今天的 domain chunks old
     mv_domain_chunks_new2old(DIR_OUTPUT_DOMAIN_CHUNKS_NEW, DIR_OUTPUT_DOMAIN_CHUNKS_OLD)
-    download_new_zone_files()
-    run_task_low_memory()
+    mv_domain_snapshot_new2old(FILE_DOMAIN_SNAPSHOT_NEW, FILE_DOMAIN_SNAPSHOT_OLD)
+    streaming, keep_compressed = get_stream_options_from_config()
+    if not download_new_zone_files(streaming=streaming, keep_compressed=keep_compressed):
+        logger.error("未能生成新的域名块，跳过后续任务")
+        return
+    run_task_low_memory(streamed=streaming)
 
 
 def daily_task():
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+块比较引擎基准测试：在合成的新旧块目录上比较 set 引擎与 sortmerge 引擎的
+去重（sortmerge 同时排序）耗时、比较耗时和比较时的峰值内存，并校验两者找出的新增域名相同
+
+去重和比较分别在单独的进程中运行，峰值内存取该进程的 ru_maxrss
+
+使用方法:
+python -m scripts.bench_diff_engine [--domains 20000000] [--chunks 16] [--dir /data/tmp]
+"""
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import string
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
+
+from scripts.chunk_layout import get_partitioner
+from scripts.chunked_diff_domain import (
+    DIFF_ENGINES,
+    _deduplicate_chunk_files,
+    _open_chunk_files,
+    _write_domains_to_chunks,
+    diff_chunk_directories_to_file,
+)
+
+_BATCH_SIZE = 100000
+
+
+def _random_domains(rng, count):
+    letters = string.ascii_lowercase
+    return [
+        ("".join(rng.choice(letters) for _ in range(rng.randint(4, 14))) + ".com").encode("ascii")
+        for _ in range(count)
+    ]
+
+
+def generate_chunk_dirs(root, domains, num_chunks, new_ratio=0.01, duplicate_ratio=0.05, seed=0):
+    """
+    生成未去重的旧块和新块目录：新块包含大部分旧域名和 new_ratio 比例的新域名，两者都有少量重复行
+    """
+    rng = random.Random(seed)
+    partitioner = get_partitioner(num_chunks, "crc32")
+    old_dir = os.path.join(root, "old")
+    new_dir = os.path.join(root, "new")
+    for chunk_dir in (old_dir, new_dir):
+        os.makedirs(chunk_dir, exist_ok=True)
+    old_files = _open_chunk_files(old_dir, num_chunks)
+    new_files = _open_chunk_files(new_dir, num_chunks)
+    try:
+        for start in range(0, domains, _BATCH_SIZE):
+            batch = _random_domains(rng, min(_BATCH_SIZE, domains - start))
+            old = batch + batch[:int(len(batch) * duplicate_ratio)]
+            new = batch[:int(len(batch) * (1 - new_ratio))] + _random_domains(rng, int(len(batch) * new_ratio))
+            new += new[:int(len(new) * duplicate_ratio)]
+            rng.shuffle(old)
+            rng.shuffle(new)
+            _write_domains_to_chunks(old, old_files, partitioner)
+            _write_domains_to_chunks(new, new_files, partitioner)
+    finally:
+        for fp in list(old_files.values()) + list(new_files.values()):
+            fp.close()
+    return old_dir, new_dir, partitioner
+
+
+def _dedupe_step(engine, work_dir, partitioner, memory_budget):
+    sort_chunks = engine == "sortmerge"
+    for name in ("old", "new"):
+        chunk_dir = os.path.join(work_dir, name)
+        _deduplicate_chunk_files(chunk_dir, 1, sort_chunks, memory_budget)
+        partitioner.write_layout(chunk_dir, sorted_chunks=sort_chunks)
+    return {}
+
+
+def _diff_step(engine, work_dir, partitioner, memory_budget):
+    output_file = os.path.join(work_dir, "added.txt")
+    added = diff_chunk_directories_to_file(
+        os.path.join(work_dir, "new"), os.path.join(work_dir, "old"), output_file, workers=1, diff_engine=engine,
+        memory_budget=memory_budget,
+    )
+    digest = hashlib.md5()
+    with open(output_file, "rb") as fp:
+        for line in sorted(fp):
+            digest.update(line)
+    return {'added': added, 'output_md5': digest.hexdigest()}
+
+
+_STEPS = {"dedupe": _dedupe_step, "diff": _diff_step}
+
+
+def _run_step(step, engine, work_dir, partitioner, memory_budget, connection):
+    """在子进程中运行一个步骤，把耗时和该进程的峰值内存发回父进程"""
+    started = time.perf_counter()
+    result = _STEPS[step](engine, work_dir, partitioner, memory_budget)
+    result['seconds'] = time.perf_counter() - started
+    result['peak_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    connection.send(result)
+    connection.close()
+
+
+def run_step(step, engine, work_dir, partitioner, memory_budget):
+    # 每个步骤在 spawn 启动的新进程中运行，ru_maxrss 不包含父进程和其他步骤的内存
+    context = multiprocessing.get_context("spawn")
+    parent, child = context.Pipe()
+    process = context.Process(target=_run_step, args=(step, engine, work_dir, partitioner, memory_budget, child))
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def run_engine(engine, root, old_dir, new_dir, partitioner, memory_budget):
+    """复制块目录，用指定引擎去重和比较"""
+    work_dir = os.path.join(root, engine)
+    shutil.copytree(old_dir, os.path.join(work_dir, "old"))
+    shutil.copytree(new_dir, os.path.join(work_dir, "new"))
+    dedupe = run_step("dedupe", engine, work_dir, partitioner, memory_budget)
+    diff = run_step("diff", engine, work_dir, partitioner, memory_budget)
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        'added': diff['added'],
+        'output_md5': diff['output_md5'],
+        'dedupe_seconds': dedupe['seconds'],
+        'dedupe_peak_mb': dedupe['peak_mb'],
+        'diff_seconds': diff['seconds'],
+        'diff_peak_mb': diff['peak_mb'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="块比较引擎基准测试")
+    parser.add_argument("--domains", type=int, default=20000000, help="旧块的域名数，默认 2000 万")
+    parser.add_argument("--chunks", type=int, default=16, help="块数，默认 16")
+    parser.add_argument("--sort-memory-mb", type=int, default=512, help="排序一个块文件的内存上限，默认 512 MB")
+    parser.add_argument("--dir", default=None, help="存放合成块目录的目录，默认使用临时目录")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(dir=args.dir)
+    try:
+        print(f"正在生成 {args.domains} 个域名的新旧块目录（{args.chunks} 块）...")
+        old_dir, new_dir, partitioner = generate_chunk_dirs(root, args.domains, args.chunks)
+
+        results = {}
+        for engine in DIFF_ENGINES:
+            print(f"正在测试 {engine} 引擎...")
+            results[engine] = run_engine(
+                engine, root, old_dir, new_dir, partitioner, args.sort_memory_mb * 1024 * 1024
+            )
+
+        print()
+        print(f"{'引擎':<10}{'新增域名':>12}{'去重秒数':>10}{'比较秒数':>10}{'去重峰值MB':>12}{'比较峰值MB':>12}")
+        for engine, result in results.items():
+            print(f"{engine:<10}{result['added']:>12}{result['dedupe_seconds']:>10.2f}{result['diff_seconds']:>10.2f}"
+                  f"{result['dedupe_peak_mb']:>12.0f}{result['diff_peak_mb']:>12.0f}")
+        hashes = {result['output_md5'] for result in results.values()}
+        print("两个引擎找出的新增域名" + ("相同" if len(hashes) == 1 else "不同！"))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
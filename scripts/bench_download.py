@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+端到端下载基准测试：在独立进程中启动模拟 CZDS 服务（scripts.mock_czds_server），
+用当前的 do_download 完成认证、获取链接和下载全部 zone，报告吞吐量和服务器统计
+
+使用方法:
+python -m scripts.bench_download --zones 8 --zone-size-mb 64 --concurrency 4
+python -m scripts.bench_download --error-rate 0.1 --drop-rate 0.1 --token-lifetime 0.5 --latency 0.05
+python -m scripts.bench_download --url http://127.0.0.1:8080   # 使用已启动的模拟服务
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import requests
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
+
+from download_metrics import METRICS_FILENAME
+from scripts.mock_czds_server import MockCzdsServer, add_server_arguments, get_server_options
+
+_MB = 1024 * 1024
+
+
+def _serve(options, connection):
+    server = MockCzdsServer(**options)
+    connection.send(server.base_url)
+    connection.close()
+    server.httpd.serve_forever()
+
+
+def start_server_process(options):
+    """在子进程中运行模拟服务，避免服务端与客户端争用 GIL 影响测量结果"""
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(options, child), daemon=True)
+    process.start()
+    base_url = parent.recv()
+    return process, base_url
+
+
+def _load_metrics(working_directory):
+    path = os.path.join(working_directory, METRICS_FILENAME)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as fp:
+        return [json.loads(line) for line in fp if line.strip()]
+
+
+def run_benchmark(base_url, working_directory, concurrency=1, requests_per_second=None, max_streams=None,
+                  max_retries=5, chunk_size=None, streaming=False):
+    """
+    使用当前的 do_download 从 base_url 下载全部 zone
+
+    Returns:
+        dict: 耗时、下载字节数和各 zone 的指标记录
+    """
+    config = {
+        "icann.account.username": "bench@example.com",
+        "icann.account.password": "bench",
+        "authentication.base.url": base_url,
+        "czds.base.url": base_url,
+        "working.directory": working_directory,
+        "download.concurrency": concurrency,
+        "download.max_retries": max_retries,
+        "tlds": [],
+    }
+    if requests_per_second:
+        config["download.requests_per_second"] = requests_per_second
+    if max_streams:
+        config["download.max_streams"] = max_streams
+    if chunk_size:
+        config["download.chunk_size"] = chunk_size
+    os.environ["CZDS_CONFIG"] = json.dumps(config)
+
+    import do_download
+
+    stream = None
+    if streaming:
+        from scripts.stream_zone_domains import StreamChunkPartitioner
+        stream = StreamChunkPartitioner(chunk_dir=os.path.join(working_directory, "chunks"))
+
+    started = time.perf_counter()
+    try:
+        do_download.download(stream=stream)
+    finally:
+        if stream is not None:
+            stream.close()
+    elapsed = time.perf_counter() - started
+
+    records = _load_metrics(working_directory)
+    return {
+        "elapsed_seconds": elapsed,
+        "bytes": sum(record["bytes"] for record in records),
+        "records": records,
+    }
+
+
+def print_report(result, server_stats):
+    elapsed = result["elapsed_seconds"]
+    records = result["records"]
+    outcomes = {}
+    for record in records:
+        outcomes[record["outcome"]] = outcomes.get(record["outcome"], 0) + 1
+
+    print()
+    print("=" * 60)
+    print("端到端下载基准测试结果")
+    print("=" * 60)
+    print(f"zone 数量:     {len(records)} ({', '.join(f'{k} {v}' for k, v in sorted(outcomes.items()))})")
+    print(f"下载字节数:    {result['bytes'] / _MB:.1f} MB")
+    print(f"总耗时:        {elapsed:.2f} 秒")
+    print(f"吞吐量:        {result['bytes'] / _MB / elapsed:.1f} MB/s" if elapsed > 0 else "吞吐量:        -")
+    print(f"客户端重试:    {sum(record['retries'] for record in records)} 次, "
+          f"重新认证 {sum(record['reauths'] for record in records)} 次, "
+          f"退避 {sum(record['backoff_seconds'] for record in records):.1f} 秒")
+    if server_stats:
+        print(f"服务器请求数:  {server_stats['requests']} {server_stats['status']}")
+        print(f"服务器发送:    {server_stats['bytes_sent'] / _MB:.1f} MB, "
+              f"签发 token {server_stats['tokens_issued']} 个, "
+              f"注入错误 {server_stats['injected_errors']} 次, "
+              f"断开连接 {server_stats['dropped_connections']} 次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端下载基准测试（使用本地模拟 CZDS 服务）")
+    parser.add_argument("--url", default=None, help="已启动的模拟服务地址，不指定时自动启动")
+    parser.add_argument("--concurrency", type=int, default=1, help="download.concurrency，默认 1")
+    parser.add_argument("--requests-per-second", type=float, default=None, help="download.requests_per_second")
+    parser.add_argument("--max-streams", type=int, default=None, help="download.max_streams")
+    parser.add_argument("--max-retries", type=int, default=5, help="download.max_retries，默认 5")
+    parser.add_argument("--chunk-size", type=int, default=None, help="download.chunk_size（字节）")
+    parser.add_argument("--streaming", action="store_true", help="边下载边解压并写入哈希块")
+    parser.add_argument("--dir", default=None, help="工作目录的父目录，默认使用临时目录")
+    parser.add_argument("--keep", action="store_true", help="保留下载的文件")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        print(f"正在启动模拟 CZDS 服务（{args.zones} 个 zone，平均 {args.zone_size_mb} MB）...")
+        process, base_url = start_server_process(get_server_options(args))
+    base_url = base_url.rstrip("/")
+
+    working_directory = tempfile.mkdtemp(prefix="czds-bench-", dir=args.dir)
+    try:
+        result = run_benchmark(
+            base_url,
+            working_directory,
+            concurrency=args.concurrency,
+            requests_per_second=args.requests_per_second,
+            max_streams=args.max_streams,
+            max_retries=args.max_retries,
+            chunk_size=args.chunk_size,
+            streaming=args.streaming,
+        )
+        try:
+            server_stats = requests.get(base_url + "/mock/stats", timeout=10).json()
+        except (requests.exceptions.RequestException, ValueError):
+            server_stats = None
+        print_report(result, server_stats)
+    finally:
+        if args.keep:
+            print(f"下载的文件保留在 {working_directory}")
+        else:
+            shutil.rmtree(working_directory, ignore_errors=True)
+        if process is not None:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+下载写入路径基准测试：在本地 HTTP 服务器上提供一个随机内容的文件，
+比较旧的 iter_content(1024) 写入方式与 do_download 中的大块写入方式的 MB/s
+
+使用方法:
+python -m scripts.bench_download_write [--size-mb 512] [--chunk-size 1048576] [--repeat 3]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
+
+import do_download
+import download_resume
+
+
+def _start_server(payload):
+    """启动只提供一个文件的本地 HTTP 服务器，返回 (server, url)"""
+
+    class PayloadHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            view = memoryview(payload)
+            for offset in range(0, len(payload), 4 * 1024 * 1024):
+                self.wfile.write(view[offset:offset + 4 * 1024 * 1024])
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PayloadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:{0}/bench.zone".format(server.server_address[1])
+
+
+def _baseline_write(session, url, path):
+    """优化前的写入方式：每次 1KB"""
+    response = session.get(url, stream=True)
+    digest = hashlib.sha256()
+    with open(path, "wb") as zone_file:
+        for chunk in response.iter_content(1024):
+            zone_file.write(chunk)
+            digest.update(chunk)
+    return os.path.getsize(path)
+
+
+def _tuned_write(session, url, path):
+    """do_download 当前的写入方式：大块 iter_content + fallocate + fadvise"""
+    response = session.get(url, stream=True)
+    total = int(response.headers["content-length"])
+    part_path = path + ".part"
+    received = do_download._write_part_file(
+        response, url, part_path, None, 0, total, hashlib.sha256()
+    )
+    download_resume.finish_part(part_path, path)
+    return received
+
+
+def _measure(name, write_function, session, url, path, repeat):
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = write_function(session, url, path)
+        elapsed = time.perf_counter() - start
+        best = max(best, size / (1024 * 1024) / elapsed)
+        os.remove(path)
+    print(f"  {name:<10} {best:>9.1f} MB/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="下载写入路径基准测试")
+    parser.add_argument("--size-mb", type=int, default=512, help="测试文件大小（MB），默认 512")
+    parser.add_argument("--chunk-size", type=int, default=do_download.DOWNLOAD_CHUNK_SIZE,
+                        help="优化后写入路径每次读取的块大小（字节）")
+    parser.add_argument("--repeat", type=int, default=3, help="每种方式重复次数，取最快一次")
+    parser.add_argument("--dir", default=None, help="写入测试文件的目录，默认使用临时目录")
+    args = parser.parse_args()
+
+    do_download.DOWNLOAD_CHUNK_SIZE = args.chunk_size
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    server, url = _start_server(payload)
+    session = requests.Session()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        path = os.path.join(temp_dir, "bench.txt.gz")
+        print(f"文件大小 {args.size_mb} MB, 块大小 {args.chunk_size} 字节, 重复 {args.repeat} 次:")
+        before = _measure("iter_1k", _baseline_write, session, url, path, args.repeat)
+        after = _measure("tuned", _tuned_write, session, url, path, args.repeat)
+        print(f"  提升 {after / before:.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
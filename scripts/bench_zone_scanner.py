@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+zone 文件第一列抽取基准测试：在合成的 zone 文件上比较原来的文本模式逐行处理（flush_batch）
+与字节模式扫描器（scripts.zone_scanner）的每秒行数，并校验两者输出完全相同
+
+使用方法:
+python -m scripts.bench_zone_scanner [--lines 100000000] [--dir /data/tmp]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
+
+from scripts.filter import VECTORIZED_FILTER, filter_domain, normalize_domain
+from scripts.zone_scanner import iter_line_blocks, scan_block
+
+# 合成文件由该行数的模板块重复组成
+_TEMPLATE_LINES = 1000000
+
+
+def _build_template(seed=0):
+    """生成一块接近真实 zone 文件的数据：NS、DS、glue 记录，混合大小写和尾部的点"""
+    rng = random.Random(seed)
+    letters = string.ascii_lowercase
+    alphabet = letters * 3 + string.digits + "-"
+    lines = []
+    while len(lines) < _TEMPLATE_LINES:
+        name = rng.choice(letters) + "".join(rng.choice(alphabet) for _ in range(rng.randint(3, 14)))
+        if rng.random() < 0.2:
+            name = name.upper()
+        host = "ns{0}.dns{1}.net.".format(rng.randint(1, 4), rng.randint(1, 900))
+        lines.append("{0}.com.\t172800\tin\tns\t{1}".format(name, host))
+        lines.append("{0}.com.\t172800\tin\tns\t{1}".format(name, host.replace("ns1", "ns2")))
+        if rng.random() < 0.1:
+            lines.append("{0}.com.\t86400\tin\tds\t{1} 8 2 {2:064x}".format(name, rng.randint(1, 65535),
+                                                                         rng.getrandbits(256)))
+        if rng.random() < 0.05:
+            lines.append("ns1.{0}.com.\t172800\tin\ta\t192.0.2.{1}".format(name, rng.randint(1, 254)))
+    return ("\n".join(lines[:_TEMPLATE_LINES]) + "\n").encode("ascii")
+
+
+def write_synthetic_zone(path, total_lines):
+    template = _build_template()
+    repeats, remainder = divmod(total_lines, _TEMPLATE_LINES)
+    with open(path, "wb") as fp:
+        for _ in range(repeats):
+            fp.write(template)
+        if remainder:
+            cut = 0
+            for _ in range(remainder):
+                cut = template.index(b"\n", cut) + 1
+            fp.write(template[:cut])
+
+
+def run_text_mode(input_file, output_file, batch_size=5000):
+    """原来 _process_file_with_grouping 的文本模式实现"""
+    total_lines = 0
+    with open(input_file, 'r', encoding='utf-8') as infile, open(output_file, 'w', encoding='utf-8') as outfile:
+        batch_lines = []
+
+        def flush_batch(lines):
+            for raw_line in lines:
+                columns = raw_line.split()
+                if not columns:
+                    continue
+                first_column = normalize_domain(columns[0])
+                if not first_column:
+                    continue
+                if not filter_domain(first_column):
+                    continue
+                outfile.write(first_column + '\n')
+
+        for line in infile:
+            line = line.strip()
+            if not line:
+                continue
+            total_lines += 1
+            batch_lines.append(line)
+            if len(batch_lines) >= batch_size:
+                flush_batch(batch_lines)
+                batch_lines = []
+        if batch_lines:
+            flush_batch(batch_lines)
+    return total_lines
+
+
+def run_scanner(input_file, output_file):
+    """字节模式扫描器"""
+    total_lines = 0
+    with open(output_file, 'wb') as outfile:
+        for block in iter_line_blocks(input_file):
+            line_count, domains = scan_block(block)
+            total_lines += line_count
+            if domains:
+                outfile.write(b"\n".join(domains))
+                outfile.write(b"\n")
+    return total_lines
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(4 * 1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _measure(name, function, *args):
+    started = time.perf_counter()
+    lines = function(*args)
+    elapsed = time.perf_counter() - started
+    print(f"  {name:<10} {lines} 行, {elapsed:>8.2f} 秒, {lines / elapsed:>12,.0f} 行/秒")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="zone 文件第一列抽取基准测试")
+    parser.add_argument("--lines", type=int, default=100000000, help="合成 zone 文件的行数，默认 1 亿行（约 5 GB）")
+    parser.add_argument("--dir", default=None, help="存放合成文件的目录，默认使用临时目录")
+    parser.add_argument("--skip-text", action="store_true", help="跳过耗时较长的文本模式测试")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        zone_file = os.path.join(temp_dir, "com.txt")
+        print(f"正在生成 {args.lines} 行的合成 zone 文件...")
+        write_synthetic_zone(zone_file, args.lines)
+        print(f"文件大小 {os.path.getsize(zone_file) / (1024 * 1024):.1f} MB")
+        print(f"域名过滤: {'numpy 批量' if VECTORIZED_FILTER else '逐个'}")
+
+        scanner_output = os.path.join(temp_dir, "scanner.txt")
+        scanner_seconds = _measure("scanner", run_scanner, zone_file, scanner_output)
+        if args.skip_text:
+            return
+
+        text_output = os.path.join(temp_dir, "text.txt")
+        text_seconds = _measure("text", run_text_mode, zone_file, text_output)
+        print(f"  提升 {text_seconds / scanner_seconds:.1f}x")
+        identical = _file_sha256(text_output) == _file_sha256(scanner_output)
+        print(f"  输出{'完全相同' if identical else '不一致！'}")
+        if not identical:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
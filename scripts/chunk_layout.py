@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+哈希块的分区方式：域名用哪个哈希函数、分成多少块
+
+每个块目录都有一个 layout.json 记录分区方式，比较新旧块之前先检查两者一致，
+不一致时把旧块按新块的分区方式重新分块，而不是直接比较分区不同的块文件。
+没有 layout.json 的目录是以前用 md5 生成的
+
+layout.json 中的 sorted 表示块文件已经排好序（见 scripts.sorted_chunks），它描述的是块的内容，
+不属于分区方式，比较分区方式时不考虑
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import zlib
+
+from app_config.constant import CHUNK_LAYOUT_FILE_NAME
+
+try:
+    import xxhash
+except ImportError:  # xxhash 是可选依赖
+    xxhash = None
+
+LAYOUT_VERSION = 1
+# 没有 layout.json 的块目录使用的哈希函数
+LEGACY_HASH = "md5"
+DEFAULT_HASH = "crc32"
+
+
+def _md5_chunk_ids(domains, num_chunks):
+    # 与原来的 int(md5(domain).hexdigest(), 16) % num_chunks 相同
+    md5 = hashlib.md5
+    return [int.from_bytes(md5(domain).digest(), "big") % num_chunks for domain in domains]
+
+
+def _crc32_chunk_ids(domains, num_chunks):
+    crc32 = zlib.crc32
+    return [crc32(domain) % num_chunks for domain in domains]
+
+
+def _blake2b_chunk_ids(domains, num_chunks):
+    blake2b = hashlib.blake2b
+    return [int.from_bytes(blake2b(domain, digest_size=8).digest(), "big") % num_chunks for domain in domains]
+
+
+def _xxh64_chunk_ids(domains, num_chunks):
+    digest = xxhash.xxh64_intdigest
+    return [digest(domain) % num_chunks for domain in domains]
+
+
+_HASH_FUNCTIONS = {
+    "md5": _md5_chunk_ids,
+    "crc32": _crc32_chunk_ids,
+    "blake2b": _blake2b_chunk_ids,
+    "xxh64": _xxh64_chunk_ids,
+}
+
+
+class ChunkPartitioner:
+    """
+    把域名（bytes）映射到块编号，哈希函数都与进程和平台无关，同一个域名总是落在同一个块
+
+    对象只保存哈希函数名和块数，可以传给子进程
+    """
+
+    def __init__(self, hash_name=DEFAULT_HASH, num_chunks=128):
+        if hash_name not in _HASH_FUNCTIONS:
+            raise ValueError(f"未知的哈希函数: {hash_name}（可选: {', '.join(sorted(_HASH_FUNCTIONS))}）")
+        if hash_name == "xxh64" and xxhash is None:
+            raise ValueError("哈希函数 xxh64 需要安装 xxhash")
+        self.hash_name = hash_name
+        self.num_chunks = num_chunks
+
+    def chunk_ids(self, domains):
+        """返回一批域名（bytes）的块编号列表"""
+        return _HASH_FUNCTIONS[self.hash_name](domains, self.num_chunks)
+
+    def chunk_id(self, domain):
+        return self.chunk_ids([domain])[0]
+
+    def layout(self):
+        return {"version": LAYOUT_VERSION, "hash": self.hash_name, "num_chunks": self.num_chunks}
+
+    def write_layout(self, chunk_dir, sorted_chunks=False):
+        """在块目录中写入 layout.json，sorted_chunks 表示块文件已经排好序"""
+        path = os.path.join(chunk_dir, CHUNK_LAYOUT_FILE_NAME)
+        temp_path = path + ".tmp"
+        layout = self.layout()
+        if sorted_chunks:
+            layout["sorted"] = True
+        with open(temp_path, "w", encoding="utf-8") as fp:
+            json.dump(layout, fp)
+        os.replace(temp_path, path)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ChunkPartitioner)
+            and self.hash_name == other.hash_name
+            and self.num_chunks == other.num_chunks
+        )
+
+    def __repr__(self):
+        return f"ChunkPartitioner({self.hash_name!r}, {self.num_chunks})"
+
+
+def get_partitioner(num_chunks=128, hash_name=None):
+    """
+    创建分区器，hash_name 为 None 时使用配置文件中的 chunk.hash（默认 crc32）
+    """
+    if hash_name is None:
+        from app_config.config import get_chunk_hash_from_config
+
+        hash_name = get_chunk_hash_from_config() or DEFAULT_HASH
+    return ChunkPartitioner(hash_name, num_chunks)
+
+
+def _chunk_files(chunk_dir):
+    return sorted(glob.glob(os.path.join(chunk_dir, "chunk_*.txt")))
+
+
+def read_layout(chunk_dir):
+    """
+    读取块目录的分区方式
+
+    Returns:
+        ChunkPartitioner: 没有 layout.json 时按块文件数推断为以前的 md5 分区；目录中没有块文件时返回 None
+    """
+    path = os.path.join(chunk_dir, CHUNK_LAYOUT_FILE_NAME)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as fp:
+            layout = json.load(fp)
+        if layout.get("version") != LAYOUT_VERSION:
+            raise ValueError(f"{path} 的版本 {layout.get('version')} 无法识别")
+        return ChunkPartitioner(layout["hash"], layout["num_chunks"])
+
+    chunk_files = _chunk_files(chunk_dir)
+    if not chunk_files:
+        return None
+    return ChunkPartitioner(LEGACY_HASH, len(chunk_files))
+
+
+def is_sorted_chunk_directory(chunk_dir):
+    """块目录的 layout.json 是否记录了块文件已经排好序"""
+    path = os.path.join(chunk_dir, CHUNK_LAYOUT_FILE_NAME)
+    if not os.path.exists(path):
+        return False
+    with open(path, "r", encoding="utf-8") as fp:
+        return bool(json.load(fp).get("sorted", False))
+
+
+def repartition_chunk_directory(chunk_dir, partitioner, batch_size=100000):
+    """
+    把块目录按新的分区方式重新分块（原目录中的域名已经去重，重新分块后仍然没有重复）
+    新块先写入临时目录，全部完成后再替换原目录；重新分块后的块文件没有排序
+    """
+    from scripts.chunked_diff_domain import _open_chunk_files, _write_domains_to_chunks
+
+    temp_dir = chunk_dir.rstrip(os.sep) + ".repartition"
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+    os.makedirs(temp_dir)
+
+    total = 0
+    chunk_files = _open_chunk_files(temp_dir, partitioner.num_chunks)
+    try:
+        for chunk_file in _chunk_files(chunk_dir):
+            with open(chunk_file, "rb") as fp:
+                batch = []
+                for line in fp:
+                    domain = line.strip()
+                    if domain:
+                        batch.append(domain)
+                    if len(batch) >= batch_size:
+                        total += _write_domains_to_chunks(batch, chunk_files, partitioner)
+                        batch = []
+                total += _write_domains_to_chunks(batch, chunk_files, partitioner)
+    finally:
+        for fp in chunk_files.values():
+            fp.close()
+    partitioner.write_layout(temp_dir)
+
+    backup_dir = chunk_dir.rstrip(os.sep) + ".old-layout"
+    if os.path.exists(backup_dir):
+        shutil.rmtree(backup_dir)
+    os.rename(chunk_dir, backup_dir)
+    os.rename(temp_dir, chunk_dir)
+    shutil.rmtree(backup_dir)
+    return total
@@ -9,16 +9,41 @@
 import os
 import glob
 import hashlib
+import json
 import tempfile
 import shutil
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from app_config.config import load_config, get_tlds_from_config
 from app_config.constant import DIR_OUTPUT_DOMAINS_001, DIR_OUTPUT_DOMAINS_002, DIR_OUTPUT_DOMAINS_NEW
+from scripts.chunk_layout import get_partitioner, is_sorted_chunk_directory, read_layout, repartition_chunk_directory
+from scripts.file_ranges import concatenate_files, split_file_ranges
+from scripts.fingerprint_set import (
+    FINGERPRINT_BYTES_PER_DOMAIN,
+    FINGERPRINT_SETS,
+    deduplicate_chunk_file_with_fingerprints,
+    write_new_domains_with_fingerprints,
+)
 from scripts.filter import filter_domain, normalize_domain
+from scripts.sorted_chunks import (
+    DEFAULT_SORT_MEMORY_BYTES,
+    merge_join_new_domains,
+    sort_chunk_directory,
+    sort_unique_chunk_file,
+)
+from scripts.zone_scanner import iter_line_blocks, scan_block
 import sys
 import os
 
 from util.util import DIR_OUTPUT_DOMAINS_NEW_TODAY
 
+# 集合中每个元素的槽位和哈希表空余空间的大约字节数
+_SET_SLOT_BYTES = 40
+# 按顶级域统计时打印变化最多的顶级域数
+_TLD_COUNTS_SHOWN = 10
+# 比较引擎：set 把旧块载入集合；sortmerge 对排好序的新旧块做归并，内存占用与块大小无关
+DIFF_ENGINES = ("set", "sortmerge")
+
 
 def hash_domain(domain, num_chunks=100):
     """根据域名计算哈希值，确定其所属的块"""
@@ -168,9 +193,15 @@ def _process_new_chunk_batch(lines, old_domains, out_fp):
                 out_fp.write(domain + "\n")
 
 
-def chunk_directory_domains(input_dir, chunk_dir, num_chunks=100, batch_size=2000):
+def chunk_directory_domains(input_dir, chunk_dir, num_chunks=100, batch_size=2000, workers=None, hash_name=None,
+                            sort_chunks=False, memory_budget=DEFAULT_SORT_MEMORY_BYTES):
     """
     遍历目录中的TLD文件，抽取第一列域名，按哈希分块，并对每个块去重
+    hash_name 为分区使用的哈希函数（见 scripts.chunk_layout），None 表示使用配置文件中的 chunk.hash
+    sort_chunks 为 True 时去重的同时把块文件排好序（供 sortmerge 比较引擎使用）
+
+    workers 大于 1 时，大文件按换行符对齐的字节区间切分，由多个进程并行分块，
+    各区间的结果按顺序追加到块文件，块文件内容与逐个处理时完全相同
     """
     _prepare_chunk_dir(chunk_dir)
 
@@ -184,46 +215,279 @@ def chunk_directory_domains(input_dir, chunk_dir, num_chunks=100, batch_size=200
         return False
 
     print(f"在 {input_dir} 中找到 {len(txt_files)} 个 TLD 文件，开始分块...")
+    workers = workers or os.cpu_count() or 1
+    partitioner = get_partitioner(num_chunks, hash_name)
     chunk_files = _open_chunk_files(chunk_dir, num_chunks)
     total_domains = 0
+    executor = None
 
     try:
         for txt_file in txt_files:
             print(f"  正在处理 {txt_file}")
-            total_domains += _process_tld_file_for_chunking(txt_file, chunk_files, num_chunks, batch_size)
+            ranges = split_file_ranges(txt_file, workers) if workers > 1 else [(0, None)]
+            if len(ranges) == 1:
+                total_domains += _process_tld_file_for_chunking(txt_file, chunk_files, partitioner, batch_size)
+                continue
+            if executor is None:
+                executor = ProcessPoolExecutor(max_workers=workers)
+            print(f"    切分为 {len(ranges)} 个区间并行处理")
+            total_domains += _process_tld_file_ranges_for_chunking(
+                executor, txt_file, ranges, chunk_dir, chunk_files, partitioner, batch_size
+            )
     finally:
+        if executor is not None:
+            executor.shutdown()
         for fp in chunk_files.values():
             fp.close()
 
     print(f"共写入 {total_domains} 个域名，开始对块文件去重...")
-    _deduplicate_chunk_files(chunk_dir)
+    _deduplicate_chunk_files(chunk_dir, workers, sort_chunks, memory_budget)
+    partitioner.write_layout(chunk_dir, sorted_chunks=sort_chunks)
     return True
 
 
-def diff_chunk_directories_to_file(new_chunk_dir, old_chunk_dir, output_file, num_chunks=100):
+def diff_chunk_directories_to_file(new_chunk_dir, old_chunk_dir, output_file, num_chunks=100, workers=1,
+                                   diff_engine="set", memory_budget=DEFAULT_SORT_MEMORY_BYTES, removed_file=None,
+                                   counts_file=None):
     """
     比较新旧块文件，找出新增域名并写入输出文件
+
+    新块目录有 layout.json 时以其中的块数为准；旧块的分区方式（哈希函数或块数）与新块不同时，
+    先把旧块按新块的分区方式重新分块，否则同一个域名会落在不同编号的块里，被误判为新增
+
+    workers 大于 1 时各块在进程池中并行比较，每个块写入单独的临时文件，
+    全部完成后按块顺序拼接为输出文件，内容与逐块比较时相同；None 表示使用 CPU 核数
+
+    diff_engine 为 "sortmerge" 时顺序归并排好序的新旧块，不把旧块载入内存，每个块的新增域名按顺序输出；
+    没有排序的块目录（layout.json 中没有 sorted）先按 memory_budget 排序；
+
+    removed_file 不为 None 时在同一次比较中把只在旧块中出现的域名（删除或过期的域名）写入该文件；
+    counts_file 不为 None 时把按顶级域统计的新增和删除数量写入该 JSON 文件
     """
-    output_dir = os.path.dirname(output_file)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
+    if diff_engine not in DIFF_ENGINES:
+        raise ValueError(f"未知的比较引擎: {diff_engine}（可选: {', '.join(DIFF_ENGINES)}）")
+    for path in (output_file, removed_file, counts_file):
+        output_dir = os.path.dirname(path) if path else None
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
     total_new_domains = 0
+    total_removed_domains = 0
+
+    new_layout = read_layout(new_chunk_dir)
+    if new_layout is not None:
+        num_chunks = new_layout.num_chunks
+        old_layout = read_layout(old_chunk_dir) if os.path.isdir(old_chunk_dir) else None
+        if old_layout is not None and old_layout != new_layout:
+            print(f"旧块的分区方式 {old_layout} 与新块 {new_layout} 不同，正在重新分块 {old_chunk_dir}...")
+            repartition_chunk_directory(old_chunk_dir, new_layout)
+    if diff_engine == "sortmerge":
+        for chunk_dir in (new_chunk_dir, old_chunk_dir):
+            if os.path.isdir(chunk_dir) and not is_sorted_chunk_directory(chunk_dir):
+                print(f"块目录 {chunk_dir} 没有排序，正在排序...")
+                sort_chunk_directory(chunk_dir, workers, memory_budget)
+
+    chunk_names = [
+        f"chunk_{chunk_id:03d}.txt" for chunk_id in range(num_chunks)
+        if os.path.exists(os.path.join(new_chunk_dir, f"chunk_{chunk_id:03d}.txt"))
+    ]
+    old_chunk_files = [os.path.join(old_chunk_dir, chunk_name) for chunk_name in chunk_names]
+    workers = min(workers or os.cpu_count() or 1, max(1, len(chunk_names)))
+    if diff_engine == "set":
+        _print_memory_estimate(old_chunk_files, workers, "比较")
+    else:
+        print(f"使用 {workers} 个进程归并比较排好序的块文件")
+
+    # 按顶级域的计数在写出新增和删除域名时累加，不再重新读取输出文件
+    added_tlds = Counter()
+    removed_tlds = Counter()
+    count_tlds = counts_file is not None
+    if workers <= 1:
+        removed_fp = open(removed_file, "wb") if removed_file else None
+        try:
+            with open(output_file, "wb") as out_fp:
+                added_fp = _TldCountingWriter(out_fp, added_tlds) if count_tlds else out_fp
+                if count_tlds and removed_fp is not None:
+                    removed_fp = _TldCountingWriter(removed_fp, removed_tlds)
+                for chunk_name, old_chunk_file in zip(chunk_names, old_chunk_files):
+                    new_domains, removed_domains = _diff_chunk(
+                        os.path.join(new_chunk_dir, chunk_name), old_chunk_file, added_fp, diff_engine, removed_fp
+                    )
+                    total_new_domains += new_domains
+                    total_removed_domains += removed_domains
+                    _print_chunk_diff(chunk_name, new_domains, removed_domains, removed_fp is not None)
+        finally:
+            if removed_fp is not None:
+                removed_fp.close()
+    else:
+        parts_dir = output_file + ".parts"
+        _prepare_chunk_dir(parts_dir)
+        part_files = [os.path.join(parts_dir, chunk_name) for chunk_name in chunk_names]
+        removed_part_files = [
+            os.path.join(parts_dir, "removed_" + chunk_name) if removed_file else None for chunk_name in chunk_names
+        ]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                counts = executor.map(
+                    _diff_chunk_to_file,
+                    [os.path.join(new_chunk_dir, chunk_name) for chunk_name in chunk_names],
+                    old_chunk_files,
+                    part_files,
+                    [diff_engine] * len(chunk_names),
+                    removed_part_files,
+                    [count_tlds] * len(chunk_names),
+                )
+                for chunk_name, (new_domains, removed_domains, chunk_added_tlds, chunk_removed_tlds) in zip(
+                    chunk_names, counts
+                ):
+                    total_new_domains += new_domains
+                    total_removed_domains += removed_domains
+                    if count_tlds:
+                        added_tlds.update(chunk_added_tlds)
+                        removed_tlds.update(chunk_removed_tlds)
+                    _print_chunk_diff(chunk_name, new_domains, removed_domains, removed_file is not None)
+            concatenate_files(part_files, output_file)
+            if removed_file:
+                concatenate_files(removed_part_files, removed_file)
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+    engine_name = _set_implementation() if diff_engine == "set" else "归并比较"
+    print(f"新增域名总数: {total_new_domains}（{engine_name}）")
+    if removed_file:
+        print(f"删除域名总数: {total_removed_domains}，已保存到: {removed_file}")
+    if counts_file:
+        _write_tld_counts(added_tlds, removed_tlds, counts_file)
+    return total_new_domains
 
-    with open(output_file, "w", encoding="utf-8") as out_fp:
-        for chunk_id in range(num_chunks):
-            chunk_name = f"chunk_{chunk_id:03d}.txt"
-            new_chunk_file = os.path.join(new_chunk_dir, chunk_name)
-            if not os.path.exists(new_chunk_file):
-                continue
 
-            old_chunk_file = os.path.join(old_chunk_dir, chunk_name)
-            old_domains = _load_domains_to_set(old_chunk_file)
-            new_domains = _write_new_domains_from_chunk(new_chunk_file, old_domains, out_fp)
-            total_new_domains += new_domains
-            print(f"  {chunk_name} 新增 {new_domains} 个域名")
+def _print_chunk_diff(chunk_name, new_domains, removed_domains, with_removed):
+    if with_removed:
+        print(f"  {chunk_name} 新增 {new_domains} 个域名，删除 {removed_domains} 个域名")
+    else:
+        print(f"  {chunk_name} 新增 {new_domains} 个域名")
+
+
+def _diff_chunk(new_chunk_file, old_chunk_file, out_fp, diff_engine, removed_fp=None):
+    """
+    比较一个块，新增域名写入 out_fp（二进制模式），removed_fp 不为 None 时删除的域名写入 removed_fp
+
+    Returns:
+        tuple: (新增数量, 删除数量)
+    """
+    if diff_engine == "sortmerge":
+        return merge_join_new_domains(new_chunk_file, old_chunk_file, out_fp, removed_fp)
+    if FINGERPRINT_SETS:
+        return write_new_domains_with_fingerprints(new_chunk_file, old_chunk_file, out_fp, removed_fp)
+    old_domains = _load_domains_to_set(old_chunk_file)
+    added = _write_new_domains_from_chunk(new_chunk_file, old_domains, out_fp, discard_found=removed_fp is not None)
+    removed = 0
+    if removed_fp is not None:
+        # 新块中出现过的域名已经从集合中去掉，剩下的就是删除的域名，按旧块的顺序写出
+        removed = _write_remaining_domains(old_chunk_file, old_domains, removed_fp)
+    return added, removed
+
+
+def _diff_chunk_to_file(new_chunk_file, old_chunk_file, part_file, diff_engine="set", removed_part_file=None,
+                        count_tlds=False):
+    """
+    在子进程中比较一个块，新增域名写入 part_file，删除的域名写入 removed_part_file
+
+    Returns:
+        tuple: (新增数量, 删除数量, 新增域名按顶级域的计数, 删除域名按顶级域的计数)，
+               count_tlds 为 False 时两个计数为 None
+    """
+    added_tlds = Counter() if count_tlds else None
+    removed_tlds = Counter() if count_tlds else None
+    removed_fp = open(removed_part_file, "wb") if removed_part_file else None
+    try:
+        with open(part_file, "wb") as out_fp:
+            added_fp = _TldCountingWriter(out_fp, added_tlds) if count_tlds else out_fp
+            if count_tlds and removed_fp is not None:
+                removed_fp = _TldCountingWriter(removed_fp, removed_tlds)
+            added, removed = _diff_chunk(new_chunk_file, old_chunk_file, added_fp, diff_engine, removed_fp)
+        return added, removed, added_tlds, removed_tlds
+    finally:
+        if removed_fp is not None:
+            removed_fp.close()
 
-    print(f"新增域名总数: {total_new_domains}")
-    return total_new_domains
+
+class _TldCountingWriter:
+    """
+    包装二进制输出文件，写入域名的同时按顶级域（最后一个点号之后的部分）累加到 counts；
+    各比较引擎每次写入的都是完整的行
+    """
+
+    def __init__(self, fp, counts):
+        self._fp = fp
+        self._counts = counts
+
+    def write(self, data):
+        self._counts.update(line.rpartition(b".")[2] for line in data.split(b"\n") if line)
+        return self._fp.write(data)
+
+    def writelines(self, lines):
+        lines = list(lines)
+        self._counts.update(line.rstrip(b"\n").rpartition(b".")[2] for line in lines)
+        self._fp.writelines(lines)
+
+    def close(self):
+        self._fp.close()
+
+
+def _write_tld_counts(added_tlds, removed_tlds, counts_file):
+    """把按顶级域统计的新增和删除数量（bytes 顶级域到数量的 Counter）写入 JSON 文件，并打印变化最多的顶级域"""
+    added = {tld.decode("utf-8"): count for tld, count in added_tlds.items()}
+    removed = {tld.decode("utf-8"): count for tld, count in removed_tlds.items()}
+    counts = {
+        tld: {"added": added.get(tld, 0), "removed": removed.get(tld, 0)}
+        for tld in sorted(set(added) | set(removed))
+    }
+    temp_file = counts_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as fp:
+        json.dump(counts, fp, ensure_ascii=False, indent=2)
+    os.replace(temp_file, counts_file)
+
+    busiest = sorted(counts.items(), key=lambda item: item[1]["added"] + item[1]["removed"], reverse=True)
+    print(f"各顶级域的新增和删除数量已保存到: {counts_file}")
+    for tld, tld_counts in busiest[:_TLD_COUNTS_SHOWN]:
+        print(f"  {tld}: 新增 {tld_counts['added']}，删除 {tld_counts['removed']}")
+
+
+def _print_memory_estimate(chunk_files, workers, action):
+    """
+    打印并行处理的峰值内存估算：每个进程同时最多把一个块载入集合，
+    峰值约为 进程数 × 最大块载入集合后的大小
+    """
+    existing = [chunk_file for chunk_file in chunk_files if os.path.exists(chunk_file)]
+    if not existing:
+        return
+    largest = max(existing, key=os.path.getsize)
+    per_chunk = _estimate_set_bytes(largest)
+    print(f"使用 {workers} 个进程{action}块文件（{_set_implementation()}），最大的块 {os.path.getsize(largest) / (1024 * 1024):.1f} MB，"
+          f"预计峰值内存约 {workers * per_chunk / (1024 * 1024):.0f} MB")
+
+
+def _set_implementation():
+    """返回 set 引擎的去重和比较使用的集合实现，用于运行摘要"""
+    if FINGERPRINT_SETS:
+        return "指纹集合，NumPy"
+    return "str 集合，未安装 numpy"
+
+
+def _estimate_set_bytes(chunk_file, sample_bytes=1024 * 1024):
+    """按文件开头的平均行长估算一个块文件载入集合（安装了 numpy 时为指纹集合）后占用的内存"""
+    size = os.path.getsize(chunk_file)
+    with open(chunk_file, "rb") as fp:
+        sample = fp.read(sample_bytes)
+    lines = sample.count(b"\n")
+    if not lines:
+        return size
+    line_length = len(sample) / lines
+    if FINGERPRINT_SETS:
+        return int(size / line_length * FINGERPRINT_BYTES_PER_DOMAIN)
+    # 每个域名一个 str 对象（sys.getsizeof 为 41 + 长度）加上集合中约 40 字节的槽位
+    per_domain = sys.getsizeof("") + (line_length - 1) + _SET_SLOT_BYTES
+    return int(size / line_length * per_domain)
 
 
 def _prepare_chunk_dir(chunk_dir):
@@ -242,66 +506,137 @@ def _open_chunk_files(chunk_dir, num_chunks):
     return chunk_files
 
 
-def _process_tld_file_for_chunking(file_path, chunk_files, num_chunks, batch_size):
-    """读取TLD文件，按批次写入对应块"""
+def _process_tld_file_for_chunking(file_path, chunk_files, partitioner, batch_size, start=0, end=None):
+    """
+    读取TLD文件（或其中 [start, end) 字节区间），用字节模式扫描器按块写入对应块
+    相邻的相同域名只写入一次，块文件随后会去重，去重后的结果不变
+    """
     total = 0
-    batch = []
+    for block in iter_line_blocks(file_path, start, end):
+        _, domains = scan_block(block, collapse=True)
+        total += _write_domains_to_chunks(domains, chunk_files, partitioner)
+    return total
 
-    with open(file_path, "r", encoding="utf-8") as infile:
-        for line in infile:
-            batch.append(line)
-            if len(batch) >= batch_size:
-                total += _flush_lines_to_chunks(batch, chunk_files, num_chunks)
-                batch = []
 
-        if batch:
-            total += _flush_lines_to_chunks(batch, chunk_files, num_chunks)
+def _chunk_file_range(file_path, start, end, range_dir, partitioner, batch_size):
+    """在子进程中把文件的一个区间分块写入 range_dir"""
+    _prepare_chunk_dir(range_dir)
+    chunk_files = _open_chunk_files(range_dir, partitioner.num_chunks)
+    try:
+        return _process_tld_file_for_chunking(file_path, chunk_files, partitioner, batch_size, start, end)
+    finally:
+        for fp in chunk_files.values():
+            fp.close()
+
 
+def _process_tld_file_ranges_for_chunking(executor, file_path, ranges, chunk_dir, chunk_files, partitioner,
+                                          batch_size):
+    """并行分块一个大文件的各个区间，再按区间顺序把结果追加到对应块"""
+    range_root = os.path.join(chunk_dir, ".ranges")
+    range_dirs = [os.path.join(range_root, f"range_{index:03d}") for index in range(len(ranges))]
+    try:
+        futures = [
+            executor.submit(_chunk_file_range, file_path, start, end, range_dir, partitioner, batch_size)
+            for (start, end), range_dir in zip(ranges, range_dirs)
+        ]
+        total = sum(future.result() for future in futures)
+
+        for chunk_id, fp in chunk_files.items():
+            for range_dir in range_dirs:
+                with open(os.path.join(range_dir, f"chunk_{chunk_id:03d}.txt"), "r", encoding="utf-8") as part:
+                    shutil.copyfileobj(part, fp, 1024 * 1024)
+    finally:
+        shutil.rmtree(range_root, ignore_errors=True)
     return total
 
 
-def _flush_lines_to_chunks(lines, chunk_files, num_chunks):
-    """将一批原始行写入对应块"""
-    processed = 0
-    for raw_line in lines:
-        columns = raw_line.strip().split()
-        if not columns:
-            continue
-        domain = normalize_domain(columns[0])
-        if not domain or not filter_domain(domain):
-            continue
-        chunk_id = hash_domain(domain, num_chunks)
-        chunk_files[chunk_id].write(domain + "\n")
-        processed += 1
-    return processed
+def _write_domains_to_chunks(domains, chunk_files, partitioner):
+    """将一批已过滤的域名（bytes）按 partitioner 的哈希写入对应块，每个块只写一次"""
+    grouped = {}
+    for domain, chunk_id in zip(domains, partitioner.chunk_ids(domains)):
+        lines = grouped.get(chunk_id)
+        if lines is None:
+            grouped[chunk_id] = [domain]
+        else:
+            lines.append(domain)
+    for chunk_id, lines in grouped.items():
+        chunk_files[chunk_id].write(b"\n".join(lines).decode("utf-8") + "\n")
+    return len(domains)
 
 
-def _deduplicate_chunk_files(chunk_dir):
-    """对目录内的块文件逐个去重"""
+def _deduplicate_chunk_files(chunk_dir, workers=None, sort_chunks=False, memory_budget=DEFAULT_SORT_MEMORY_BYTES):
+    """
+    对目录内的块文件去重，workers 大于 1 时各块在进程池中并行处理；None 表示使用 CPU 核数
+    sort_chunks 为 True 时同时排序，超过 memory_budget 的块使用外部排序
+    """
     chunk_files = sorted(glob.glob(os.path.join(chunk_dir, "chunk_*.txt")))
-    for chunk_file in chunk_files:
-        _deduplicate_chunk_file(chunk_file)
+    if not chunk_files:
+        return
+    workers = min(workers or os.cpu_count() or 1, len(chunk_files))
+    _print_memory_estimate(chunk_files, workers, "去重")
+
+    if sort_chunks:
+        arguments = (sort_unique_chunk_file, chunk_files, [memory_budget] * len(chunk_files))
+    else:
+        arguments = (_deduplicate_chunk_file, chunk_files)
+    if workers <= 1:
+        _print_dedupe_results(chunk_files, map(*arguments))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        _print_dedupe_results(chunk_files, executor.map(*arguments))
+
+
+def _print_dedupe_results(chunk_files, results):
+    for chunk_file, (kept, duplicates) in zip(chunk_files, results):
+        print(f"  {os.path.basename(chunk_file)} 去重完成, 保留 {kept} 个域名, 去除 {duplicates} 个重复")
 
 
 def _deduplicate_chunk_file(chunk_file):
-    """读取块文件，去除重复域名"""
+    """
+    读取块文件，去除重复域名
+    先只读取并统计，只有发现重复（或空行）时才重写文件，没有重复的块不产生写入
+    安装了 numpy 时使用指纹集合（见 scripts.fingerprint_set），结果相同
+
+    Returns:
+        tuple: (保留的域名数, 去除的重复数)
+    """
+    if FINGERPRINT_SETS:
+        return deduplicate_chunk_file_with_fingerprints(chunk_file)
     seen = set()
     duplicates = 0
-    temp_file = chunk_file + ".tmp"
+    needs_rewrite = False
 
-    with open(chunk_file, "r", encoding="utf-8") as infile, open(temp_file, "w", encoding="utf-8") as outfile:
+    with open(chunk_file, "r", encoding="utf-8") as infile:
         for line in infile:
             domain = line.strip()
-            if not domain:
-                continue
+            if not domain or domain + "\n" != line:
+                needs_rewrite = True
+                if not domain:
+                    continue
             if domain not in seen:
                 seen.add(domain)
-                outfile.write(domain + "\n")
             else:
                 duplicates += 1
 
+    kept = len(seen)
+    if duplicates or needs_rewrite:
+        # 重写时会重新建立集合，先释放这一份
+        seen.clear()
+        _rewrite_unique_domains(chunk_file)
+    return kept, duplicates
+
+
+def _rewrite_unique_domains(chunk_file):
+    """重写块文件，只保留每个域名第一次出现的行"""
+    seen = set()
+    temp_file = chunk_file + ".tmp"
+    with open(chunk_file, "r", encoding="utf-8") as infile, open(temp_file, "w", encoding="utf-8") as outfile:
+        for line in infile:
+            domain = line.strip()
+            if domain and domain not in seen:
+                seen.add(domain)
+                outfile.write(domain + "\n")
     os.replace(temp_file, chunk_file)
-    print(f"  {os.path.basename(chunk_file)} 去重完成, 保留 {len(seen)} 个域名, 去除 {duplicates} 个重复")
 
 
 def _load_domains_to_set(chunk_file):
@@ -318,8 +653,11 @@ def _load_domains_to_set(chunk_file):
     return domains
 
 
-def _write_new_domains_from_chunk(new_chunk_file, old_domains, out_fp):
-    """将不在旧集合中的域名写入输出文件"""
+def _write_new_domains_from_chunk(new_chunk_file, old_domains, out_fp, discard_found=False):
+    """
+    将不在旧集合中的域名写入输出文件（二进制模式）
+    discard_found 为 True 时从旧集合中去掉新块中出现过的域名（块已去重，每个域名只出现一次）
+    """
     added = 0
     with open(new_chunk_file, "r", encoding="utf-8") as infile:
         for line in infile:
@@ -327,11 +665,28 @@ def _write_new_domains_from_chunk(new_chunk_file, old_domains, out_fp):
             if not domain:
                 continue
             if domain not in old_domains:
-                out_fp.write(domain + "\n")
+                out_fp.write((domain + "\n").encode("utf-8"))
                 added += 1
+            elif discard_found:
+                old_domains.discard(domain)
     return added
 
 
+def _write_remaining_domains(old_chunk_file, remaining, removed_fp):
+    """按旧块的顺序把仍在 remaining 集合中的域名写入 removed_fp（二进制模式），返回写出的数量"""
+    removed = 0
+    if not remaining:
+        return removed
+    with open(old_chunk_file, "r", encoding="utf-8") as infile:
+        for line in infile:
+            domain = line.strip()
+            if domain in remaining:
+                remaining.discard(domain)
+                removed_fp.write((domain + "\n").encode("utf-8"))
+                removed += 1
+    return removed
+
+
 def diff_domains():
     tlds = get_tlds_from_config()
     
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+域名快照：把一天的全部域名保存为一个排好序的二进制文件，通过 mmap 读取
+
+文件格式（小端）:
+    头部    magic(8) 版本(u32) 每块域名数(u32) 域名数(u64) 块数(u64) 索引偏移(u64) 元数据长度(u32) 元数据(JSON)
+    数据块  每块最多 block_size 个域名，前缀压缩：第一个域名为 varint 长度 + 内容，
+            之后每个域名为 varint 与前一个域名相同的前缀长度 + varint 后缀长度 + 后缀
+    索引    每块的起始偏移（u64），查找时对各块的第一个域名二分，再解码一个块
+
+元数据记录生成快照的块目录的分区方式（layout.json 的内容）
+
+使用方法:
+python -m scripts.domain_snapshot build output/domain-chunks/new output/domain-chunks/new.snap
+python -m scripts.domain_snapshot info output/domain-chunks/old.snap
+python -m scripts.domain_snapshot contains output/domain-chunks/old.snap example.com
+python -m scripts.domain_snapshot diff output/domain-chunks/new.snap output/domain-chunks/old.snap added.txt
+"""
+
+import argparse
+import glob
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
+
+from scripts.chunk_layout import is_sorted_chunk_directory, read_layout
+from scripts.sorted_chunks import DEFAULT_SORT_MEMORY_BYTES, sort_chunk_directory
+
+SNAPSHOT_MAGIC = b"CZDSSNAP"
+SNAPSHOT_VERSION = 1
+DEFAULT_BLOCK_SIZE = 64
+_HEADER = struct.Struct("<8sIIQQQI")
+_OFFSET = struct.Struct("<Q")
+_WRITE_BATCH_SIZE = 10000
+
+
+def _encode_varint(value):
+    encoded = bytearray()
+    while value >= 0x80:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def _decode_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class SnapshotWriter:
+    """
+    按顺序写入快照，域名（bytes）必须严格递增；close() 后才写入索引和头部，
+    内容先写入临时文件，完成后再替换目标文件
+    """
+
+    def __init__(self, path, block_size=DEFAULT_BLOCK_SIZE, metadata=None):
+        self.path = path
+        self.block_size = block_size
+        self.count = 0
+        self._metadata = json.dumps(metadata or {}).encode("utf-8")
+        self._offsets = []
+        self._previous = None
+        self._pending = []
+        self._fp = open(path + ".tmp", "wb")
+        self._fp.write(b"\0" * (_HEADER.size + len(self._metadata)))
+        self._position = self._fp.tell()
+
+    def add(self, domain):
+        if self._previous is not None and domain <= self._previous:
+            raise ValueError(f"快照中的域名必须严格递增: {self._previous!r} 之后是 {domain!r}")
+        if self.count % self.block_size == 0:
+            self._offsets.append(self._position)
+            encoded = _encode_varint(len(domain)) + domain
+        else:
+            previous = self._previous
+            shared = 0
+            limit = min(len(previous), len(domain))
+            while shared < limit and previous[shared] == domain[shared]:
+                shared += 1
+            encoded = _encode_varint(shared) + _encode_varint(len(domain) - shared) + domain[shared:]
+        self._pending.append(encoded)
+        self._position += len(encoded)
+        self._previous = domain
+        self.count += 1
+        if len(self._pending) >= _WRITE_BATCH_SIZE:
+            self._fp.write(b"".join(self._pending))
+            self._pending = []
+
+    def close(self):
+        self._fp.write(b"".join(self._pending))
+        self._pending = []
+        index_offset = self._fp.tell()
+        self._fp.write(b"".join(_OFFSET.pack(offset) for offset in self._offsets))
+        self._fp.seek(0)
+        self._fp.write(_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.block_size, self.count, len(self._offsets), index_offset,
+            len(self._metadata),
+        ))
+        self._fp.write(self._metadata)
+        self._fp.close()
+        os.replace(self.path + ".tmp", self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._fp.close()
+            os.remove(self.path + ".tmp")
+
+
+class DomainSnapshot:
+    """
+    只读打开快照文件（mmap），支持顺序遍历和 O(log n) 的成员查询
+
+    Example:
+        with DomainSnapshot("output/domain-chunks/old.snap") as snapshot:
+            "example.com" in snapshot
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fp = open(path, "rb")
+        self._data = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._data) < _HEADER.size:
+            self.close()
+            raise ValueError(f"{path} 不是域名快照文件")
+        (magic, version, self.block_size, self.count, self.block_count, self._index_offset,
+         metadata_length) = _HEADER.unpack_from(self._data, 0)
+        if magic != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} 不是域名快照文件")
+        if version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"{path} 的版本 {version} 无法识别")
+        self.metadata = json.loads(self._data[_HEADER.size:_HEADER.size + metadata_length])
+
+    def _block_offset(self, block):
+        return _OFFSET.unpack_from(self._data, self._index_offset + block * _OFFSET.size)[0]
+
+    def _first_domain(self, block):
+        length, offset = _decode_varint(self._data, self._block_offset(block))
+        return self._data[offset:offset + length]
+
+    def _iter_block(self, block):
+        data = self._data
+        offset = self._block_offset(block)
+        count = min(self.block_size, self.count - block * self.block_size)
+        length, offset = _decode_varint(data, offset)
+        domain = data[offset:offset + length]
+        offset += length
+        yield domain
+        for _ in range(count - 1):
+            shared, offset = _decode_varint(data, offset)
+            length, offset = _decode_varint(data, offset)
+            domain = domain[:shared] + data[offset:offset + length]
+            offset += length
+            yield domain
+
+    def __iter__(self):
+        """按顺序遍历全部域名（bytes）"""
+        for block in range(self.block_count):
+            yield from self._iter_block(block)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, domain):
+        if isinstance(domain, str):
+            domain = domain.encode("utf-8")
+        # 找到第一个域名不大于 domain 的最后一个块
+        low, high = 0, self.block_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._first_domain(middle) <= domain:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return False
+        for candidate in self._iter_block(low - 1):
+            if candidate >= domain:
+                return candidate == domain
+        return False
+
+    def close(self):
+        if getattr(self, "_data", None) is not None:
+            self._data.close()
+            self._data = None
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def write_snapshot_from_chunk_directory(chunk_dir, path, workers=None, memory_budget=DEFAULT_SORT_MEMORY_BYTES,
+                                        block_size=DEFAULT_BLOCK_SIZE):
+    """
+    把块目录中的全部域名写为一个快照：块文件先排好序（已排序的目录不再处理），再多路归并为全局有序
+
+    不同的块没有相同的域名，归并结果不需要再去重
+
+    Returns:
+        int: 写入的域名数
+    """
+    layout = read_layout(chunk_dir)
+    if layout is None:
+        print(f"块目录 {chunk_dir} 中没有块文件，不生成快照")
+        return 0
+    if not is_sorted_chunk_directory(chunk_dir):
+        print(f"块目录 {chunk_dir} 没有排序，正在排序...")
+        sort_chunk_directory(chunk_dir, workers, memory_budget)
+
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    chunk_files = [open(chunk_file, "rb") for chunk_file in sorted(glob.glob(os.path.join(chunk_dir, "chunk_*.txt")))]
+    try:
+        with SnapshotWriter(path, block_size, metadata=layout.layout()) as writer:
+            for line in heapq.merge(*chunk_files):
+                writer.add(line.rstrip(b"\n"))
+    finally:
+        for fp in chunk_files:
+            fp.close()
+    print(f"已把 {writer.count} 个域名写入快照 {path}（{os.path.getsize(path) / (1024 * 1024):.1f} MB）")
+    return writer.count
+
+
+def diff_snapshots(new_path, old_path, output_file):
+    """
+    顺序归并两个快照，把只在新快照中出现的域名按顺序写入 output_file；旧快照不存在时全部视为新增
+
+    Returns:
+        int: 新增的域名数
+    """
+    added = 0
+    batch = []
+    with DomainSnapshot(new_path) as new_snapshot, open(output_file, "wb") as out_fp:
+        old_snapshot = DomainSnapshot(old_path) if os.path.exists(old_path) else None
+        try:
+            old_domains = iter(old_snapshot) if old_snapshot is not None else iter(())
+            old = next(old_domains, None)
+            for domain in new_snapshot:
+                while old is not None and old < domain:
+                    old = next(old_domains, None)
+                if old != domain:
+                    batch.append(domain + b"\n")
+                    if len(batch) >= _WRITE_BATCH_SIZE:
+                        out_fp.writelines(batch)
+                        added += len(batch)
+                        batch = []
+            out_fp.writelines(batch)
+            added += len(batch)
+        finally:
+            if old_snapshot is not None:
+                old_snapshot.close()
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="域名快照工具")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="把块目录写为快照")
+    build.add_argument("chunk_dir")
+    build.add_argument("snapshot")
+    info = commands.add_parser("info", help="显示快照的域名数、块数和分区方式")
+    info.add_argument("snapshot")
+    contains = commands.add_parser("contains", help="查询域名是否在快照中")
+    contains.add_argument("snapshot")
+    contains.add_argument("domains", nargs="+")
+    diff = commands.add_parser("diff", help="找出只在新快照中出现的域名")
+    diff.add_argument("new_snapshot")
+    diff.add_argument("old_snapshot")
+    diff.add_argument("output_file")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        write_snapshot_from_chunk_directory(args.chunk_dir, args.snapshot)
+    elif args.command == "info":
+        with DomainSnapshot(args.snapshot) as snapshot:
+            print(f"域名数: {len(snapshot)}，块数: {snapshot.block_count}，每块 {snapshot.block_size} 个域名，"
+                  f"文件大小: {os.path.getsize(args.snapshot) / (1024 * 1024):.1f} MB，分区方式: {snapshot.metadata}")
+    elif args.command == "contains":
+        with DomainSnapshot(args.snapshot) as snapshot:
+            for domain in args.domains:
+                print(f"{domain}: {'存在' if domain.lower().rstrip('.') in snapshot else '不存在'}")
+    else:
+        added = diff_snapshots(args.new_snapshot, args.old_snapshot, args.output_file)
+        print(f"新增域名总数: {added}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,11 +15,19 @@ python3 extract_first_column.py [输入目录] [输出目录]
 import os
 import sys
 import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from app_config.constant import DIR_DOWNLOAD_001, DIR_OUTPUT_DOMAINS_001
-from scripts.filter import normalize_domain, filter_domain
+from scripts.file_ranges import concatenate_files, split_file_ranges
+from scripts.filter import filter_domain, format_reject_counts, get_domain_filter, normalize_domain
+from scripts.zone_scanner import ZoneOwnerScanner, iter_line_blocks, scan_block
 
-def extract_first_column_from_directory(input_dir, output_dir, batch_size=5000):
+# 处理汇总中列出的耗时最长的文件数
+_SLOWEST_FILES_SHOWN = 10
+
+def extract_first_column_from_directory(input_dir, output_dir, batch_size=5000, skip_files=None, workers=None,
+                                        zone_aware=False, ns_only=False):
     """
     处理目录下所有.txt文件，只保留每行第一列的域名，并避免重复
     
@@ -27,6 +35,10 @@ def extract_first_column_from_directory(input_dir, output_dir, batch_size=5000):
         input_dir (str): 输入目录路径
         output_dir (str): 输出目录路径
         batch_size (int): 批处理大小，用于控制内存使用
+        skip_files (set): 内容未变化的文件名集合，输出文件已存在时直接复用
+        workers (int): 并行处理的进程数，默认为 CPU 核数；1 表示在当前进程中逐个处理
+        zone_aware (bool): 识别记录类型列，每个 owner 只输出一次，并去掉 apex 和 glue 记录
+        ns_only (bool): zone_aware 模式下只保留带 NS 记录的 owner
     """
     # 检查输入目录是否存在
     if not os.path.exists(input_dir):
@@ -47,91 +59,199 @@ def extract_first_column_from_directory(input_dir, output_dir, batch_size=5000):
     
     # 按文件处理，减少内存占用
     processed_files = 0
+    reused_files = 0
+    pending_files = []
     for txt_file in txt_files:
-        print(f"正在处理文件: {txt_file}")
-        
         # 获取输出文件路径
         filename = os.path.basename(txt_file)
         output_file = os.path.join(output_dir, filename)
-        
-        # 处理当前文件
-        if _process_file_with_grouping(txt_file, output_file, batch_size):
+
+        if skip_files and filename in skip_files and os.path.exists(output_file):
+            print(f"文件未变化，复用已有输出: {output_file}")
             processed_files += 1
+            reused_files += 1
+            continue
+        pending_files.append((txt_file, output_file))
+
+    # 最大的文件最先开始，避免它成为最后的长尾
+    pending_files.sort(key=lambda item: os.path.getsize(item[0]), reverse=True)
+    workers = workers or os.cpu_count() or 1
+
+    summary = {'total_lines': 0, 'total_processed': 0, 'total_numeric_start': 0, 'total_dash_start': 0}
+    rejected = {}
+    file_seconds = []
+    for txt_file, output_file, stats in _process_files(pending_files, batch_size, workers, zone_aware, ns_only):
+        if stats is None:
+            continue
+        _print_file_stats(txt_file, output_file, stats)
+        for key in summary:
+            summary[key] += stats[key]
+        for reason, count in stats['rejected'].items():
+            rejected[reason] = rejected.get(reason, 0) + count
+        file_seconds.append((stats['seconds'], os.path.basename(txt_file)))
+        processed_files += 1
     
     print(f"\n处理完成! 成功处理 {processed_files}/{len(txt_files)} 个文件")
+    if reused_files:
+        print(f"其中 {reused_files} 个文件未变化，复用了上次的输出")
+    print(f"共读取 {summary['total_lines']} 行，写出 {summary['total_processed']} 个域名"
+          f"（以数字开头 {summary['total_numeric_start']}，以连字符开头 {summary['total_dash_start']}，"
+          f"进程数 {workers}）")
+    print(f"过滤规则拒绝: {format_reject_counts(rejected)}")
+    if file_seconds:
+        slowest = sorted(file_seconds, reverse=True)[:_SLOWEST_FILES_SHOWN]
+        print("耗时最长的文件: " + "，".join(f"{name} {seconds:.2f} 秒" for seconds, name in slowest))
     print(f"输出目录: {output_dir}")
     
     return True
 
 
-def _process_file_with_grouping(input_file, output_file, batch_size=5000):
+def _process_files(files, batch_size, workers, zone_aware=False, ns_only=False):
+    """
+    处理 (输入文件, 输出文件) 列表，按完成顺序产出 (输入文件, 输出文件, 统计信息)
+
+    并行时大文件按换行符对齐的字节区间切分，每个区间写入单独的临时文件，
+    全部完成后按区间顺序拼接，内容与逐个处理时完全相同
+    """
+    if workers <= 1:
+        for txt_file, output_file in files:
+            print(f"正在处理文件: {txt_file}")
+            yield txt_file, output_file, _process_file_with_grouping(
+                txt_file, output_file, batch_size, zone_aware=zone_aware, ns_only=ns_only
+            )
+        return
+
+    tasks = []
+    pending = {}
+    for txt_file, output_file in files:
+        ranges = split_file_ranges(txt_file, workers)
+        if len(ranges) == 1:
+            part_files = [output_file]
+        else:
+            print(f"文件 {txt_file} 切分为 {len(ranges)} 个区间并行处理")
+            part_files = [f"{output_file}.part{index:03d}" for index in range(len(ranges))]
+        pending[txt_file] = {'output_file': output_file, 'part_files': part_files, 'stats': [None] * len(ranges)}
+        for index, (start, end) in enumerate(ranges):
+            tasks.append((end - start, txt_file, index, start, end))
+    # 最大的区间最先开始
+    tasks.sort(key=lambda task: task[0], reverse=True)
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        futures = {}
+        for _, txt_file, index, start, end in tasks:
+            part_file = pending[txt_file]['part_files'][index]
+            future = executor.submit(
+                _process_file_with_grouping, txt_file, part_file, batch_size, start, end, zone_aware, ns_only
+            )
+            futures[future] = (txt_file, index)
+
+        remaining = {txt_file: len(item['part_files']) for txt_file, item in pending.items()}
+        for future in as_completed(futures):
+            txt_file, index = futures[future]
+            item = pending[txt_file]
+            item['stats'][index] = future.result()
+            remaining[txt_file] -= 1
+            if remaining[txt_file]:
+                continue
+            yield txt_file, item['output_file'], _merge_range_results(item)
+
+
+def _merge_range_results(item):
+    """合并同一文件各区间的输出和统计信息，任一区间失败时整个文件失败"""
+    output_file = item['output_file']
+    part_files = item['part_files']
+    range_stats = item['stats']
+    if part_files == [output_file]:
+        return range_stats[0]
+
+    if any(stats is None for stats in range_stats):
+        for part_file in part_files:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+        return None
+
+    concatenate_files(part_files, output_file)
+    merged = {
+        key: sum(stats[key] for stats in range_stats) for key in range_stats[0] if key not in ('seconds', 'rejected')
+    }
+    merged['seconds'] = max(stats['seconds'] for stats in range_stats)
+    merged['rejected'] = {
+        reason: sum(stats['rejected'][reason] for stats in range_stats) for reason in range_stats[0]['rejected']
+    }
+    return merged
+
+
+def _print_file_stats(input_file, output_file, stats):
+    print(f"已处理文件: {input_file} ({stats['seconds']:.2f} 秒)")
+    print(f"  总共读取 {stats['total_lines']} 行数据")
+    print(f"  处理后域名数: {stats['total_processed']}")
+    print(f"  以数字开头: {stats['total_numeric_start']}")
+    print(f"  以连字符开头: {stats['total_dash_start']}")
+    print(f"  过滤规则拒绝: {format_reject_counts(stats['rejected'])}")
+    print(f"  已生成文件: {output_file}")
+
+
+def _process_file_with_grouping(input_file, output_file, batch_size=5000, start=0, end=None, zone_aware=False,
+                                ns_only=False):
     """
     处理单个TLD文件，提取第一列域名并写入输出文件
+    使用字节模式扫描器（scripts.zone_scanner），输出与逐行文本处理完全相同
     
     Args:
         input_file (str): 输入文件路径
         output_file (str): 输出文件路径
-        batch_size (int): 批处理大小，用于控制读取缓冲
+        batch_size (int): 保留参数，扫描按 zone_scanner.SCAN_BLOCK_SIZE 字节分块
+        start (int): 只处理从该字节开始的部分（必须是行首）
+        end (int): 处理到该字节为止（不含），None 表示文件末尾
+        zone_aware (bool): 使用 ZoneOwnerScanner，每个 owner 只输出一次，并去掉 apex 和 glue 记录
+        ns_only (bool): zone_aware 模式下只保留带 NS 记录的 owner
         
     Returns:
-        bool: 是否处理成功
+        dict: 统计信息（读取行数、写出域名数、以数字/连字符开头的域名数、各过滤规则拒绝的域名数、耗时），
+              出错时返回 None
     """
     try:
+        started = time.perf_counter()
+        domain_filter = get_domain_filter()
+        counters_before = domain_filter.counters()
         total_lines = 0
         total_processed = 0
-        total_numeric_start = 0
-        total_dash_start = 0
-
-        print("  正在读取并写出域名...")
-
-        with open(input_file, 'r', encoding='utf-8') as infile, open(output_file, 'w', encoding='utf-8') as outfile:
-            batch_lines = []
-
-            def flush_batch(lines):
-                nonlocal total_processed, total_numeric_start, total_dash_start
-                for raw_line in lines:
-                    columns = raw_line.split()
-                    if not columns:
-                        continue
-                    first_column = normalize_domain(columns[0])
-                    if not first_column:
-                        continue
-                    if not filter_domain(first_column):
-                        continue
-
-                    outfile.write(first_column + '\n')
-                    total_processed += 1
-
-                    if first_column and first_column[0].isdigit():
-                        total_numeric_start += 1
-                    elif first_column and first_column[0] == '-':
-                        total_dash_start += 1
-
-            for line in infile:
-                line = line.strip()
-                if not line:
-                    continue
-                total_lines += 1
-                batch_lines.append(line)
 
-                if len(batch_lines) >= batch_size:
-                    flush_batch(batch_lines)
-                    batch_lines = []
+        scanner = ZoneOwnerScanner(ns_only=ns_only) if zone_aware else None
 
-            if batch_lines:
-                flush_batch(batch_lines)
+        with open(output_file, 'wb') as outfile:
+            def write_domains(domains):
+                nonlocal total_processed
+                if domains:
+                    outfile.write(b"\n".join(domains))
+                    outfile.write(b"\n")
+                    total_processed += len(domains)
 
-        print(f"  总共读取 {total_lines} 行数据")
-        print(f"  处理后域名数: {total_processed}")
-        print(f"  以数字开头: {total_numeric_start}")
-        print(f"  以连字符开头: {total_dash_start}")
-        print(f"  已生成文件: {output_file}")
+            for block in iter_line_blocks(input_file, start, end):
+                if scanner is not None:
+                    line_count, domains = scanner.scan(block)
+                else:
+                    line_count, domains = scan_block(block)
+                total_lines += line_count
+                write_domains(domains)
+            if scanner is not None:
+                write_domains(scanner.finish())
 
-        return True
+        return {
+            'total_lines': total_lines,
+            'total_processed': total_processed,
+            # filter_domain 会过滤掉以数字或连字符开头的域名，这两项恒为 0，保留以兼容原有统计输出
+            'total_numeric_start': 0,
+            'total_dash_start': 0,
+            'rejected': {
+                reason: count - counters_before[reason] for reason, count in domain_filter.counters().items()
+            },
+            'seconds': time.perf_counter() - started,
+        }
 
     except Exception as e:
         print(f"处理文件 {input_file} 时出错: {e}")
-        return False
+        return None
 
 
 def extract_first_column_from_file_batched(input_file, output_file, batch_size=10000):
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+把大文件切分成按换行符对齐的字节区间，每个区间可以在单独的进程中按行处理
+（见 scripts.zone_scanner.iter_line_blocks），
+处理结果再按区间顺序拼接，结果与逐行顺序处理完全相同
+"""
+
+import os
+import shutil
+
+# 每个区间的最小字节数，小于该值的文件不切分，避免进程调度开销超过收益
+DEFAULT_MIN_RANGE_BYTES = 64 * 1024 * 1024
+_COPY_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def split_file_ranges(path, parts, min_range_bytes=DEFAULT_MIN_RANGE_BYTES):
+    """
+    将文件切分为最多 parts 个区间，每个区间都从行首开始、在换行符之后结束，
+    并且第一列（owner）相同的相邻行不会被切到两个区间
+
+    Args:
+        path (str): 文件路径
+        parts (int): 期望的区间数量
+        min_range_bytes (int): 每个区间的最小字节数
+
+    Returns:
+        list: [(start, end), ...]，按文件顺序排列，覆盖整个文件
+    """
+    size = os.path.getsize(path)
+    parts = max(1, min(parts, size // max(1, min_range_bytes)))
+    if parts <= 1:
+        return [(0, size)]
+
+    boundaries = [0]
+    with open(path, "rb") as fp:
+        for index in range(1, parts):
+            target = size * index // parts
+            if target <= boundaries[-1]:
+                continue
+            # 从目标位置的前一个字节开始读到行尾，目标位置恰好是行首时不会跳过整行
+            fp.seek(target - 1)
+            fp.readline()
+            position = _skip_owner_group(fp, size)
+            if position >= size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _skip_owner_group(fp, size):
+    """从当前行首开始跳过与第一行 owner 相同的相邻行，返回下一个 owner 所在行的行首位置"""
+    first_owner = None
+    while True:
+        position = fp.tell()
+        line = fp.readline()
+        if not line:
+            return size
+        columns = line.split(None, 1)
+        if not columns:
+            continue
+        owner = columns[0].lower()
+        if first_owner is None:
+            first_owner = owner
+        elif owner != first_owner:
+            return position
+
+
+def concatenate_files(part_paths, output_path):
+    """按顺序拼接各区间的输出文件，然后删除它们"""
+    with open(output_path, "wb") as outfile:
+        for part_path in part_paths:
+            with open(part_path, "rb") as infile:
+                shutil.copyfileobj(infile, outfile, _COPY_BUFFER_SIZE)
+    for part_path in part_paths:
+        os.remove(part_path)
@@ -1,3 +1,34 @@
+import re
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是可选依赖，未安装时逐个域名过滤
+    np = None
+
+# 是否可以使用 numpy 向量化的批量过滤
+VECTORIZED_FILTER = np is not None
+
+# 数字和点号的 ASCII 码
+_ZERO, _NINE, _DOT = ord("0"), ord("9"), ord(".")
+
+# 默认过滤规则，可以在配置文件的 filter.rules 中逐项覆盖
+DEFAULT_FILTER_RULES = {
+    # 排除以数字开头的域名
+    "reject_leading_digit": True,
+    # 排除以这些字符开头的域名
+    "reject_leading_chars": "-",
+    # 点号的最大数量，null 表示不限制
+    "max_dots": 1,
+    # 排除含有这些子串的域名
+    "reject_substrings": ["--"],
+    # 数字的最大数量，null 表示不限制
+    "max_digits": 1,
+}
+
+# 拒绝原因，按检查顺序排列；一个域名只计入第一个不满足的规则
+REJECT_REASONS = ("empty", "leading", "dots", "substring", "digits")
+
+
 def normalize_domain(domain):
     """
     将域名标准化：去除首尾空白、移除尾部的点号并转换为小写
@@ -7,12 +38,186 @@ def normalize_domain(domain):
     normalized = domain.strip().rstrip(".")
     return normalized.lower()
 
+
+class DomainFilter:
+    """
+    按规则过滤域名，规则在创建时编译为一个正则表达式：
+    每个域名只做一次匹配，匹配成功即被拒绝，命中的分组名就是拒绝原因
+
+    rejected 按 REJECT_REASONS 统计被拒绝的记录数，checked 统计检查过的记录数：
+    按第一列抽取时每行计一次，同一 owner 的相邻记录即使只检查一次也按行数计数，
+    因此计数与分块和进程数无关；zone_aware 模式下每个 owner 组只检查一次，按 owner 计数
+    """
+
+    def __init__(self, rules=None):
+        self.rules = dict(DEFAULT_FILTER_RULES)
+        if rules:
+            unknown = set(rules) - set(DEFAULT_FILTER_RULES)
+            if unknown:
+                raise ValueError(f"未知的过滤规则: {', '.join(sorted(unknown))}")
+            self.rules.update(rules)
+
+        self._leading_chars = self.rules["reject_leading_chars"] or ""
+        self._substrings = [substring.lower() for substring in self.rules["reject_substrings"] or [] if substring]
+        self._reject_match = re.compile(self._build_reject_pattern(), re.DOTALL).match
+        self._leading_table = None
+        self._substring_pattern = None
+        if np is not None:
+            self._leading_table = np.zeros(256, dtype=bool)
+            self._leading_table[list(self._leading_chars.encode("ascii", "ignore"))] = True
+            if self.rules["reject_leading_digit"]:
+                self._leading_table[_ZERO:_NINE + 1] = True
+            if self._substrings:
+                self._substring_pattern = re.compile(
+                    b"|".join(re.escape(substring.encode("utf-8")) for substring in self._substrings)
+                )
+
+        self.checked = 0
+        self.rejected = dict.fromkeys(REJECT_REASONS, 0)
+
+    def _build_reject_pattern(self):
+        """生成拒绝规则的正则表达式（bytes），各分支按 REJECT_REASONS 的顺序排列"""
+        rules = self.rules
+        branches = [rb"(?P<empty>\Z)"]
+        leading = re.escape(self._leading_chars.encode("ascii", "ignore"))
+        if rules["reject_leading_digit"]:
+            leading += b"0-9"
+        if leading:
+            branches.append(b"(?P<leading>[" + leading + b"])")
+        if rules["max_dots"] is not None:
+            branches.append(rb"(?P<dots>(?:[^.]*\.){%d})" % (rules["max_dots"] + 1))
+        if self._substrings:
+            alternatives = b"|".join(re.escape(substring.encode("utf-8")) for substring in self._substrings)
+            branches.append(rb"(?P<substring>.*?(?:" + alternatives + b"))")
+        if rules["max_digits"] is not None:
+            branches.append(rb"(?P<digits>(?:[^0-9]*[0-9]){%d})" % (rules["max_digits"] + 1))
+        return b"|".join(branches)
+
+    def reject_reason(self, domain):
+        """
+        检查一个已标准化的域名（str），返回拒绝原因，保留时返回 None
+
+        数字按 str.isdigit 判断，与原来的 filter_domain 相同
+        """
+        rules = self.rules
+        if not domain:
+            return "empty"
+        if (rules["reject_leading_digit"] and domain[0].isdigit()) or domain[0] in self._leading_chars:
+            return "leading"
+        if rules["max_dots"] is not None and domain.count(".") > rules["max_dots"]:
+            return "dots"
+        if any(substring in domain for substring in self._substrings):
+            return "substring"
+        if rules["max_digits"] is not None and sum(1 for char in domain if char.isdigit()) > rules["max_digits"]:
+            return "digits"
+        return None
+
+    def accept(self, domain):
+        """检查一个域名（str），会先做标准化"""
+        reason = self.reject_reason(normalize_domain(domain))
+        self.checked += 1
+        if reason is None:
+            return True
+        self.rejected[reason] += 1
+        return False
+
+    def mask(self, domains, weights=None):
+        """
+        对已标准化的 ASCII 域名（bytes，小写、无首尾空白和尾部点号）批量应用规则
+
+        weights 为每个域名代表的记录数（相邻的相同 token 只检查一次时），计数器按记录数累加；
+        None 表示每个域名一条记录
+
+        Returns:
+            list: 与 domains 等长的 bool 列表，True 表示保留该域名
+        """
+        if not domains:
+            return []
+        self.checked += len(domains) if weights is None else sum(weights)
+        if np is not None:
+            return self._numpy_mask(domains, weights)
+
+        rejected = self.rejected
+        matches = list(map(self._reject_match, domains))
+        for match, weight in zip(matches, weights or [1] * len(matches)):
+            if match is not None:
+                rejected[match.lastgroup] += weight
+        return [match is None for match in matches]
+
+    def _numpy_mask(self, domains, weights=None):
+        """
+        mask 的 numpy 实现：域名以换行符连接为一个字节数组，各项规则按偏移量向量化计算，
+        换行符不会出现在域名中，因此子串和相邻字符都不会跨越两个域名
+        """
+        rules = self.rules
+        count = len(domains)
+        lengths = np.fromiter(map(len, domains), dtype=np.int64, count=count)
+        joined = b"\n".join(domains)
+        data = np.frombuffer(joined, dtype=np.uint8)
+        starts = np.zeros(count, dtype=np.int64)
+        np.cumsum(lengths[:-1] + 1, out=starts[1:])
+        ends = starts + lengths
+
+        def count_per_domain(positions):
+            # 标记位置稀疏，按位置所属的域名计数，而不是对整块数据做累加
+            owners = np.searchsorted(ends, positions, side="right")
+            return np.bincount(owners, minlength=count)
+
+        failures = [("empty", lengths == 0)]
+        # 空域名的起始位置是下一个分隔符或数组末尾，先截断再由空域名规则屏蔽
+        first = data[np.minimum(starts, len(data) - 1)] if len(data) else np.zeros(count, dtype=np.uint8)
+        failures.append(("leading", self._leading_table[first]))
+        if rules["max_dots"] is not None:
+            failures.append(("dots", count_per_domain(np.flatnonzero(data == _DOT)) > rules["max_dots"]))
+        if self._substring_pattern is not None:
+            positions = np.fromiter(
+                (match.start() for match in self._substring_pattern.finditer(joined)), dtype=np.int64
+            )
+            failures.append(("substring", count_per_domain(positions) > 0))
+        if rules["max_digits"] is not None:
+            is_digit = (data >= _ZERO) & (data <= _NINE)
+            failures.append(("digits", count_per_domain(np.flatnonzero(is_digit)) > rules["max_digits"]))
+
+        # 与正则表达式的分支顺序相同，一个域名只计入第一个不满足的规则
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.int64)
+        rejected = np.zeros(count, dtype=bool)
+        for reason, failed in failures:
+            newly_rejected = failed & ~rejected
+            if weights is None:
+                self.rejected[reason] += int(np.count_nonzero(newly_rejected))
+            else:
+                self.rejected[reason] += int(weights[newly_rejected].sum())
+            rejected |= newly_rejected
+        return (~rejected).tolist()
+
+    def counters(self):
+        """返回计数器的快照，用于计算一段处理中的增量"""
+        return {'checked': self.checked, **self.rejected}
+
+
+_domain_filter = None
+
+
+def get_domain_filter():
+    """
+    返回按配置文件 filter.rules 编译的过滤器，每个进程只编译一次
+    """
+    global _domain_filter
+    if _domain_filter is None:
+        from app_config.config import get_filter_rules_from_config
+
+        _domain_filter = DomainFilter(get_filter_rules_from_config())
+    return _domain_filter
+
+
 def filter_domain(domain):
     """
-    过滤域名：排除点号数量超过2个的域名，
+    过滤域名，默认规则：排除点号数量超过1个的域名，
             以及含有双连字符的域名，
-            以及含有数字超过2个的域名,
+            以及含有数字超过1个的域名,
             以数字或-开头的域名
+    规则可以在配置文件的 filter.rules 中修改（见 DEFAULT_FILTER_RULES）
 
     Args:
         domain (str): 域名
@@ -20,28 +225,52 @@ def filter_domain(domain):
     Returns:
         bool: True表示保留该域名，False表示过滤掉
     """
-    domain = normalize_domain(domain)
-    if not domain:
-        return False
+    return get_domain_filter().accept(domain)
 
-    # 检查是否以数字或连字符开头
-    if domain[0].isdigit() or domain[0] == '-':
-        return False
 
-    # 计算点号数量
-    dot_count = domain.count('.')
-    if dot_count > 1:
-        return False
+def filter_domains(domains):
+    """
+    批量版本的 filter_domain：对一批域名应用相同的规则
 
-    # 检查是否含有双连字符
-    has_double_dash = '--' in domain
-    if has_double_dash:
-        return False
+    ASCII 域名一次调用 DomainFilter.mask；含非 ASCII 字符的域名
+    （str.isdigit 对其他数字字符也成立）仍逐个检查
 
-    # 计算数字数量
-    digit_count = sum(1 for char in domain if char.isdigit())
-    if digit_count > 1:
-        return False
+    Args:
+        domains (list): 域名列表（str）
+
+    Returns:
+        list: 与 domains 等长的 bool 列表，True 表示保留该域名
+    """
+    domain_filter = get_domain_filter()
+    normalized = [normalize_domain(domain) for domain in domains]
+    ascii_indexes = [index for index, domain in enumerate(normalized) if domain.isascii()]
+    mask = [False] * len(normalized)
+    if len(ascii_indexes) < len(normalized):
+        for index, domain in enumerate(domains):
+            if not normalized[index].isascii():
+                mask[index] = domain_filter.accept(domain)
+
+    ascii_mask = domain_filter.mask([normalized[index].encode("ascii") for index in ascii_indexes])
+    for index, keep in zip(ascii_indexes, ascii_mask):
+        mask[index] = keep
+    return mask
+
+
+def ascii_domain_mask(domains, weights=None):
+    """
+    对已标准化的 ASCII 域名（bytes，小写、无首尾空白和尾部点号）应用 filter_domain 的规则
+
+    Args:
+        domains (list): 域名列表（bytes）
+        weights (list): 每个域名代表的记录数，用于拒绝计数，None 表示每个域名一条记录
+
+    Returns:
+        list: 与 domains 等长的 bool 列表
+    """
+    return get_domain_filter().mask(domains, weights)
 
 
-    return True
\ No newline at end of file
+def format_reject_counts(counters):
+    """把 DomainFilter.counters() 的增量格式化为一行统计"""
+    parts = [f"{reason} {counters.get(reason, 0)}" for reason in REJECT_REASONS if counters.get(reason)]
+    return "，".join(parts) if parts else "无"
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+用 64 位指纹代替 str 集合的块文件去重和比较
+
+块文件中的每个域名只保存指纹（8 字节）、在文件中的偏移（8 字节）和长度（2 字节），
+按指纹排序后用 np.searchsorted 查找，域名本身通过 mmap 留在文件里；
+指纹相同时再按偏移读取原始域名比较，因此指纹冲突不会把不同的域名当成同一个。
+每个域名常驻约 18 字节；建立时排序用的索引和副本再多 16 字节，去重时还有 1 字节的保留标记，
+峰值约 35 字节（FINGERPRINT_BYTES_PER_DOMAIN），而集合中的一个 str 约 100 字节
+
+指纹使用 Python 的 hash(bytes)，同一个进程内稳定，不会写入磁盘
+
+numpy 是可选依赖，未安装时 FINGERPRINT_SETS 为 False，去重和比较仍使用 str 集合
+"""
+
+import io
+import mmap
+import os
+import re
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是可选依赖，未安装时使用 str 集合
+    np = None
+
+# 是否可以使用指纹集合
+FINGERPRINT_SETS = np is not None
+# 建立指纹集合或去重时每个域名的峰值内存：指纹、偏移、长度 18 字节，排序的索引和副本 16 字节，
+# 去重的保留标记 1 字节；读取时另有一个读取块的临时对象（约 20 MB），与域名数无关
+FINGERPRINT_BYTES_PER_DOMAIN = 35
+_READ_BLOCK_BYTES = 4 * 1024 * 1024
+# 批量比较原始内容时每批的域名数，取出的字节索引约占 每批字节数 × 8 的内存
+_COMPARE_BATCH_SIZE = 100000
+# 去掉首尾空白后与原行不同的行：含有空白字符，或者是空行
+_UNTIDY_PATTERN = re.compile(rb"[ \t\r\x0b\x0c]|\n\n")
+
+
+def _fingerprints(domains):
+    return np.fromiter(map(hash, domains), dtype=np.int64, count=len(domains))
+
+
+def _iter_domain_blocks(path):
+    """
+    按块读取文件，每块返回 (域名列表, 域名在文件中的偏移, 域名长度, 是否有空行或首尾有空白的行)
+    域名为去掉首尾空白的 bytes，空行不返回
+
+    没有空行和空白字符的块直接按换行符切分，偏移由长度累加得到，不逐行处理
+    """
+    offset = 0
+    with open(path, "rb") as fp:
+        while True:
+            block = fp.read(_READ_BLOCK_BYTES)
+            if not block:
+                return
+            if not block.endswith(b"\n"):
+                block += fp.readline()
+            if block.endswith(b"\n") and not block.startswith(b"\n") and not _UNTIDY_PATTERN.search(block):
+                domains = block[:-1].split(b"\n")
+                lengths = np.fromiter(map(len, domains), dtype=np.int64, count=len(domains))
+                offsets = np.empty(len(domains), dtype=np.int64)
+                offsets[0] = offset
+                np.cumsum(lengths[:-1] + 1, out=offsets[1:])
+                offsets[1:] += offset
+                yield domains, offsets, lengths, False
+            else:
+                yield _split_untidy_block(block, offset)
+            offset += len(block)
+
+
+def _split_untidy_block(block, offset):
+    """逐行处理含有空行或空白字符的块"""
+    domains = []
+    offsets = []
+    untidy = False
+    for line in io.BytesIO(block):
+        domain = line.strip()
+        if domain:
+            domains.append(domain)
+            offsets.append(offset + len(line) - len(line.lstrip()))
+        if domain + b"\n" != line:
+            untidy = True
+        offset += len(line)
+    lengths = np.fromiter(map(len, domains), dtype=np.int64, count=len(domains))
+    return domains, np.array(offsets, dtype=np.int64), lengths, untidy
+
+
+def _count_lines(path):
+    lines = 0
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(_READ_BLOCK_BYTES), b""):
+            lines += block.count(b"\n")
+    return lines + 1
+
+
+def _read_fingerprints(path):
+    """
+    读取文件中全部域名的指纹、偏移和长度（按文件顺序），以及是否有需要整理的行
+    先统计行数按上限分配数组，避免拼接各块时内存翻倍
+    """
+    capacity = _count_lines(path)
+    fingerprints = np.empty(capacity, dtype=np.int64)
+    offsets = np.empty(capacity, dtype=np.int64)
+    lengths = np.empty(capacity, dtype=np.uint16)
+    count = 0
+    untidy = False
+    for domains, block_offsets, block_lengths, block_untidy in _iter_domain_blocks(path):
+        end = count + len(domains)
+        fingerprints[count:end] = _fingerprints(domains)
+        offsets[count:end] = block_offsets
+        lengths[count:end] = block_lengths
+        count = end
+        untidy = untidy or block_untidy
+    return fingerprints[:count], offsets[:count], lengths[:count], untidy
+
+
+def _open_mmap(path):
+    if os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as fp:
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class FingerprintSet:
+    """
+    块文件中域名的集合：按指纹排序的数组加上对原文件的 mmap
+
+    Example:
+        old_domains = FingerprintSet(old_chunk_file)
+        mask = old_domains.contains_mask(domains)
+    """
+
+    def __init__(self, path):
+        self._data = None
+        if os.path.exists(path):
+            fingerprints, offsets, lengths, _ = _read_fingerprints(path)
+            self._data = _open_mmap(path)
+        else:
+            fingerprints = offsets = np.zeros(0, np.int64)
+            lengths = np.zeros(0, np.uint16)
+        # 逐个数组按排序重排，同一时间只多出一个数组的副本
+        order = np.argsort(fingerprints, kind="stable")
+        self._fingerprints = fingerprints[order]
+        del fingerprints
+        self._offsets = offsets[order]
+        del offsets
+        self._lengths = lengths[order]
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def _domain_at(self, index):
+        offset = int(self._offsets[index])
+        return self._data[offset:offset + int(self._lengths[index])]
+
+    def contains_mask(self, domains, lengths=None, matched=None):
+        """
+        Args:
+            domains (list): 域名列表（bytes）
+            lengths (numpy.ndarray): 各域名的长度，None 时重新计算
+            matched (numpy.ndarray): 与集合等长的 bool 数组（见 new_matched），在集合中找到的域名对应的位置会被置为 True
+
+        Returns:
+            numpy.ndarray: 与 domains 等长的 bool 数组，True 表示域名在集合中
+        """
+        mask = np.zeros(len(domains), dtype=bool)
+        if not len(self._fingerprints) or not domains:
+            return mask
+        if lengths is None:
+            lengths = np.fromiter(map(len, domains), dtype=np.int64, count=len(domains))
+        fingerprints = _fingerprints(domains)
+        indexes = np.searchsorted(self._fingerprints, fingerprints)
+        clipped = np.minimum(indexes, len(self._fingerprints) - 1)
+        candidates = np.flatnonzero(self._fingerprints[clipped] == fingerprints)
+
+        # 绝大多数情况下同一指纹的第一个候选就是同一个域名，先批量比较原始内容，其余的逐个检查
+        first = indexes[candidates]
+        verified = self._same_domains(
+            [domains[position] for position in candidates.tolist()], lengths[candidates],
+            self._offsets[first], self._lengths[first],
+        )
+        mask[candidates[verified]] = True
+        if matched is not None:
+            matched[first[verified]] = True
+        for position in candidates[~verified].tolist():
+            index = self._find_colliding(domains[position], int(fingerprints[position]))
+            if index >= 0:
+                mask[position] = True
+                if matched is not None:
+                    matched[index] = True
+        return mask
+
+    def _same_domains(self, domains, lengths, offsets, old_lengths):
+        """
+        批量比较 domains 与文件中 offsets 处的域名是否相同：把对应的字节按索引取出后整体比较
+
+        Returns:
+            numpy.ndarray: 与 domains 等长的 bool 数组
+        """
+        same = lengths == old_lengths
+        data = np.frombuffer(self._data, dtype=np.uint8)
+        for start in range(0, len(domains), _COMPARE_BATCH_SIZE):
+            end = start + _COMPARE_BATCH_SIZE
+            batch_lengths = lengths[start:end]
+            batch = np.frombuffer(b"".join(domains[start:end]), dtype=np.uint8)
+            # 长度不同的域名按新域名的长度取字节，比较结果不影响（已经判定为不同）
+            batch_offsets = offsets[start:end]
+            starts = np.zeros(len(batch_lengths), dtype=np.int64)
+            np.cumsum(batch_lengths[:-1], out=starts[1:])
+            positions = np.repeat(batch_offsets - starts, batch_lengths) + np.arange(len(batch))
+            np.minimum(positions, len(data) - 1, out=positions)
+            differing = np.flatnonzero(data[positions] != batch)
+            if differing.size:
+                owners = np.searchsorted(starts, differing, side="right") - 1
+                same[start + np.unique(owners)] = False
+        return same
+
+    def _find_colliding(self, domain, fingerprint):
+        """指纹相同但第一个候选不是同一个域名：检查同一指纹的其余候选，返回找到的位置，没有时返回 -1"""
+        index = int(np.searchsorted(self._fingerprints, fingerprint)) + 1
+        while index < len(self._fingerprints) and self._fingerprints[index] == fingerprint:
+            if self._domain_at(index) == domain:
+                return index
+            index += 1
+        return -1
+
+    def new_matched(self):
+        """供 contains_mask 记录已找到的域名的 bool 数组"""
+        return np.zeros(len(self._fingerprints), dtype=bool)
+
+    def write_unmatched(self, matched, out_fp):
+        """把 matched 中没有找到的域名按文件中的顺序写入 out_fp（二进制模式），返回写出的数量"""
+        unmatched = np.flatnonzero(~matched)
+        order = np.argsort(self._offsets[unmatched])
+        unmatched = unmatched[order]
+        data = self._data
+        for start in range(0, len(unmatched), _COMPARE_BATCH_SIZE):
+            rows = unmatched[start:start + _COMPARE_BATCH_SIZE]
+            out_fp.writelines(
+                data[offset:offset + length] + b"\n"
+                for offset, length in zip(self._offsets[rows].tolist(), self._lengths[rows].tolist())
+            )
+        return len(unmatched)
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+
+
+def write_new_domains_with_fingerprints(new_chunk_file, old_chunk_file, out_fp, removed_fp=None):
+    """
+    将新块中不在旧块里的域名按新块的顺序写入 out_fp（二进制模式），结果与 str 集合相同；
+    removed_fp 不为 None 时同时把不在新块里的旧域名按旧块的顺序写入 removed_fp
+
+    Returns:
+        tuple: (新增的域名数, 删除的域名数)
+    """
+    old_domains = FingerprintSet(old_chunk_file)
+    matched = old_domains.new_matched() if removed_fp is not None else None
+    added = 0
+    removed = 0
+    try:
+        for domains, _, lengths, _ in _iter_domain_blocks(new_chunk_file):
+            mask = old_domains.contains_mask(domains, lengths, matched)
+            new_domains = [domains[index] + b"\n" for index in np.flatnonzero(~mask).tolist()]
+            out_fp.writelines(new_domains)
+            added += len(new_domains)
+        if removed_fp is not None:
+            removed = old_domains.write_unmatched(matched, removed_fp)
+    finally:
+        old_domains.close()
+    return added, removed
+
+
+def deduplicate_chunk_file_with_fingerprints(chunk_file):
+    """
+    去除块文件中重复的域名，保留每个域名第一次出现的行，结果与 str 集合去重相同；
+    只有发现重复（或空行、首尾有空白的行）时才重写文件
+
+    指纹相同的域名读出原始内容比较，指纹冲突的不同域名都会保留
+
+    Returns:
+        tuple: (保留的域名数, 去除的重复数)
+    """
+    fingerprints, offsets, lengths, untidy = _read_fingerprints(chunk_file)
+    count = len(fingerprints)
+    keep = np.ones(count, dtype=bool)
+    if count:
+        order = np.argsort(fingerprints, kind="stable")
+        sorted_fingerprints = fingerprints[order]
+        del fingerprints
+        repeated = np.flatnonzero(sorted_fingerprints[1:] == sorted_fingerprints[:-1]) + 1
+        if repeated.size:
+            data = _open_mmap(chunk_file)
+            try:
+                _mark_duplicates(data, order, sorted_fingerprints, offsets, lengths, repeated, keep)
+            finally:
+                data.close()
+    kept = int(np.count_nonzero(keep))
+    duplicates = count - kept
+    if duplicates or untidy:
+        _rewrite_kept_domains(chunk_file, keep)
+    return kept, duplicates
+
+
+def _mark_duplicates(data, order, sorted_fingerprints, offsets, lengths, repeated, keep):
+    """
+    对每组指纹相同的行读出域名，除了每个域名第一次出现的行之外都标记为不保留；
+    稳定排序使同一组内按原来的行顺序排列
+    """
+    # repeated 是排序后与前一个指纹相同的位置，连续的一段加上它前面的一个位置就是一组
+    group_starts = np.concatenate(([True], repeated[1:] != repeated[:-1] + 1))
+    group_ends = np.concatenate((repeated[1:] != repeated[:-1] + 1, [True]))
+    for start, end in zip((repeated[group_starts] - 1).tolist(), (repeated[group_ends] + 1).tolist()):
+        rows = order[start:end]
+        seen = set()
+        for row, offset, length in zip(rows.tolist(), offsets[rows].tolist(), lengths[rows].tolist()):
+            domain = data[offset:offset + length]
+            if domain in seen:
+                keep[row] = False
+            else:
+                seen.add(domain)
+
+
+def _rewrite_kept_domains(chunk_file, keep):
+    """按 keep（与非空行一一对应）重写块文件，每行只保留去掉首尾空白的域名"""
+    temp_file = chunk_file + ".tmp"
+    row = 0
+    with open(temp_file, "wb") as out_fp:
+        for domains, _, _, _ in _iter_domain_blocks(chunk_file):
+            block_keep = keep[row:row + len(domains)].tolist()
+            row += len(domains)
+            out_fp.writelines(domain + b"\n" for domain, kept in zip(domains, block_keep) if kept)
+    os.replace(temp_file, chunk_file)
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟 CZDS 服务：无需 ICANN 账号即可测试 do_authentication、do_http_get 和 do_download
+
+提供的接口:
+- POST /api/authenticate           返回带 exp 声明的 JWT；服务器在 token_lifetime 秒后拒绝该 token
+                                   （可以短于 exp，用于模拟 token 提前失效时的 401）
+- GET  /czds/downloads/links       返回所有模拟 zone 的下载地址
+- GET/HEAD /czds/downloads/<tld>.zone
+                                   返回合成的 gzip zone 文件，支持 ETag/Last-Modified 条件请求
+                                   以及 Range/If-Range 断点续传
+- GET  /mock/stats                 返回服务器统计信息（请求数、状态码、发送字节数、注入的故障数）
+
+可注入的故障: 首字节延迟、单连接带宽限制、429/5xx 响应（带 Retry-After）、传输中途断开连接
+
+使用方法:
+python -m scripts.mock_czds_server --port 8080 --zones 8 --zone-size-mb 64 --error-rate 0.05 --drop-rate 0.05
+"""
+
+import argparse
+import base64
+import email.utils
+import gzip
+import hashlib
+import json
+import random
+import string
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ZONE_PATH_PREFIX = "/czds/downloads/"
+ZONE_SUFFIX = ".zone"
+# 合成 zone 文件使用的记录类型和值，模拟真实 zone 文件的行格式
+_RECORD_TEMPLATES = (
+    "{0}.{1}.\t86400\tin\tns\tns1.{2}.net.",
+    "{0}.{1}.\t86400\tin\tns\tns2.{2}.net.",
+    "ns1.{0}.{1}.\t86400\tin\ta\t192.0.2.{3}",
+)
+_SEND_BLOCK_SIZE = 256 * 1024
+
+
+def generate_zone(tld, size_bytes, seed=0):
+    """
+    生成一个合成的 zone 文件（gzip 压缩）
+
+    Args:
+        tld (str): 顶级域名
+        size_bytes (int): 解压后的大约大小
+        seed (int): 随机种子，相同参数生成相同内容
+
+    Returns:
+        bytes: gzip 压缩后的内容
+    """
+    rng = random.Random("{0}:{1}".format(seed, tld))
+    alphabet = string.ascii_lowercase * 3 + string.digits + "-"
+    lines = ["{0}.\t86400\tin\tsoa\ta.nic.{0}. hostmaster.nic.{0}. 1 1800 900 604800 86400".format(tld)]
+    written = len(lines[0]) + 1
+    while written < size_bytes:
+        name = rng.choice(string.ascii_lowercase) + "".join(
+            rng.choice(alphabet) for _ in range(rng.randint(4, 15))
+        )
+        host = "dns{0}".format(rng.randint(1, 500))
+        for template in _RECORD_TEMPLATES:
+            line = template.format(name, tld, host, rng.randint(1, 254))
+            lines.append(line)
+            written += len(line) + 1
+    # 压缩级别 1：生成速度优先，压缩率与真实 zone 文件接近即可
+    return gzip.compress(("\n".join(lines) + "\n").encode("ascii"), compresslevel=1, mtime=0)
+
+
+def zone_name(index):
+    """第 index 个模拟 zone 的 TLD（只含字母，与真实 TLD 一样能通过域名过滤）"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = string.ascii_lowercase[remainder] + letters
+    return "mock" + letters
+
+
+def _encode_segment(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def _decode_token_claims(token):
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload.encode("ascii")))
+        return {"iat": float(claims["iat"]), "exp": float(claims["exp"])}
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class MockCzdsState:
+    """服务器共享状态：zone 内容、故障参数和统计信息"""
+
+    def __init__(self, zones=4, zone_size_mb=8.0, token_ttl=86400, token_lifetime=None, latency=0.0,
+                 error_rate=0.0, drop_rate=0.0, rate_limit_mb=None, seed=0):
+        """
+        Args:
+            zones (int): 模拟的 zone 数量
+            zone_size_mb (float): 每个 zone 解压后的大小（MB），各 zone 在 0.5x~1.5x 之间变化
+            token_ttl (int): JWT 中 exp 声明的有效期（秒），与 CZDS 一致默认 24 小时
+            token_lifetime (int): 服务器实际接受 token 的秒数，超过后返回 401，默认与 token_ttl 相同
+            latency (float): 每个请求的首字节延迟（秒）
+            error_rate (float): 返回 429/500/502/503 的概率
+            drop_rate (float): zone 下载中途断开连接的概率
+            rate_limit_mb (float): 单个连接的最大发送速度（MB/s），None 表示不限制
+            seed (int): 随机种子
+        """
+        self.token_ttl = token_ttl
+        self.token_lifetime = token_lifetime if token_lifetime is not None else token_ttl
+        self.latency = latency
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.rate_limit = rate_limit_mb * 1024 * 1024 if rate_limit_mb else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.last_modified = email.utils.formatdate(time.time(), usegmt=True)
+        self.zones = {}
+        for index in range(zones):
+            tld = zone_name(index)
+            scale = 0.5 + (index % 5) * 0.25
+            body = generate_zone(tld, int(zone_size_mb * 1024 * 1024 * scale), seed)
+            self.zones[tld] = {"body": body, "etag": '"{0}"'.format(hashlib.md5(body).hexdigest())}
+        self.stats = {
+            "requests": 0,
+            "status": {},
+            "bytes_sent": 0,
+            "tokens_issued": 0,
+            "injected_errors": 0,
+            "dropped_connections": 0,
+        }
+
+    def issue_token(self):
+        header = _encode_segment({"alg": "none", "typ": "JWT"})
+        with self._lock:
+            self.stats["tokens_issued"] += 1
+            jti = self.stats["tokens_issued"]
+        now = time.time()
+        payload = _encode_segment({"sub": "mock", "jti": jti, "iat": now, "exp": int(now + self.token_ttl)})
+        return "{0}.{1}.mock".format(header, payload)
+
+    def is_token_valid(self, authorization):
+        if not authorization or not authorization.startswith("Bearer "):
+            return False
+        claims = _decode_token_claims(authorization[len("Bearer "):])
+        if claims is None:
+            return False
+        now = time.time()
+        return now < claims["exp"] and now < claims["iat"] + self.token_lifetime
+
+    def roll(self, probability):
+        if probability <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < probability
+
+    def choose_drop_offset(self, start, end):
+        with self._lock:
+            return self._rng.randint(start, max(start, end - 1))
+
+    def choose_error(self):
+        with self._lock:
+            self.stats["injected_errors"] += 1
+            return self._rng.choice((429, 500, 502, 503))
+
+    def count(self, status, sent=0):
+        with self._lock:
+            self.stats["requests"] += 1
+            key = str(status)
+            self.stats["status"][key] = self.stats["status"].get(key, 0) + 1
+            self.stats["bytes_sent"] += sent
+
+    def count_drop(self):
+        with self._lock:
+            self.stats["dropped_connections"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+
+class MockCzdsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockCZDS/1.0"
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, data, extra_headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.state.count(status, len(body))
+
+    def _send_error(self, status):
+        headers = {"Retry-After": "1"} if status in (429, 503) else None
+        self._send_json(status, {"message": "mock error {0}".format(status)}, headers)
+
+    def _base_url(self):
+        return "http://{0}".format(self.headers.get("Host") or "{0}:{1}".format(*self.server.server_address))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = self.rfile.read(length)
+        if self.path != "/api/authenticate":
+            self._send_error(404)
+            return
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        if self.state.roll(self.state.error_rate):
+            self._send_error(self.state.choose_error())
+            return
+        try:
+            credential = json.loads(payload)
+        except ValueError:
+            credential = {}
+        if not credential.get("username") or not credential.get("password"):
+            self._send_error(401)
+            return
+        self._send_json(200, {"accessToken": self.state.issue_token(), "message": "Authentication Successful"})
+
+    def do_GET(self):
+        self._handle_get(head=False)
+
+    def do_HEAD(self):
+        self._handle_get(head=True)
+
+    def _handle_get(self, head):
+        if self.path == "/mock/stats":
+            self._send_json(200, self.state.snapshot())
+            return
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        if not self.state.is_token_valid(self.headers.get("Authorization")):
+            self._send_error(401)
+            return
+        if self.state.roll(self.state.error_rate):
+            self._send_error(self.state.choose_error())
+            return
+
+        if self.path == "/czds/downloads/links":
+            base_url = self._base_url()
+            links = [base_url + ZONE_PATH_PREFIX + tld + ZONE_SUFFIX for tld in sorted(self.state.zones)]
+            self._send_json(200, links)
+            return
+
+        tld = None
+        if self.path.startswith(ZONE_PATH_PREFIX) and self.path.endswith(ZONE_SUFFIX):
+            tld = self.path[len(ZONE_PATH_PREFIX):-len(ZONE_SUFFIX)]
+        zone = self.state.zones.get(tld)
+        if zone is None:
+            self._send_error(404)
+            return
+        self._send_zone(tld, zone, head)
+
+    def _send_zone(self, tld, zone, head):
+        body = zone["body"]
+        etag = zone["etag"]
+        last_modified = self.state.last_modified
+
+        if self.headers.get("If-None-Match") == etag or (
+            not self.headers.get("If-None-Match") and self.headers.get("If-Modified-Since") == last_modified
+        ):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            self.state.count(304)
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and range_header.startswith("bytes=") and if_range in (None, etag, last_modified):
+            start = int(range_header[len("bytes="):].split("-", 1)[0] or 0)
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", "bytes */{0}".format(len(body)))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                self.state.count(416)
+                return
+        status = 206 if start else 200
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Disposition", "attachment;filename={0}.txt.gz".format(tld))
+        self.send_header("Content-Length", str(len(body) - start))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Accept-Ranges", "bytes")
+        if start:
+            self.send_header("Content-Range", "bytes {0}-{1}/{2}".format(start, len(body) - 1, len(body)))
+        self.end_headers()
+        if head:
+            self.state.count(status)
+            return
+
+        # 需要断开时在响应体的随机位置中断
+        drop_at = None
+        if self.state.roll(self.state.drop_rate):
+            drop_at = self.state.choose_drop_offset(start, len(body))
+
+        sent = self._write_body(memoryview(body), start, drop_at if drop_at is not None else len(body))
+        self.state.count(status, sent)
+        if drop_at is not None:
+            self.state.count_drop()
+            self.close_connection = True
+
+    def _write_body(self, view, start, end):
+        sent = 0
+        started = time.monotonic()
+        rate_limit = self.state.rate_limit
+        try:
+            for offset in range(start, end, _SEND_BLOCK_SIZE):
+                block = view[offset:min(end, offset + _SEND_BLOCK_SIZE)]
+                self.wfile.write(block)
+                sent += len(block)
+                if rate_limit:
+                    delay = sent / rate_limit - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        return sent
+
+
+class MockCzdsServer:
+    """在后台线程运行的模拟服务"""
+
+    def __init__(self, host="127.0.0.1", port=0, **options):
+        """
+        Args:
+            host (str): 监听地址
+            port (int): 监听端口，0 表示自动选择
+            **options: 传给 MockCzdsState 的参数
+        """
+        self.httpd = ThreadingHTTPServer((host, port), MockCzdsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = MockCzdsState(**options)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return "http://{0}:{1}".format(host, port)
+
+    @property
+    def stats(self):
+        return self.httpd.state.snapshot()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def add_server_arguments(parser):
+    """添加模拟服务的命令行参数，供基准测试脚本复用"""
+    parser.add_argument("--zones", type=int, default=4, help="模拟的 zone 数量，默认 4")
+    parser.add_argument("--zone-size-mb", type=float, default=8.0, help="每个 zone 解压后的平均大小（MB），默认 8")
+    parser.add_argument("--token-ttl", type=int, default=86400, help="JWT exp 声明的有效期（秒），默认 86400")
+    parser.add_argument("--token-lifetime", type=float, default=None,
+                        help="服务器接受 token 的秒数，超过后返回 401，默认与 --token-ttl 相同")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的首字节延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 429/5xx 的概率")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="zone 下载中途断开连接的概率")
+    parser.add_argument("--rate-limit-mb", type=float, default=None, help="单个连接的最大发送速度（MB/s）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+
+
+def get_server_options(args):
+    return {
+        "zones": args.zones,
+        "zone_size_mb": args.zone_size_mb,
+        "token_ttl": args.token_ttl,
+        "token_lifetime": args.token_lifetime,
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "drop_rate": args.drop_rate,
+        "rate_limit_mb": args.rate_limit_mb,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 CZDS 服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址，默认 127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="监听端口，默认 8080")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    print("正在生成 {0} 个模拟 zone 文件...".format(args.zones))
+    server = MockCzdsServer(args.host, args.port, **get_server_options(args))
+    total = sum(len(zone["body"]) for zone in server.httpd.state.zones.values())
+    print("模拟 CZDS 服务已启动: {0} (zone 压缩后共 {1:.1f} MB)".format(server.base_url, total / (1024 * 1024)))
+    print('config.json 中设置 "authentication.base.url" 和 "czds.base.url" 为 {0}'.format(server.base_url))
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
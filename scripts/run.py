@@ -6,29 +6,44 @@ from app_config.constant import (
     DIR_OUTPUT_DOMAINS_002,
     DIR_OUTPUT_DOMAIN_CHUNKS_NEW,
     DIR_OUTPUT_DOMAIN_CHUNKS_OLD,
+    FILE_DOMAIN_SNAPSHOT_NEW,
 )
 
-from util.util import FILE_OUTPUT_DOMAINS_NEW_ALL
+from util.util import FILE_OUTPUT_DIFF_COUNTS, FILE_OUTPUT_DOMAINS_NEW_ALL, FILE_OUTPUT_DOMAINS_REMOVED
 
 
-def run_task(enable_delay=False):
-    """
-    运行任务
-    
-    Args:
-        enable_delay (bool): 是否启用延迟以减少内存峰值使用
-    """
-
-    print("【4】 ********* extract_new_domains() ********")
-    from scripts.extract_first_column import extract_first_column_from_directory
+def _extract_and_chunk_new_domains(enable_delay=False):
+    """抽取新的域名并直接生成去重后的新域名块"""
+    print("【4】 ********* extract_and_chunk_new_domains() ********")
+    from scripts.zone_partitions import extract_and_chunk_directory
+    from download_manifest import get_manifest_path, get_unchanged_files
+    from app_config.config import (
+        get_diff_options_from_config,
+        get_extract_options_from_config,
+        get_workers_from_config,
+        get_working_directory_from_config,
+    )
 
-    new_domains_ready = extract_first_column_from_directory(
+    zone_aware, ns_only, keep_domain_files = get_extract_options_from_config()
+    diff_engine, sort_memory_bytes = get_diff_options_from_config()
+    unchanged_files = get_unchanged_files(get_manifest_path(get_working_directory_from_config()))
+    if unchanged_files and not keep_domain_files:
+        print(f"警告: 下载清单中有 {len(unchanged_files)} 个 zone 未变化，但 extract.keep_domain_files 为 false，"
+              f"没有保留上次的域名文件，这些 zone 仍会重新抽取")
+    new_chunks_ready = extract_and_chunk_directory(
         DIR_DOWNLOAD_ZONEFILES,
-        DIR_OUTPUT_DOMAINS_002,
-        batch_size=2000,
+        DIR_OUTPUT_DOMAIN_CHUNKS_NEW,
+        num_chunks=128,
+        workers=get_workers_from_config("extract.workers"),
+        zone_aware=zone_aware,
+        ns_only=ns_only,
+        domains_dir=DIR_OUTPUT_DOMAINS_002 if keep_domain_files else None,
+        skip_files=unchanged_files,
+        sort_chunks=diff_engine == "sortmerge",
+        memory_budget=sort_memory_bytes,
     )
-    if not new_domains_ready:
-        print("未能生成新的域名文件，结束任务。")
+    if not new_chunks_ready:
+        print("未能生成新的块文件，结束任务。")
         return False
     
     if enable_delay:
@@ -48,23 +63,6 @@ def run_task(enable_delay=False):
     #     print("等待5秒以释放内存...")
     #     time.sleep(5)
 
-    print("【6】 ********* chunk_new_domain_files() ********")
-    from scripts.chunked_diff_domain import chunk_directory_domains, diff_chunk_directories_to_file
-
-    new_chunks_ready = chunk_directory_domains(
-        DIR_OUTPUT_DOMAINS_002,
-        DIR_OUTPUT_DOMAIN_CHUNKS_NEW,
-        num_chunks=128,
-        batch_size=2000,
-    )
-    if not new_chunks_ready:
-        print("未能生成新的块文件，结束任务。")
-        return False
-    
-    if enable_delay:
-        print("等待5秒以释放内存...")
-        time.sleep(5)
-
     # print("【7】 ********* chunk_old_domain_files() ********")
     # old_chunks_ready = chunk_directory_domains(
     #     DIR_OUTPUT_DOMAINS_001,
@@ -78,14 +76,48 @@ def run_task(enable_delay=False):
     # if enable_delay:
     #     print("等待5秒以释放内存...")
     #     time.sleep(5)
+    return True
+
+
+def run_task(enable_delay=False, streamed=False):
+    """
+    运行任务
+    
+    Args:
+        enable_delay (bool): 是否启用延迟以减少内存峰值使用
+        streamed (bool): 新的域名块已由流式下载生成，跳过抽取和分块阶段
+    """
+
+    if not streamed and not _extract_and_chunk_new_domains(enable_delay):
+        return False
 
     print("【8】 ********* diff_chunk_directories() ********")
+    from scripts.chunked_diff_domain import diff_chunk_directories_to_file
+    from app_config.config import get_diff_options_from_config, get_workers_from_config
+
+    diff_engine, sort_memory_bytes = get_diff_options_from_config()
     diff_chunk_directories_to_file(
         DIR_OUTPUT_DOMAIN_CHUNKS_NEW,
         DIR_OUTPUT_DOMAIN_CHUNKS_OLD,
         FILE_OUTPUT_DOMAINS_NEW_ALL,
         num_chunks=128,
+        workers=get_workers_from_config("diff.workers"),
+        diff_engine=diff_engine,
+        memory_budget=sort_memory_bytes,
+        removed_file=FILE_OUTPUT_DOMAINS_REMOVED,
+        counts_file=FILE_OUTPUT_DIFF_COUNTS,
     )
+
+    from app_config.config import get_snapshot_enabled_from_config
+    if get_snapshot_enabled_from_config():
+        print("【8.1】 ******* write_snapshot_from_chunk_directory() ********")
+        from scripts.domain_snapshot import write_snapshot_from_chunk_directory
+        write_snapshot_from_chunk_directory(
+            DIR_OUTPUT_DOMAIN_CHUNKS_NEW,
+            FILE_DOMAIN_SNAPSHOT_NEW,
+            workers=get_workers_from_config("diff.workers"),
+            memory_budget=sort_memory_bytes,
+        )
     
     if enable_delay:
         print("等待5秒以释放内存...")
@@ -94,7 +126,7 @@ def run_task(enable_delay=False):
     print("【9】 ******** save_domains_to_db() ********")
     from scripts.store_domains_db import save_domains_to_db
     # 使用较小的批处理大小以减少内存使用
-    save_domains_to_db(FILE_OUTPUT_DOMAINS_NEW_ALL, batch_size=200)
+    save_domains_to_db(FILE_OUTPUT_DOMAINS_NEW_ALL, batch_size=200, removed_file=FILE_OUTPUT_DOMAINS_REMOVED)
     
     if enable_delay:
         print("等待5秒以释放内存...")
@@ -106,8 +138,8 @@ def run_task(enable_delay=False):
     return True
 
 
-def run_task_low_memory():
+def run_task_low_memory(streamed=False):
     """
     低内存模式运行任务
     """
-    return run_task(enable_delay=True)
+    return run_task(enable_delay=True, streamed=streamed)
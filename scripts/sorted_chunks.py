@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+排序的块文件和 sortmerge 比较引擎
+
+去重时把块文件写成排好序、没有重复的域名（按 UTF-8 字节排序），新旧块都排好序后，
+比较只需同时顺序读取两个文件做归并（merge-join），内存占用与块大小无关，
+新增域名在每个块内按顺序输出
+
+块文件载入内存后超过 memory_budget 时使用外部排序：分段排序写入临时文件，再多路归并
+"""
+
+import heapq
+import itertools
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.chunk_layout import read_layout
+
+# 排序一个块文件时的默认内存上限
+DEFAULT_SORT_MEMORY_BYTES = 512 * 1024 * 1024
+# 域名载入为 bytes 列表后，每字节文件内容大约占用的内存（bytes 对象头和列表指针）
+_MEMORY_PER_INPUT_BYTE = 4
+_WRITE_BATCH_SIZE = 10000
+
+
+def sort_unique_chunk_file(chunk_file, memory_budget=DEFAULT_SORT_MEMORY_BYTES):
+    """
+    把块文件重写为排好序且没有重复的域名
+
+    Returns:
+        tuple: (保留的域名数, 去除的重复数)
+    """
+    run_bytes = max(1, memory_budget // _MEMORY_PER_INPUT_BYTE)
+    if os.path.getsize(chunk_file) <= run_bytes:
+        with open(chunk_file, "rb") as fp:
+            domains = [domain for domain in (line.strip() for line in fp) if domain]
+        unique = sorted(set(domains))
+        _write_lines(chunk_file + ".tmp", unique)
+        os.replace(chunk_file + ".tmp", chunk_file)
+        return len(unique), len(domains) - len(unique)
+
+    runs_dir = chunk_file + ".runs"
+    os.makedirs(runs_dir, exist_ok=True)
+    try:
+        run_files, total = _write_sorted_runs(chunk_file, runs_dir, run_bytes)
+        kept = _merge_runs(run_files, chunk_file + ".tmp")
+    finally:
+        shutil.rmtree(runs_dir, ignore_errors=True)
+    os.replace(chunk_file + ".tmp", chunk_file)
+    return kept, total - kept
+
+
+def _write_sorted_runs(chunk_file, runs_dir, run_bytes):
+    """外部排序的第一步：每读取约 run_bytes 字节就排序去重后写入一个临时文件"""
+    run_files = []
+    total = 0
+    with open(chunk_file, "rb") as fp:
+        while True:
+            lines = fp.readlines(run_bytes)
+            if not lines:
+                break
+            domains = {domain for domain in (line.strip() for line in lines) if domain}
+            total += sum(1 for line in lines if line.strip())
+            run_file = os.path.join(runs_dir, f"run_{len(run_files):04d}.txt")
+            _write_lines(run_file, sorted(domains))
+            run_files.append(run_file)
+    return run_files, total
+
+
+def _merge_runs(run_files, output_file):
+    """多路归并已排序的临时文件，相同的域名只保留一个，返回写出的域名数"""
+    handles = [open(run_file, "rb") for run_file in run_files]
+    try:
+        kept = 0
+        previous = None
+        batch = []
+        with open(output_file, "wb") as out_fp:
+            for line in heapq.merge(*handles):
+                if line == previous:
+                    continue
+                previous = line
+                batch.append(line)
+                if len(batch) >= _WRITE_BATCH_SIZE:
+                    out_fp.writelines(batch)
+                    kept += len(batch)
+                    batch = []
+            out_fp.writelines(batch)
+            kept += len(batch)
+        return kept
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def _write_lines(path, domains):
+    with open(path, "wb") as fp:
+        for start in range(0, len(domains), _WRITE_BATCH_SIZE):
+            fp.write(b"\n".join(domains[start:start + _WRITE_BATCH_SIZE]) + b"\n")
+
+
+def sort_chunk_directory(chunk_dir, workers=None, memory_budget=DEFAULT_SORT_MEMORY_BYTES):
+    """对目录内所有块文件排序去重（用于以前生成或重新分块后未排序的块目录）"""
+    chunk_files = sorted(
+        os.path.join(chunk_dir, name) for name in os.listdir(chunk_dir)
+        if name.startswith("chunk_") and name.endswith(".txt")
+    )
+    workers = min(workers or os.cpu_count() or 1, max(1, len(chunk_files)))
+    budgets = [memory_budget] * len(chunk_files)
+    if workers <= 1:
+        list(map(sort_unique_chunk_file, chunk_files, budgets))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(sort_unique_chunk_file, chunk_files, budgets))
+
+    layout = read_layout(chunk_dir)
+    if layout is not None:
+        layout.write_layout(chunk_dir, sorted_chunks=True)
+
+
+def merge_join_new_domains(new_chunk_file, old_chunk_file, out_fp, removed_fp=None):
+    """
+    顺序读取两个排好序的块文件，把只在新块中出现的域名写入 out_fp（二进制模式），
+    removed_fp 不为 None 时同时把只在旧块中出现的域名写入 removed_fp
+
+    Returns:
+        tuple: (新增的域名数, 删除的域名数)
+    """
+    added = 0
+    removed = 0
+    batch = []
+    removed_batch = []
+    old_fp = open(old_chunk_file, "rb") if os.path.exists(old_chunk_file) else None
+    try:
+        old_lines = iter(old_fp) if old_fp is not None else iter(())
+        old = next(old_lines, None)
+        # 当前的旧域名是否已经在新块中出现过
+        old_matched = False
+        with open(new_chunk_file, "rb") as new_fp:
+            for line in new_fp:
+                while old is not None and old < line:
+                    if not old_matched:
+                        removed_batch.append(old)
+                    old = next(old_lines, None)
+                    old_matched = False
+                if old == line:
+                    old_matched = True
+                    continue
+                batch.append(line)
+                if len(batch) >= _WRITE_BATCH_SIZE:
+                    out_fp.writelines(batch)
+                    added += len(batch)
+                    batch = []
+                if len(removed_batch) >= _WRITE_BATCH_SIZE:
+                    removed += _write_removed(removed_fp, removed_batch)
+                    removed_batch = []
+        out_fp.writelines(batch)
+        added += len(batch)
+        if old is not None and not old_matched:
+            removed_batch.append(old)
+        removed += _write_removed(removed_fp, removed_batch)
+        if removed_fp is not None:
+            for line in old_lines:
+                removed_batch = [line]
+                removed_batch.extend(itertools.islice(old_lines, _WRITE_BATCH_SIZE))
+                removed += _write_removed(removed_fp, removed_batch)
+    finally:
+        if old_fp is not None:
+            old_fp.close()
+    return added, removed
+
+
+def _write_removed(removed_fp, lines):
+    if removed_fp is None:
+        return 0
+    removed_fp.writelines(lines)
+    return len(lines)
@@ -9,7 +9,7 @@ import os
 import sqlite3
 from datetime import datetime, timedelta
 
-from util.util import DB_FILE, FILE_OUTPUT_DOMAINS_NEW_ALL
+from util.util import DB_FILE, FILE_OUTPUT_DOMAINS_NEW_ALL, FILE_OUTPUT_DOMAINS_REMOVED
 
 
 def _deduplicate_domain_records(cursor):
@@ -41,6 +41,22 @@ def _deduplicate_domain_records(cursor):
     return cursor.rowcount
 
 
+def _create_removed_domains_table(cursor):
+    """创建删除域名表，同一个域名在同一天只记录一次"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS removed_domains (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            domain TEXT NOT NULL,
+            removed_date DATE NOT NULL,
+            UNIQUE(domain, removed_date)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_removed_date ON removed_domains(removed_date)
+    ''')
+
+
 def init_database():
     """初始化数据库表"""
     # 确保output目录存在
@@ -73,6 +89,8 @@ def init_database():
         CREATE INDEX IF NOT EXISTS idx_created_date ON domains(created_date)
     ''')
     
+    _create_removed_domains_table(cursor)
+    
     conn.commit()
     conn.close()
 
@@ -165,6 +183,50 @@ def store_domains_to_db(domains_file, batch_size=1000):
         print(f"发现 {duplicate_count} 条重复记录")
 
 
+def store_removed_domains_to_db(removed_file, batch_size=1000):
+    """
+    将删除的域名（昨天有、今天没有）存储到removed_domains表
+    
+    Args:
+        removed_file (str): 包含删除域名的文件路径
+        batch_size (int): 批处理大小，控制内存使用
+    """
+    if not os.path.exists(removed_file):
+        print(f"文件 {removed_file} 不存在")
+        return
+    
+    init_database()
+    today = datetime.now().date()
+    
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    insert_sql = 'INSERT OR IGNORE INTO removed_domains (domain, removed_date) VALUES (?, ?)'
+    
+    inserted_count = 0
+    batch = []
+    try:
+        with open(removed_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                domain = line.strip()
+                if domain:
+                    batch.append((domain, today))
+                    if len(batch) >= batch_size:
+                        cursor.executemany(insert_sql, batch)
+                        inserted_count += max(cursor.rowcount, 0)
+                        conn.commit()
+                        batch = []
+        if batch:
+            cursor.executemany(insert_sql, batch)
+            inserted_count += max(cursor.rowcount, 0)
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"数据库插入错误: {e}")
+    finally:
+        conn.close()
+    
+    print(f"成功插入 {inserted_count} 条删除域名记录到数据库")
+
+
 def delete_old_data(days=7):
     """
     删除指定天数前的数据
@@ -192,6 +254,13 @@ def delete_old_data(days=7):
     
     deleted_count = cursor.rowcount
     
+    _create_removed_domains_table(cursor)
+    cursor.execute(
+        'DELETE FROM removed_domains WHERE removed_date < ?',
+        (cutoff_date,)
+    )
+    deleted_count += cursor.rowcount
+    
     conn.commit()
     conn.close()
     
@@ -220,12 +289,14 @@ def get_domains_count_by_date():
     return results
 
 
-def save_domains_to_db(domains_file=FILE_OUTPUT_DOMAINS_NEW_ALL, batch_size=1000):
-    """主函数"""
+def save_domains_to_db(domains_file=FILE_OUTPUT_DOMAINS_NEW_ALL, batch_size=1000, removed_file=None):
+    """主函数，removed_file 不为 None 时同时存储删除的域名"""
     print("开始将域名数据存储到数据库...")
     
     # 存储域名到数据库
     store_domains_to_db(domains_file, batch_size)
+    if removed_file:
+        store_removed_domains_to_db(removed_file, batch_size)
     
     # 删除7天前的数据
     print("开始清理7天前的数据...")
@@ -239,4 +310,4 @@ def save_domains_to_db(domains_file=FILE_OUTPUT_DOMAINS_NEW_ALL, batch_size=1000
 
 
 if __name__ == '__main__':
-    save_domains_to_db()
+    save_domains_to_db(removed_file=FILE_OUTPUT_DOMAINS_REMOVED)
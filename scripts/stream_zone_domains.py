@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流式下载处理：下载的 zone 数据边下载边解压，直接抽取第一列域名并写入哈希块，
+不再落地 .txt.gz、解压后的 .txt 以及 domains-002 中间文件
+
+压缩的原始文件只在 keep_compressed=True 时保留（同时支持断点续传和未变化跳过）
+zone_aware / ns_only 与非流式抽取（scripts.zone_partitions）的含义相同，两种模式得到相同的域名
+"""
+
+import threading
+import zlib
+
+from app_config.constant import DIR_OUTPUT_DOMAIN_CHUNKS_NEW
+from scripts.chunk_layout import get_partitioner
+from scripts.chunked_diff_domain import (
+    _deduplicate_chunk_files,
+    _open_chunk_files,
+    _prepare_chunk_dir,
+    _write_domains_to_chunks,
+)
+from scripts.zone_scanner import ZoneOwnerScanner, scan_block
+
+
+class ZoneDomainSink:
+    """
+    单个 zone 的数据流：解压 gzip 数据，按行切分后分批写入哈希块
+    zone_aware 为 True 时用 ZoneOwnerScanner 识别 owner，每个 owner 只写一次，并去掉 apex 和 glue 记录
+    """
+
+    def __init__(self, partitioner, name, compressed=True, batch_size=2000, zone_aware=False, ns_only=False):
+        self._partitioner = partitioner
+        self._scanner = ZoneOwnerScanner(ns_only=ns_only, errors="replace") if zone_aware else None
+        self.name = name
+        self._compressed = compressed
+        self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16) if compressed else None
+        self._batch_size = batch_size
+        self._pending = b""
+        self._batch = []
+        self.total_lines = 0
+        self.total_domains = 0
+
+    def write(self, data):
+        if self._compressed:
+            data = self._decompress(data)
+        else:
+            data = bytes(data)
+        if not data:
+            return
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._batch.append(line)
+        if len(self._batch) >= self._batch_size:
+            self._flush()
+
+    def _decompress(self, data):
+        output = []
+        while data:
+            output.append(self._decompressor.decompress(data))
+            if not self._decompressor.eof:
+                break
+            # 多成员 gzip 文件，继续解压下一个成员
+            data = self._decompressor.unused_data
+            self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        return b"".join(output)
+
+    def _flush(self):
+        if not self._batch:
+            return
+        block = b"\n".join(self._batch) + b"\n"
+        if self._scanner is not None:
+            line_count, domains = self._scanner.scan(block)
+        else:
+            # 与非流式抽取相同的 bytes 第一列扫描；块文件之后会去重，相邻的相同域名只写一次
+            line_count, domains = scan_block(block, errors="replace", collapse=True)
+        self.total_lines += line_count
+        self.total_domains += self._partitioner.write_domains(domains)
+        self._batch = []
+
+    def close(self):
+        """数据流完整结束：处理最后一行并写出剩余批次"""
+        if self._compressed:
+            self._pending += self._decompressor.flush()
+        if self._pending:
+            self._batch.append(self._pending)
+            self._pending = b""
+        self._flush()
+        if self._scanner is not None:
+            # 最后一个 owner 组在所有行处理完后才能确定是否输出
+            self.total_domains += self._partitioner.write_domains(self._scanner.finish())
+        print(f"  {self.name} 流式处理完成: 读取 {self.total_lines} 行, 写入 {self.total_domains} 个域名")
+
+    def abort(self):
+        """
+        下载中断：丢弃不完整的最后一行，已写入的完整行保留
+        重试时会从头重新写入，多出的重复域名在块去重时去除
+        """
+        self._pending = b""
+        self._flush()
+
+
+class StreamChunkPartitioner:
+    """多个下载线程共享的哈希块写入器"""
+
+    def __init__(self, chunk_dir=DIR_OUTPUT_DOMAIN_CHUNKS_NEW, num_chunks=128, batch_size=2000,
+                 keep_compressed=False, zone_aware=False, ns_only=False):
+        """
+        Args:
+            chunk_dir (str): 哈希块目录，会被清空
+            num_chunks (int): 分块数量
+            batch_size (int): 每个 zone 数据流每批写入的行数
+            keep_compressed (bool): 是否在磁盘上保留压缩的 zone 文件
+            zone_aware (bool): 识别记录类型列，每个 owner 只输出一次，并去掉 apex 和 glue 记录
+            ns_only (bool): zone_aware 模式下只保留带 NS 记录的 owner
+        """
+        self.chunk_dir = chunk_dir
+        self.num_chunks = num_chunks
+        self.batch_size = batch_size
+        self.keep_compressed = keep_compressed
+        self.zone_aware = zone_aware
+        self.ns_only = ns_only
+        self._lock = threading.Lock()
+        self.total_domains = 0
+        _prepare_chunk_dir(chunk_dir)
+        self.chunk_partitioner = get_partitioner(num_chunks)
+        self._chunk_files = _open_chunk_files(chunk_dir, num_chunks)
+
+    def open_zone(self, name, compressed=True):
+        return ZoneDomainSink(
+            self, name, compressed=compressed, batch_size=self.batch_size, zone_aware=self.zone_aware,
+            ns_only=self.ns_only,
+        )
+
+    def write_domains(self, domains):
+        """写入已抽取并过滤的域名（bytes）"""
+        if not domains:
+            return 0
+        with self._lock:
+            written = _write_domains_to_chunks(domains, self._chunk_files, self.chunk_partitioner)
+            self.total_domains += written
+        return written
+
+    def close(self):
+        for fp in self._chunk_files.values():
+            fp.close()
+
+
+def stream_zone_files_to_chunks(chunk_dir=DIR_OUTPUT_DOMAIN_CHUNKS_NEW, num_chunks=128, batch_size=2000,
+                                keep_compressed=False, sort_chunks=False, zone_aware=False,
+                                ns_only=False, workers=None):
+    """
+    下载所有 zone 文件，并在下载过程中直接生成去重后的哈希块
+    sort_chunks 为 True 时去重的同时把块文件排好序（供 sortmerge 比较引擎使用）
+    zone_aware / ns_only 见 StreamChunkPartitioner
+    workers 为块去重的进程数，None 表示使用 CPU 核数
+
+    Returns:
+        bool: 是否成功生成块文件
+    """
+    from do_download import download
+
+    partitioner = StreamChunkPartitioner(chunk_dir, num_chunks, batch_size, keep_compressed, zone_aware, ns_only)
+    try:
+        download(stream=partitioner)
+    finally:
+        partitioner.close()
+
+    if partitioner.total_domains == 0:
+        print(f"没有从下载的数据中抽取到域名，块目录 {chunk_dir} 为空")
+        return False
+
+    print(f"共写入 {partitioner.total_domains} 个域名，开始对块文件去重...")
+    _deduplicate_chunk_files(chunk_dir, workers, sort_chunks=sort_chunks)
+    partitioner.chunk_partitioner.write_layout(chunk_dir, sorted_chunks=sort_chunks)
+    return True
@@ -1,42 +1,138 @@
 import os
 import gzip
 import shutil
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+# 可选的更快的 gzip 实现（python-isal / zlib-ng），未安装时使用标准库 gzip
+try:
+    from isal import igzip as _gzip_module
+    GZIP_BACKEND = "isal"
+except ImportError:
+    try:
+        from zlib_ng import gzip_ng as _gzip_module
+        GZIP_BACKEND = "zlib-ng"
+    except ImportError:
+        _gzip_module = gzip
+        GZIP_BACKEND = "gzip"
 
-def unzip_zone_files(working_directory="."):
+# 读写缓冲区大小
+READ_BUFFER_SIZE = 4 * 1024 * 1024
+TEMP_SUFFIX = ".tmp"
+
+_MB = 1024 * 1024
+
+
+def _unzip_one_file(gz_file_path):
+    """
+    解压单个 .gz 文件：先写入临时文件并落盘，重命名为最终文件名后才删除 .gz 文件，
+    任何时刻中断都至少保留一份完整的数据
+
+    Returns:
+        dict: 文件名、压缩前后字节数和耗时
+    """
+    unzipped_file_path = gz_file_path[:-3]  # 移除 .gz 后缀
+    temp_file_path = unzipped_file_path + TEMP_SUFFIX
+    started = time.perf_counter()
+
+    try:
+        with open(gz_file_path, 'rb', buffering=READ_BUFFER_SIZE) as raw_file:
+            with _gzip_module.open(raw_file, 'rb') as gz_file:
+                with open(temp_file_path, 'wb') as unzipped_file:
+                    shutil.copyfileobj(gz_file, unzipped_file, READ_BUFFER_SIZE)
+                    unzipped_file.flush()
+                    os.fsync(unzipped_file.fileno())
+    except BaseException:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        raise
+
+    os.replace(temp_file_path, unzipped_file_path)
+    compressed_bytes = os.path.getsize(gz_file_path)
+    os.remove(gz_file_path)
+
+    return {
+        "filename": os.path.basename(gz_file_path),
+        "compressed_bytes": compressed_bytes,
+        "bytes": os.path.getsize(unzipped_file_path),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def _print_file_result(result):
+    seconds = result["seconds"]
+    speed = result["bytes"] / _MB / seconds if seconds > 0 else 0.0
+    print(
+        f"已解压并删除文件: {result['filename']} "
+        f"({result['compressed_bytes'] / _MB:.1f} MB -> {result['bytes'] / _MB:.1f} MB, "
+        f"{seconds:.2f} 秒, {speed:.1f} MB/s)"
+    )
+
+
+def unzip_zone_files(working_directory=".", workers=None):
     """
     解压 download/zonefiles 目录下所有 .gz 文件，解压后不保留 .gz 文件
-    
+
     Args:
         working_directory (str): 工作目录路径，默认为当前目录
+        workers (int): 并行解压的进程数，默认为 CPU 核数；1 表示在当前进程中逐个解压
     """
     # 构建 zonefiles 目录路径
     zonefiles_dir = os.path.join(working_directory, "zonefiles")
-    
+
     # 检查目录是否存在
     if not os.path.exists(zonefiles_dir):
         print(f"目录 {zonefiles_dir} 不存在")
         return
-    
-    # 遍历目录中的所有 .gz 文件
-    for filename in os.listdir(zonefiles_dir):
-        if filename.endswith(".gz"):
-            gz_file_path = os.path.join(zonefiles_dir, filename)
-            # 去掉 .gz 后缀得到解压后的文件名
-            unzipped_filename = filename[:-3]  # 移除 .gz 后缀
-            unzipped_file_path = os.path.join(zonefiles_dir, unzipped_filename)
-            
-            # 解压文件（分块处理以节省内存）
-            with gzip.open(gz_file_path, 'rb') as gz_file:
-                with open(unzipped_file_path, 'wb') as unzipped_file:
-                    # 分块复制文件内容
-                    chunk_size = 8192  # 8KB chunks
-                    while True:
-                        chunk = gz_file.read(chunk_size)
-                        if not chunk:
-                            break
-                        unzipped_file.write(chunk)
-            
-            # 删除原始的 .gz 文件
-            os.remove(gz_file_path)
-            print(f"已解压并删除文件: {filename}")
\ No newline at end of file
+
+    # 按文件大小从大到小排序，最大的文件最先开始，避免它成为最后的长尾
+    gz_file_paths = [
+        os.path.join(zonefiles_dir, filename)
+        for filename in os.listdir(zonefiles_dir)
+        if filename.endswith(".gz")
+    ]
+    gz_file_paths.sort(key=os.path.getsize, reverse=True)
+    if not gz_file_paths:
+        print(f"目录 {zonefiles_dir} 中没有需要解压的 .gz 文件")
+        return
+
+    workers = min(workers or os.cpu_count() or 1, len(gz_file_paths))
+    print(f"开始解压 {len(gz_file_paths)} 个文件，进程数 {workers}，gzip 实现: {GZIP_BACKEND}")
+
+    started = time.perf_counter()
+    results = []
+    failures = []
+    if workers <= 1:
+        for gz_file_path in gz_file_paths:
+            try:
+                result = _unzip_one_file(gz_file_path)
+            except (OSError, EOFError, zlib.error) as exc:
+                print(f"解压文件 {os.path.basename(gz_file_path)} 失败，保留 .gz 文件: {exc}")
+                failures.append(gz_file_path)
+                continue
+            _print_file_result(result)
+            results.append(result)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_unzip_one_file, path): path for path in gz_file_paths}
+            for future in as_completed(futures):
+                gz_file_path = futures[future]
+                try:
+                    result = future.result()
+                except (OSError, EOFError, zlib.error) as exc:
+                    print(f"解压文件 {os.path.basename(gz_file_path)} 失败，保留 .gz 文件: {exc}")
+                    failures.append(gz_file_path)
+                    continue
+                _print_file_result(result)
+                results.append(result)
+    elapsed = time.perf_counter() - started
+
+    total_bytes = sum(result["bytes"] for result in results)
+    total_compressed = sum(result["compressed_bytes"] for result in results)
+    speed = total_bytes / _MB / elapsed if elapsed > 0 else 0.0
+    print(
+        f"解压完成: {len(results)} 个文件, 失败 {len(failures)} 个, "
+        f"{total_compressed / _MB:.1f} MB -> {total_bytes / _MB:.1f} MB, "
+        f"耗时 {elapsed:.2f} 秒, 总速度 {speed:.1f} MB/s"
+    )
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+抽取、分块、去重合并为一个阶段：每个 zone 文件只读取一次，标准化和过滤只做一次，
+域名直接按哈希写入块文件，不再先写出 output/domains-002 再读回分块
+
+块文件的内容与「extract_first_column_from_directory + chunk_directory_domains」两个阶段的结果完全相同：
+zone 文件按文件名顺序、每个文件按行顺序追加到块文件，去重时保留第一次出现的域名
+"""
+
+import os
+import glob
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.chunked_diff_domain import (
+    _deduplicate_chunk_files,
+    _open_chunk_files,
+    _prepare_chunk_dir,
+    _write_domains_to_chunks,
+)
+from scripts.chunk_layout import get_partitioner
+from scripts.file_ranges import concatenate_files, split_file_ranges
+from scripts.filter import format_reject_counts, get_domain_filter
+from scripts.sorted_chunks import DEFAULT_SORT_MEMORY_BYTES
+from scripts.zone_scanner import ZoneOwnerScanner, iter_line_blocks, scan_block
+
+# 处理汇总中列出的耗时最长的文件数
+_SLOWEST_FILES_SHOWN = 10
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def extract_and_chunk_directory(input_dir, chunk_dir, num_chunks=128, workers=None, zone_aware=False,
+                                ns_only=False, domains_dir=None, skip_files=None, hash_name=None,
+                                sort_chunks=False, memory_budget=DEFAULT_SORT_MEMORY_BYTES):
+    """
+    遍历目录中的 zone 文件，抽取域名并直接写入去重后的哈希块
+
+    Args:
+        input_dir (str): zone 文件目录（*.txt）
+        chunk_dir (str): 哈希块目录，会被清空
+        num_chunks (int): 分块数量
+        workers (int): 并行处理的进程数，默认为 CPU 核数；1 表示在当前进程中逐个处理
+        zone_aware (bool): 识别记录类型列，每个 owner 只输出一次，并去掉 apex 和 glue 记录
+        ns_only (bool): zone_aware 模式下只保留带 NS 记录的 owner
+        domains_dir (str): 同时把每个 zone 的域名写入该目录（与原来的 domains-002 相同），None 表示不写出
+        skip_files (set): 内容未变化的文件名集合，domains_dir 中已有其输出时直接从该输出分块
+        hash_name (str): 分区使用的哈希函数（见 scripts.chunk_layout），None 表示使用配置文件中的 chunk.hash
+        sort_chunks (bool): 去重时把块文件排好序（供 sortmerge 比较引擎使用）
+        memory_budget (int): 排序一个块文件的内存上限（字节），超过时使用外部排序
+
+    Returns:
+        bool: 是否成功生成块文件
+    """
+    _prepare_chunk_dir(chunk_dir)
+
+    if not os.path.exists(input_dir):
+        print(f"目录 {input_dir} 不存在，已清空 {chunk_dir}")
+        return False
+
+    txt_files = sorted(glob.glob(os.path.join(input_dir, "*.txt")))
+    if not txt_files:
+        print(f"目录 {input_dir} 中没有找到 .txt 文件，已清空 {chunk_dir}")
+        return False
+
+    if domains_dir:
+        os.makedirs(domains_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    print(f"在 {input_dir} 中找到 {len(txt_files)} 个 zone 文件，开始抽取并分块（进程数 {workers}）...")
+
+    partitioner = get_partitioner(num_chunks, hash_name)
+    tasks = [_build_task(txt_file, domains_dir, skip_files, zone_aware, ns_only) for txt_file in txt_files]
+    chunk_files = _open_chunk_files(chunk_dir, num_chunks)
+    file_stats = []
+    try:
+        if workers <= 1:
+            for task in tasks:
+                file_stats.append((task['name'], _extract_task_in_process(task, chunk_files, partitioner)))
+        else:
+            file_stats = _extract_tasks_in_pool(tasks, chunk_dir, chunk_files, partitioner, workers)
+    finally:
+        for fp in chunk_files.values():
+            fp.close()
+
+    total_domains = _print_summary(file_stats)
+    print(f"共写入 {total_domains} 个域名，开始对块文件去重...")
+    _deduplicate_chunk_files(chunk_dir, workers, sort_chunks, memory_budget)
+    partitioner.write_layout(chunk_dir, sorted_chunks=sort_chunks)
+    return True
+
+
+def _build_task(txt_file, domains_dir, skip_files, zone_aware, ns_only):
+    """确定一个 zone 文件的读取来源：未变化且已有域名输出时读取该输出，否则读取 zone 文件本身"""
+    name = os.path.basename(txt_file)
+    domains_file = os.path.join(domains_dir, name) if domains_dir else None
+    if domains_file and skip_files and name in skip_files:
+        if os.path.exists(domains_file):
+            print(f"文件未变化，从已有输出分块: {domains_file}")
+            # 域名文件每行只有一个域名，不是 zone 格式，按普通的第一列抽取处理
+            return {'name': name, 'source': domains_file, 'domains_file': None, 'zone_aware': False,
+                    'ns_only': False}
+        print(f"警告: {name} 未变化，但没有找到上次的域名文件 {domains_file}，重新抽取")
+    return {'name': name, 'source': txt_file, 'domains_file': domains_file, 'zone_aware': zone_aware,
+            'ns_only': ns_only}
+
+
+def _extract_to_chunks(task, chunk_files, partitioner, start=0, end=None, domains_fp=None):
+    """
+    读取 task['source'] 的 [start, end) 区间，抽取的域名按哈希写入 chunk_files，
+    domains_fp 不为 None 时同时按原顺序写入该文件
+
+    Returns:
+        dict: 统计信息（读取行数、写出域名数、各过滤规则拒绝的域名数、耗时）
+    """
+    started = time.perf_counter()
+    domain_filter = get_domain_filter()
+    counters_before = domain_filter.counters()
+    scanner = ZoneOwnerScanner(ns_only=task['ns_only']) if task['zone_aware'] else None
+    total_lines = 0
+    total_domains = 0
+
+    def write_domains(domains):
+        nonlocal total_domains
+        if not domains:
+            return
+        if domains_fp is not None:
+            domains_fp.write(b"\n".join(domains))
+            domains_fp.write(b"\n")
+        total_domains += _write_domains_to_chunks(domains, chunk_files, partitioner)
+
+    for block in iter_line_blocks(task['source'], start, end):
+        if scanner is not None:
+            line_count, domains = scanner.scan(block)
+        elif domains_fp is None:
+            # 只写块文件时相邻的相同域名只写一次，去重后的结果不变
+            line_count, domains = scan_block(block, collapse=True)
+        else:
+            line_count, domains = scan_block(block)
+        total_lines += line_count
+        write_domains(domains)
+    if scanner is not None:
+        write_domains(scanner.finish())
+
+    return {
+        'total_lines': total_lines,
+        'total_domains': total_domains,
+        'rejected': {reason: count - counters_before[reason] for reason, count in domain_filter.counters().items()},
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def _extract_task_in_process(task, chunk_files, partitioner):
+    """在当前进程中处理整个文件，直接写入最终的块文件"""
+    print(f"  正在处理 {task['source']}")
+    if task['domains_file'] is None:
+        return _extract_to_chunks(task, chunk_files, partitioner)
+
+    temp_file = task['domains_file'] + ".tmp"
+    with open(temp_file, "wb") as domains_fp:
+        stats = _extract_to_chunks(task, chunk_files, partitioner, domains_fp=domains_fp)
+    os.replace(temp_file, task['domains_file'])
+    return stats
+
+
+def _extract_range(task, start, end, range_dir, partitioner):
+    """在子进程中处理文件的一个区间，块文件和域名文件写入 range_dir"""
+    _prepare_chunk_dir(range_dir)
+    chunk_files = _open_chunk_files(range_dir, partitioner.num_chunks)
+    try:
+        if task['domains_file'] is None:
+            return _extract_to_chunks(task, chunk_files, partitioner, start, end)
+        with open(os.path.join(range_dir, "domains.txt"), "wb") as domains_fp:
+            return _extract_to_chunks(task, chunk_files, partitioner, start, end, domains_fp)
+    finally:
+        for fp in chunk_files.values():
+            fp.close()
+
+
+def _extract_tasks_in_pool(tasks, chunk_dir, chunk_files, partitioner, workers):
+    """
+    大文件按换行符对齐的字节区间切分，所有文件的区间在进程池中并行处理，
+    结果按文件顺序、区间顺序追加到块文件；同时在处理中的区间数有上限，临时文件的数量不会随文件数增长
+    """
+    range_root = os.path.join(chunk_dir, ".ranges")
+    max_pending = workers * 2
+    pending = deque()
+    pending_ranges = 0
+    file_stats = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for task_index, task in enumerate(tasks):
+                ranges = split_file_ranges(task['source'], workers)
+                if len(ranges) > 1:
+                    print(f"  文件 {task['source']} 切分为 {len(ranges)} 个区间并行处理")
+                range_dirs = [os.path.join(range_root, f"{task_index:05d}_{index:03d}") for index in range(len(ranges))]
+                futures = [
+                    executor.submit(_extract_range, task, start, end, range_dir, partitioner)
+                    for (start, end), range_dir in zip(ranges, range_dirs)
+                ]
+                pending.append((task, range_dirs, futures))
+                pending_ranges += len(futures)
+                while pending_ranges >= max_pending:
+                    pending_ranges -= _collect_file(pending.popleft(), chunk_files, file_stats)
+            while pending:
+                _collect_file(pending.popleft(), chunk_files, file_stats)
+    finally:
+        shutil.rmtree(range_root, ignore_errors=True)
+    return file_stats
+
+
+def _collect_file(item, chunk_files, file_stats):
+    """等待一个文件的所有区间完成，按区间顺序追加到块文件，返回区间数"""
+    task, range_dirs, futures = item
+    range_stats = [future.result() for future in futures]
+
+    for chunk_id, fp in chunk_files.items():
+        for range_dir in range_dirs:
+            with open(os.path.join(range_dir, f"chunk_{chunk_id:03d}.txt"), "r", encoding="utf-8") as part:
+                shutil.copyfileobj(part, fp, _COPY_BUFFER_SIZE)
+    if task['domains_file'] is not None:
+        temp_file = task['domains_file'] + ".tmp"
+        concatenate_files([os.path.join(range_dir, "domains.txt") for range_dir in range_dirs], temp_file)
+        os.replace(temp_file, task['domains_file'])
+    for range_dir in range_dirs:
+        shutil.rmtree(range_dir, ignore_errors=True)
+
+    stats = {key: sum(stats[key] for stats in range_stats) for key in ('total_lines', 'total_domains')}
+    stats['seconds'] = max(stats['seconds'] for stats in range_stats)
+    stats['rejected'] = {
+        reason: sum(stats['rejected'][reason] for stats in range_stats) for reason in range_stats[0]['rejected']
+    }
+    file_stats.append((task['name'], stats))
+    return len(futures)
+
+
+def _print_summary(file_stats):
+    """打印每个文件和全部文件的统计信息，返回写入块文件的域名总数"""
+    total_lines = 0
+    total_domains = 0
+    rejected = {}
+    for name, stats in file_stats:
+        print(f"  {name}: 读取 {stats['total_lines']} 行，写出 {stats['total_domains']} 个域名，"
+              f"{stats['seconds']:.2f} 秒，过滤规则拒绝: {format_reject_counts(stats['rejected'])}")
+        total_lines += stats['total_lines']
+        total_domains += stats['total_domains']
+        for reason, count in stats['rejected'].items():
+            rejected[reason] = rejected.get(reason, 0) + count
+
+    print(f"共读取 {total_lines} 行，过滤规则拒绝: {format_reject_counts(rejected)}")
+    if file_stats:
+        slowest = sorted(((stats['seconds'], name) for name, stats in file_stats), reverse=True)
+        print("耗时最长的文件: " + "，".join(
+            f"{name} {seconds:.2f} 秒" for seconds, name in slowest[:_SLOWEST_FILES_SHOWN]
+        ))
+    return total_domains
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+字节模式的 zone 文件扫描器：用 mmap 按块读取文件，在 bytes 上直接找出每行第一列、
+转小写并按 filter_domain 的规则过滤，不对每一行做 UTF-8 解码，也不构建完整的列列表
+
+zone 文件的 owner 名称都是 ASCII（IDN 使用 punycode）。块中出现非 ASCII 字节，
+或 str.split() 视为空白而 bytes.split() 不视为空白的字符时，该块退回逐行的 str 处理，
+结果与文本模式逐行处理完全相同
+
+ZoneOwnerScanner 额外识别记录类型列：同一 owner 的相邻记录只输出一次，
+并去掉 apex（SOA 所在的 owner）和只有 A/AAAA 记录的 glue，可选只保留带 NS 记录的 owner
+"""
+
+import mmap
+import os
+import re
+
+from scripts.filter import ascii_domain_mask, filter_domain, normalize_domain
+
+# 每次扫描的块大小，块总是在换行符之后结束
+SCAN_BLOCK_SIZE = 1024 * 1024
+
+# 行首空白之后的第一列（\n 是行分隔符，\r 已在扫描前按通用换行规则转换）
+_FIRST_COLUMN_PATTERN = re.compile(rb"^[ \t\x0b\x0c]*(\S+)", re.MULTILINE)
+# str.split()/strip() 视为空白、bytes 却不视为空白的 ASCII 字符
+_STR_ONLY_WHITESPACE = (b"\x1c", b"\x1d", b"\x1e", b"\x1f")
+# owner 和记录类型：owner [TTL] [CLASS] [TTL] TYPE ...（TTL 和 CLASS 的顺序可以互换）
+_OWNER_TYPE_PATTERN = re.compile(
+    rb"^[ \t\x0b\x0c]*(\S+)(?:[ \t\x0b\x0c]+(?:\d+[ \t\x0b\x0c]+)?(?:(?:in|cs|ch|hs)[ \t\x0b\x0c]+)?"
+    rb"(?:\d+[ \t\x0b\x0c]+)?(\S+))?",
+    re.MULTILINE,
+)
+_RECORD_CLASSES = frozenset(("in", "cs", "ch", "hs"))
+_GLUE_TYPES = frozenset((b"a", b"aaaa"))
+
+
+def iter_line_blocks(path, start=0, end=None, block_size=SCAN_BLOCK_SIZE):
+    """
+    按块读取文件 [start, end) 区间，每块都在换行符之后结束（最后一块除外）
+
+    Args:
+        path (str): 文件路径
+        start (int): 起始字节（必须是行首）
+        end (int): 结束字节（不含），None 表示文件末尾
+        block_size (int): 每块的大约字节数
+    """
+    if end is None:
+        end = os.path.getsize(path)
+    if end <= start:
+        return
+
+    with open(path, "rb") as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        position = start
+        while position < end:
+            limit = min(end, position + block_size)
+            if limit < end:
+                cut = mapped.rfind(b"\n", position, limit)
+                if cut == -1:
+                    # 超长的行，读到该行结束
+                    cut = mapped.find(b"\n", limit, end)
+                limit = end if cut == -1 else cut + 1
+            yield mapped[position:limit]
+            position = limit
+
+
+def _normalize_newlines(block):
+    if b"\r" in block:
+        # 与文本模式的通用换行规则一致：\r\n 和单独的 \r 都是行结束符
+        block = block.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return block
+
+
+def _is_plain_ascii(block):
+    return block.isascii() and not any(char in block for char in _STR_ONLY_WHITESPACE)
+
+
+def _accept_domain(token):
+    """
+    按 normalize_domain + filter_domain 的规则处理一个第一列（已转小写的 bytes）
+
+    Returns:
+        bytes: 标准化后的域名，被过滤时返回 None
+    """
+    if not token.isascii():
+        domain = normalize_domain(token.decode("utf-8"))
+        return domain.encode("utf-8") if domain and filter_domain(domain) else None
+    domain = token.rstrip(b".")
+    return domain if ascii_domain_mask([domain])[0] else None
+
+
+def scan_block(block, errors="strict", collapse=False):
+    """
+    抽取一块数据中每行第一列的域名，并按 filter_domain 的规则过滤
+
+    Args:
+        block (bytes): 以完整行结束的数据块
+        errors (str): 非 ASCII 块退回 str 处理时的 UTF-8 解码错误处理方式
+        collapse (bool): 相邻的相同域名只输出一次（后续会去重的场景）
+
+    Returns:
+        tuple: (非空行数, 保留的域名列表（bytes，已标准化）)
+    """
+    block = _normalize_newlines(block)
+    if not _is_plain_ascii(block):
+        return _scan_text_lines(block.decode("utf-8", errors).split("\n"), collapse)
+
+    tokens = _FIRST_COLUMN_PATTERN.findall(block.lower())
+    return len(tokens), _filter_tokens_batch(tokens, collapse)
+
+
+def _filter_tokens_batch(tokens, collapse):
+    """
+    过滤一块的 token：同一 owner 的多条记录（NS、DS 等）总是相邻，相邻的相同 token 只判断一次，
+    整块的 token 一次调用 ascii_domain_mask；拒绝计数按合并前的记录数累加，与分块方式无关
+    """
+    candidates = []
+    repeats = []
+    previous = None
+    for token in tokens:
+        if token == previous:
+            repeats[-1] += 1
+            continue
+        previous = token
+        candidates.append(token.rstrip(b"."))
+        repeats.append(1)
+
+    mask = ascii_domain_mask(candidates, repeats)
+    if collapse:
+        return [domain for domain, keep in zip(candidates, mask) if keep]
+    domains = []
+    for domain, keep, count in zip(candidates, mask, repeats):
+        if keep:
+            if count == 1:
+                domains.append(domain)
+            else:
+                domains.extend([domain] * count)
+    return domains
+
+
+def _scan_text_lines(lines, collapse=False):
+    """逐行的 str 处理（与原来的文本模式实现相同），用于含非 ASCII 字符的块"""
+    total_lines = 0
+    domains = []
+    previous = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        total_lines += 1
+        domain = normalize_domain(line.split()[0])
+        if domain and filter_domain(domain):
+            encoded = domain.encode("utf-8")
+            if collapse and encoded == previous:
+                continue
+            domains.append(encoded)
+            previous = encoded
+    return total_lines, domains
+
+
+def _text_owner_types(lines):
+    """str 方式解析 (owner, 记录类型)，用于含非 ASCII 字符的块"""
+    records = []
+    for line in lines:
+        columns = line.split()
+        if not columns:
+            continue
+        record_type = ""
+        for column in columns[1:4]:
+            lowered = column.lower()
+            if not column.isdigit() and lowered not in _RECORD_CLASSES:
+                record_type = lowered
+                break
+        records.append((columns[0].lower().encode("utf-8"), record_type.encode("utf-8")))
+    return records
+
+
+class ZoneOwnerScanner:
+    """
+    zone 文件扫描器：同一 owner 的相邻记录合并为一组，每组最多输出一个域名，不需要集合
+
+    - apex（SOA 记录的 owner）不输出
+    - 只有 A/AAAA 记录的 owner 是 glue，不输出
+    - ns_only=True 时只输出带 NS 记录的 owner（即被委派的域名）
+
+    一个 owner 的最后一组记录可能延续到下一块，调用方处理完所有块后需要调用 finish()
+    """
+
+    def __init__(self, ns_only=False, errors="strict"):
+        self.ns_only = ns_only
+        self.errors = errors
+        self.apex = None
+        self.total_owners = 0
+        self._owner = None
+        self._has_ns = False
+        self._has_other = False
+
+    def scan(self, block):
+        """
+        Returns:
+            tuple: (非空行数, 本块中已结束的 owner 组输出的域名列表)
+        """
+        block = _normalize_newlines(block)
+        if _is_plain_ascii(block):
+            records = _OWNER_TYPE_PATTERN.findall(block.lower())
+        else:
+            records = _text_owner_types(block.decode("utf-8", self.errors).split("\n"))
+
+        owners = []
+        owner = self._owner
+        has_ns = self._has_ns
+        has_other = self._has_other
+        for record_owner, record_type in records:
+            if record_owner != owner:
+                if owner is not None:
+                    self._emit(owner, has_ns, has_other, owners)
+                owner = record_owner
+                has_ns = has_other = False
+            if record_type == b"ns":
+                has_ns = True
+            elif record_type == b"soa":
+                self.apex = record_owner
+            elif record_type not in _GLUE_TYPES:
+                has_other = True
+
+        self._owner = owner
+        self._has_ns = has_ns
+        self._has_other = has_other
+        return len(records), _filter_owners(owners)
+
+    def finish(self):
+        """输出最后一个 owner 组"""
+        owners = []
+        if self._owner is not None:
+            self._emit(self._owner, self._has_ns, self._has_other, owners)
+            self._owner = None
+        return _filter_owners(owners)
+
+    def _emit(self, owner, has_ns, has_other, owners):
+        self.total_owners += 1
+        if owner == self.apex:
+            return
+        if self.ns_only:
+            if not has_ns:
+                return
+        elif not has_ns and not has_other:
+            return
+        owners.append(owner)
+
+
+def _filter_owners(owners):
+    """按 filter_domain 的规则批量过滤 owner（已转小写的 bytes），保持原有顺序"""
+    if all(owner.isascii() for owner in owners):
+        candidates = [owner.rstrip(b".") for owner in owners]
+        return [domain for domain, keep in zip(candidates, ascii_domain_mask(candidates)) if keep]
+    domains = []
+    for owner in owners:
+        domain = _accept_domain(owner)
+        if domain is not None:
+            domains.append(domain)
+    return domains
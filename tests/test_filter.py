@@ -0,0 +1,99 @@
+"""
+DomainFilter.mask 与逐个域名的 reject_reason 的随机对比测试
+
+mask 有 numpy 和正则表达式两个实现，两者的保留结果、各拒绝原因的计数以及
+按记录数加权（相邻相同 token 只检查一次时）的计数都必须与 reject_reason 一致
+
+运行: python -m unittest discover tests
+"""
+import random
+import unittest
+from unittest import mock
+
+from scripts import filter as domain_filter
+from scripts.filter import REJECT_REASONS, DomainFilter
+
+# 随机域名使用的字符，偏向容易触发规则的数字、点号和连字符
+_ALPHABET = "abcxyz0123456789.-_"
+
+# 除默认规则外再测试几组覆盖配置，包括关闭某些规则
+_RULE_SETS = [
+    None,
+    {"max_dots": 2, "max_digits": 3, "reject_substrings": ["--", "xn"]},
+    {"reject_leading_digit": False, "reject_leading_chars": "-_.", "max_dots": None},
+    {"reject_substrings": [], "max_digits": None, "max_dots": 0},
+]
+
+
+def _random_domains(rng, count):
+    domains = []
+    for _ in range(count):
+        length = rng.choice((0, 1, 2, rng.randint(3, 12), rng.randint(13, 40)))
+        domains.append("".join(rng.choice(_ALPHABET) for _ in range(length)))
+    return domains
+
+
+def _reference(rules, domains, weights):
+    """逐个域名调用 reject_reason，得到期望的保留结果和计数"""
+    reference = DomainFilter(rules)
+    rejected = dict.fromkeys(REJECT_REASONS, 0)
+    keep = []
+    for domain, weight in zip(domains, weights):
+        reason = reference.reject_reason(domain)
+        keep.append(reason is None)
+        if reason is not None:
+            rejected[reason] += weight
+    return keep, {"checked": sum(weights), **rejected}
+
+
+class DomainFilterMaskTest(unittest.TestCase):
+
+    def _check(self, use_numpy, weighted):
+        rng = random.Random(20240517 + use_numpy * 2 + weighted)
+        for rules in _RULE_SETS:
+            for _ in range(30):
+                domains = _random_domains(rng, rng.randint(1, 300))
+                weights = [rng.randint(1, 5) for _ in domains] if weighted else None
+                expected_keep, expected_counters = _reference(rules, domains, weights or [1] * len(domains))
+
+                subject = DomainFilter(rules)
+                encoded = [domain.encode("ascii") for domain in domains]
+                if use_numpy:
+                    keep = subject.mask(encoded, weights)
+                else:
+                    with mock.patch.object(domain_filter, "np", None):
+                        keep = subject.mask(encoded, weights)
+
+                with self.subTest(rules=rules, domains=domains[:5]):
+                    self.assertEqual(keep, expected_keep)
+                    self.assertEqual(subject.counters(), expected_counters)
+
+    @unittest.skipIf(domain_filter.np is None, "numpy 未安装")
+    def test_numpy_mask(self):
+        self._check(use_numpy=True, weighted=False)
+
+    @unittest.skipIf(domain_filter.np is None, "numpy 未安装")
+    def test_numpy_mask_weighted(self):
+        self._check(use_numpy=True, weighted=True)
+
+    def test_regex_mask(self):
+        self._check(use_numpy=False, weighted=False)
+
+    def test_regex_mask_weighted(self):
+        self._check(use_numpy=False, weighted=True)
+
+    def test_counters_accumulate_across_calls(self):
+        rng = random.Random(7)
+        domains = _random_domains(rng, 500)
+        weights = [rng.randint(1, 3) for _ in domains]
+        _, expected = _reference(None, domains, weights)
+
+        subject = DomainFilter()
+        encoded = [domain.encode("ascii") for domain in domains]
+        for start in range(0, len(encoded), 64):
+            subject.mask(encoded[start:start + 64], weights[start:start + 64])
+        self.assertEqual(subject.counters(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+access_token 缓存：把 CZDS 返回的 JWT 保存在磁盘上（仅当前用户可读写），
+根据 JWT 的 exp 声明在多次运行之间复用仍然有效的 token
+"""
+
+import base64
+import json
+import os
+import time
+
+TOKEN_CACHE_FILENAME = ".czds_token.json"
+# token 剩余有效期少于该秒数时视为即将过期，提前刷新
+TOKEN_REFRESH_MARGIN_SECONDS = 600
+
+
+def get_token_cache_path(working_directory):
+    return os.path.join(working_directory, TOKEN_CACHE_FILENAME)
+
+
+def decode_token_expiry(access_token):
+    """
+    解析 JWT payload 中的 exp 声明（不校验签名）
+
+    Returns:
+        float: 过期时间的 Unix 时间戳，无法解析时返回 None
+    """
+    try:
+        payload = access_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload.encode("ascii")))
+        return float(claims["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def is_token_fresh(expires_at, margin=TOKEN_REFRESH_MARGIN_SECONDS):
+    """过期时间未知时视为有效，只能依赖 401 响应触发刷新"""
+    if expires_at is None:
+        return True
+    return time.time() < expires_at - margin
+
+
+def load_cached_token(path, username):
+    """
+    读取缓存的 token
+
+    Returns:
+        str: 属于该用户且未临近过期的 token，否则返回 None
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as fp:
+            cached = json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+    if cached.get("username") != username:
+        return None
+    access_token = cached.get("access_token")
+    expires_at = decode_token_expiry(access_token)
+    if expires_at is None or not is_token_fresh(expires_at):
+        return None
+    return access_token
+
+
+def save_cached_token(path, username, access_token):
+    """以 0600 权限写入缓存文件，先写临时文件再替换"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as fp:
+        # 临时文件可能是上次遗留的，O_CREAT 不会修改已有文件的权限
+        os.fchmod(fp.fileno(), 0o600)
+        json.dump({"username": username, "access_token": access_token}, fp)
+    os.replace(temp_path, path)
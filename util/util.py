@@ -2,7 +2,7 @@ import os
 import glob
 from datetime import datetime
 
-from app_config.constant import DIR_OUTPUT_DOMAINS_NEW, DIR_OUTPUT_DOMAINS_RESULTS
+from app_config.constant import CHUNK_LAYOUT_FILE_NAME, DIR_OUTPUT_DOMAINS_NEW, DIR_OUTPUT_DOMAINS_RESULTS
 
 
 def get_date_string():
@@ -51,6 +51,8 @@ def clear_files_with_extension(directory, extension):
 def mv_domain_chunks_new2old(source_dir, destination_dir, extension ='.txt'):
     """
     将源目录下指定后缀的文件移动到目标目录
+    源目录中有文件时，先删除目标目录中原有的同后缀文件，并连同分区信息文件（layout.json）一起移动，
+    避免块数变化后目标目录残留旧的块文件或分区信息
 
     Args:
         source_dir (str): 源目录路径
@@ -72,6 +74,17 @@ def mv_domain_chunks_new2old(source_dir, destination_dir, extension ='.txt'):
     
     # 查找匹配的文件
     files_to_move = glob.glob(pattern)
+    if not files_to_move:
+        return 0
+
+    for stale_file in glob.glob(os.path.join(destination_dir, '*' + extension)):
+        os.remove(stale_file)
+    stale_layout = os.path.join(destination_dir, CHUNK_LAYOUT_FILE_NAME)
+    if os.path.exists(stale_layout):
+        os.remove(stale_layout)
+    source_layout = os.path.join(source_dir, CHUNK_LAYOUT_FILE_NAME)
+    if os.path.exists(source_layout):
+        os.rename(source_layout, stale_layout)
     
     # 移动文件并计数
     moved_count = 0
@@ -90,10 +103,25 @@ def mv_domain_chunks_new2old(source_dir, destination_dir, extension ='.txt'):
     return moved_count
 
 
+def mv_domain_snapshot_new2old(source_file, destination_file):
+    """
+    将新的域名快照重命名为旧快照（覆盖原有的旧快照）
+
+    Returns:
+        bool: 是否移动了快照
+    """
+    if not os.path.exists(source_file):
+        return False
+    os.replace(source_file, destination_file)
+    return True
+
+
 DIR_OUTPUT_DOMAINS_NEW_TODAY = os.path.join(DIR_OUTPUT_DOMAINS_NEW, get_date_string())
 DIR_OUTPUT_RESULTS_TODAY = os.path.join(DIR_OUTPUT_DOMAINS_RESULTS, get_date_string())
 
 FILE_OUTPUT_DOMAINS_NEW_ALL = os.path.join(DIR_OUTPUT_RESULTS_TODAY, 'all.txt')
+FILE_OUTPUT_DOMAINS_REMOVED = os.path.join(DIR_OUTPUT_RESULTS_TODAY, 'removed.txt')
+FILE_OUTPUT_DIFF_COUNTS = os.path.join(DIR_OUTPUT_RESULTS_TODAY, 'diff-counts.json')
 FILE_OUTPUT_DOMAINS_DUPLICATE = os.path.join(DIR_OUTPUT_RESULTS_TODAY, 'domains-duplicate.txt')
 HTML_OUTPUT_DOMAINS_DUPLICATE = os.path.join(DIR_OUTPUT_RESULTS_TODAY, 'domains-duplicate.html')
 